@@ -0,0 +1 @@
+"""Performance benchmarks of the flow's Python tools on synthetic inputs."""
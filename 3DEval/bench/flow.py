@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+
+# This script tracks the runtime of the whole 3D flow across commits: it runs
+# the ORD flow of a reference design (gcd, optionally aes) on every 3D
+# platform, collects per-stage wall time, CPU time and peak RSS from the
+# TIME_CMD lines of the stage logs, appends them to a history keyed by
+# run__flow__scripts_commit (as in genMetrics.py metadata) and flags the
+# stages that became significantly slower than on the previous commits.
+#
+#   python3 -m bench.flow run                                  (gcd, all platforms, then check)
+#   python3 -m bench.flow run --designs gcd,aes --platforms nangate45_3D --repeat 3
+#   python3 -m bench.flow check                                (latest commit vs. history)
+#   python3 -m bench.flow report --platforms asap7_3D
+#
+# Without an OpenROAD install (or with --toolchain stub) the flow cannot run
+# its Tcl stages; the stub toolchain then seeds the 3D results directory with
+# synthetic floorplan views sized like the design (bench/generators.py) and
+# times the OpenROAD-free make stages (FM tier refinement, 3D views with the
+# connectivity gate, routed DEF statistics) one by one, so the Python side of
+# the flow is still tracked on machines without the tools. Stub and OpenROAD
+# samples are kept apart, as are samples of different hosts.
+#
+# A stage regresses when its wall time (median of the repeats of a commit) is
+# --z standard deviations above the mean of the previous --window commits,
+# more than --tolerance above it and by more than --min-time seconds; the
+# standard deviation is floored at --noise of the mean so a quiet history
+# does not flag jitter. Peak RSS regresses when it grows by --rss-tolerance
+# over the largest baseline sample. Runs from a dirty tree are recorded under
+# <commit>+dirty and never used as a baseline.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import time
+from glob import glob
+
+from bench import generators as gen
+from bench.runner import ROOT, BENCH_DIR, measure, _environment
+
+UTIL_DIR = os.path.join(ROOT, "util")
+sys.path.insert(0, UTIL_DIR)
+
+from genMetrics import git_commit, openroad_version  # noqa: E402
+from logStore import TIME_CMD_RE, read_log  # noqa: E402
+
+PLATFORMS = ("nangate45_3D", "asap7_3D", "asap7_nangate45_3D")
+# Flow variant of the test/<platform>/<design>/ord/run.sh scripts
+ORD_VARIANT = "openroad"
+STUB_VARIANT = "bench-stub"
+# Synthetic instance counts of the stub runs, close to the synthesized designs
+STUB_SIZES = {"gcd": 600, "aes": 16000}
+# (stage, make target) of the stub runs, in flow order
+STUB_STAGES = (
+    ("2_tier_refine", "ord-tier-refine"),
+    ("2_3d_views", "ord-pre"),
+    ("6_route_stats", "route-stats"),
+)
+# The ORFS 'Elapsed time:' format (TIME_CMD lines: logStore.TIME_CMD_RE)
+_TIME_ORFS_RE = re.compile(
+    r"Elapsed time: (\S+)\[h:\]min:sec\. CPU time: user ([\d.]+) sys ([\d.]+) .*"
+    r"Peak memory: (\d+)KB")
+_DESIGN_NAME_RE = re.compile(r"^\s*export\s+DESIGN_NAME\s*[:?]?=\s*(\S+)", re.M)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Per-stage runtime of the 3D flow across commits, with regression checks"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("run", "check", "report"):
+        p = sub.add_parser(name)
+        p.add_argument("--platforms", default=",".join(PLATFORMS),
+                       help="Comma separated subset of: {}".format(", ".join(PLATFORMS)))
+        p.add_argument("--designs", default="gcd", help="Comma separated designs (gcd, aes)")
+        p.add_argument("--toolchain", choices=("auto", "openroad", "stub"), default="auto",
+                       help="auto: OpenROAD when installed, else the stub toolchain")
+        p.add_argument("--history", default=os.path.join(BENCH_DIR, "flow_history.jsonl"))
+        p.add_argument("--window", type=int, default=5,
+                       help="Number of previous commits the current one is compared with")
+    for name in ("run", "check"):
+        p = sub.choices[name]
+        p.add_argument("--z", type=float, default=3.0,
+                       help="Standard deviations above the baseline mean that flag a stage")
+        p.add_argument("--tolerance", type=float, default=0.10,
+                       help="Allowed relative wall time growth")
+        p.add_argument("--rss-tolerance", type=float, default=0.10,
+                       help="Allowed relative peak RSS growth")
+        p.add_argument("--min-time", type=float, default=0.5,
+                       help="Wall time differences below this many seconds are noise")
+        p.add_argument("--noise", type=float, default=0.02,
+                       help="Floor of the baseline standard deviation, relative to its mean")
+    p = sub.choices["run"]
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--timeout", type=float, default=4 * 3600.0,
+                   help="Seconds before a flow (stub: a stage) is killed")
+    p.add_argument("--work", default=os.path.join(BENCH_DIR, "work", "flow"),
+                   help="Directory for the run logs and the stub toolchain")
+    p.add_argument("--no-check", action="store_true", help="Only record the runs")
+    return parser.parse_args()
+
+
+def _split(spec, known=None):
+    items = [s.strip() for s in spec.split(",") if s.strip()]
+    unknown = [s for s in items if known is not None and s not in known]
+    if unknown:
+        sys.exit("[ERROR] unknown: {} (known: {})".format(", ".join(unknown), ", ".join(known)))
+    return items
+
+
+def openroad_exe():
+    """The installed OpenROAD (OPENROAD_EXE or PATH), None without one."""
+    exe = os.environ.get("OPENROAD_EXE")
+    if exe and os.path.isfile(exe) and os.access(exe, os.X_OK):
+        return exe
+    return shutil.which("openroad")
+
+
+def toolchain(choice):
+    if choice != "auto":
+        return choice
+    if openroad_exe():
+        return "openroad"
+    print("[INFO] OpenROAD not found, timing the flow with the stub toolchain")
+    return "stub"
+
+
+def scripts_commit():
+    """run__flow__scripts_commit of the tree: HEAD, '+dirty' with local changes."""
+    from subprocess import check_output
+
+    commit = git_commit(ROOT)
+    if commit is None:
+        return "not a git repo"
+    status = check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT)
+    return commit + "+dirty" if status.strip() else commit
+
+
+# ==============================================================================
+# Stage times
+# ==============================================================================
+
+
+def parse_elapsed(text):
+    """Seconds of a [[h:]m:]s.ss duration."""
+    seconds = 0.0
+    for field in text.split(":"):
+        seconds = seconds * 60 + float(field)
+    return seconds
+
+
+def log_times(text):
+    """[(wall s, cpu s, peak RSS KB)] of the TIME_CMD / ORFS lines of a log."""
+    times = []
+    for line in text.splitlines():
+        m = TIME_CMD_RE.search(line) or _TIME_ORFS_RE.search(line)
+        if m:
+            times.append((parse_elapsed(m.group(1)), float(m.group(2)) + float(m.group(3)),
+                          int(m.group(4))))
+    return times
+
+
+def _stage(wall, cpu, rss):
+    return {"wall_s": round(wall, 3), "cpu_s": round(cpu, 3), "peak_rss_kb": rss}
+
+
+def flow_stages(platform, design, since):
+    """
+    Stages of the logs written since 'since' under logs/*/<design>/openroad:
+    the 3D platform's logs by stem, those of the 2D platform as <platform>/<stem>.
+    A log holding several timed runs (loops append to it) sums their times.
+    """
+    stages = {}
+    for log_dir in sorted(glob(os.path.join(ROOT, "logs", "*", design, ORD_VARIANT))):
+        log_platform = os.path.basename(os.path.dirname(os.path.dirname(log_dir)))
+        paths = glob(os.path.join(log_dir, "*.log")) + glob(os.path.join(log_dir, "*.log.gz"))
+        for path in sorted(paths):
+            if os.path.getmtime(path) < since:
+                continue
+            log = path[:-3] if path.endswith(".gz") else path
+            stem = os.path.basename(log)[:-len(".log")]
+            if log != path and os.path.exists(log):
+                continue  # the plain log is read instead
+            times = log_times(read_log(log, tag="elapsed"))
+            if not times:
+                continue
+            name = stem if log_platform == platform else "{}/{}".format(log_platform, stem)
+            stages[name] = _stage(sum(t[0] for t in times), sum(t[1] for t in times),
+                                  max(t[2] for t in times))
+    return stages
+
+
+# ==============================================================================
+# Runs
+# ==============================================================================
+
+
+def run_openroad(platform, design, args):
+    """(status, stages) of test/<platform>/<design>/ord/run.sh."""
+    script = os.path.join(ROOT, "test", platform, design, "ord", "run.sh")
+    if not os.path.isfile(script):
+        print("[WARN] no flow script {}".format(script))
+        return "missing", {}
+    log_path = os.path.join(args.work, "{}.{}.ord.log".format(platform, design))
+    since = time.time()
+    rc, wall, user, system, rss, timed_out = measure(
+        ["bash", script], dict(os.environ), ROOT, log_path, args.timeout)
+    stages = flow_stages(platform, design, since)
+    stages["total"] = _stage(wall, user + system, rss)
+    if timed_out or rc != 0:
+        print("[WARN] {}/{}: {} (rc {}), see {}".format(
+            platform, design, "timeout" if timed_out else "error", rc, log_path))
+        return "timeout" if timed_out else "error", stages
+    return "ok", stages
+
+
+def _stub_exe(directory):
+    """'openroad -version' for genMetrics.py; the stub runs no OpenROAD stage."""
+    exe = os.path.join(directory, "openroad")
+    if not os.path.exists(exe):
+        with open(exe, "w") as f:
+            f.write("#!/bin/sh\necho bench-stub 0000000\n")
+        os.chmod(exe, 0o755)
+    return exe
+
+
+def run_stub(platform, design, args):
+    """(status, stages) of the OpenROAD-free stages on synthetic floorplan views."""
+    config = os.path.join("designs", platform, design, "config.mk")
+    if not os.path.isfile(os.path.join(ROOT, config)):
+        print("[WARN] no design config {}".format(config))
+        return "missing", {}
+    with open(os.path.join(ROOT, config)) as f:
+        m = _DESIGN_NAME_RE.search(f.read())
+    design_name = m.group(1) if m else design
+    results = os.path.join("results", platform, design, STUB_VARIANT)
+    make = ["make", "--no-print-directory", "DESIGN_CONFIG=" + config,
+            "DESIGN_NICKNAME=" + design, "FLOW_VARIANT=" + STUB_VARIANT]
+    env = dict(os.environ)
+    env["OPENROAD_EXE"] = _stub_exe(args.work)
+    env.pop("PLATFORM_DIR", None)
+
+    log_path = os.path.join(args.work, "{}.{}.stub".format(platform, design))
+    rc = measure(make + ["clean_all"], env, ROOT, log_path + ".clean.log", args.timeout)[0]
+    if rc != 0:
+        print("[WARN] {}/{}: clean_all failed, see {}.clean.log".format(platform, design, log_path))
+        return "error", {}
+    netlist = gen.Netlist(STUB_SIZES.get(design, STUB_SIZES["gcd"]), seed=1)
+    seed = os.path.join(ROOT, results)
+    os.makedirs(seed, exist_ok=True)
+    gen.write_def(netlist, os.path.join(seed, "2_2_floorplan_io.def"), design=design_name)
+    gen.write_verilog(netlist, os.path.join(seed, "2_2_floorplan_io.v"), module=design_name)
+    gen.write_partition(netlist, os.path.join(seed, "partition.txt"))
+
+    stages = {}
+    final_def = "FINAL_DEF=" + os.path.join(results, design_name + "_3D.fp.def")
+    for stage, target in STUB_STAGES:
+        stage_log = "{}.{}.log".format(log_path, stage)
+        rc, wall, user, system, rss, timed_out = measure(
+            make + [final_def, target], env, ROOT, stage_log, args.timeout)
+        if timed_out or rc != 0:
+            print("[WARN] {}/{} {}: {} (rc {}), see {}".format(
+                platform, design, stage, "timeout" if timed_out else "error", rc, stage_log))
+            return "timeout" if timed_out else "error", stages
+        stages[stage] = _stage(wall, user + system, rss)
+    stages["total"] = _stage(*(sum(s[k] for s in stages.values())
+                               for k in ("wall_s", "cpu_s")),
+                             max(s["peak_rss_kb"] for s in stages.values()))
+    return "ok", stages
+
+
+# ==============================================================================
+# History
+# ==============================================================================
+
+
+def load_history(path):
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    except OSError:
+        pass
+    return records
+
+
+def append_history(path, record):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def _group(record):
+    return (record["environment"]["host"], record["run__flow__platform"],
+            record["run__flow__design"], record["toolchain"])
+
+
+def commits(records):
+    """Distinct run__flow__scripts_commit of records, in order of first appearance."""
+    seen = {}
+    for r in records:
+        seen.setdefault(r["run__flow__scripts_commit"], len(seen))
+    return sorted(seen, key=seen.get)
+
+
+def stage_samples(records, commit):
+    """{stage: [stage dicts]} of the successful records of commit."""
+    samples = {}
+    for r in records:
+        if r["run__flow__scripts_commit"] == commit and r["status"] == "ok":
+            for stage, values in r["stages"].items():
+                samples.setdefault(stage, []).append(values)
+    return samples
+
+
+# ==============================================================================
+# Check
+# ==============================================================================
+
+
+def check_stage(current, baseline, args):
+    """(verdict, mean, sd, z) of a stage's current samples against baseline samples."""
+    x = statistics.median(s["wall_s"] for s in current)
+    walls = [s["wall_s"] for s in baseline]
+    mean = statistics.fmean(walls)
+    sd = statistics.stdev(walls) if len(walls) > 1 else 0.0
+    sd = max(sd, args.noise * mean, 1e-9)
+    z = (x - mean) / sd
+    verdict = "ok"
+    if z > args.z and x - mean > args.min_time and x > mean * (1 + args.tolerance):
+        verdict = "SLOWER"
+    rss = max(s["peak_rss_kb"] for s in current)
+    if rss > max(s["peak_rss_kb"] for s in baseline) * (1 + args.rss_tolerance):
+        verdict = "RSS" if verdict == "ok" else verdict + "+RSS"
+    return verdict, mean, sd, z
+
+
+def check_group(records, commit, args):
+    """Compare commit with the previous --window clean commits of one group; regressions."""
+    previous = [c for c in commits(records) if c != commit and not c.endswith("+dirty")]
+    index = {c: k for k, c in enumerate(commits(records))}
+    previous = [c for c in previous if index[c] < index[commit]][-args.window:]
+    current = stage_samples(records, commit)
+    baseline = {}
+    for c in previous:
+        for stage, values in stage_samples(records, c).items():
+            baseline.setdefault(stage, []).extend(values)
+    r = records[-1]
+    print("[CHECK] {}/{} ({}, {}) {} vs {} commit(s)".format(
+        r["run__flow__platform"], r["run__flow__design"], r["toolchain"],
+        r["environment"]["host"], commit[:12], len(previous)))
+    if not current:
+        print("[WARN] no successful run of {}".format(commit[:12]))
+        return []
+    regressions = []
+    for stage in sorted(current, key=lambda s: (s == "total", s)):
+        x = statistics.median(s["wall_s"] for s in current[stage])
+        if stage not in baseline:
+            print("[CHECK]   {:<28} {:>10.2f}s {:>22}".format(stage, x, "new"))
+            continue
+        verdict, mean, sd, z = check_stage(current[stage], baseline[stage], args)
+        print("[CHECK]   {:<28} {:>10.2f}s  base {:>9.2f}s +-{:<7.2f} (n={:<2}) z {:>6.1f}  {}".format(
+            stage, x, mean, sd, len(baseline[stage]), z, verdict))
+        if verdict != "ok":
+            regressions.append("{}/{}:{}".format(r["run__flow__platform"],
+                                                 r["run__flow__design"], stage))
+    return regressions
+
+
+def _groups(history, args, chain):
+    """{group: records} of the selected platforms, designs and toolchain."""
+    platforms = set(_split(args.platforms, PLATFORMS))
+    designs = set(_split(args.designs))
+    host = _environment()["host"]
+    groups = {}
+    for r in history:
+        g = _group(r)
+        if g[0] == host and g[1] in platforms and g[2] in designs and g[3] == chain:
+            groups.setdefault(g, []).append(r)
+    return groups
+
+
+def check(args, chain=None, commit=None):
+    chain = chain or toolchain(args.toolchain)
+    groups = _groups(load_history(args.history), args, chain)
+    if not groups:
+        print("[INFO] no {} runs of this host in {}".format(chain, args.history))
+        return 0
+    regressions = []
+    for records in groups.values():
+        regressions += check_group(records, commit or records[-1]["run__flow__scripts_commit"],
+                                   args)
+    if regressions:
+        print("[ERROR] {} regression(s): {}".format(len(regressions), ", ".join(regressions)))
+        return 1
+    return 0
+
+
+def report(args):
+    chain = toolchain(args.toolchain)
+    groups = _groups(load_history(args.history), args, chain)
+    for (host, platform, design, _), records in sorted(groups.items()):
+        shown = commits(records)[-(args.window + 1):]
+        samples = [stage_samples(records, c) for c in shown]
+        stages = sorted({s for x in samples for s in x}, key=lambda s: (s == "total", s))
+        print("[REPORT] {}/{} ({}, {}): median wall s per commit".format(
+            platform, design, chain, host))
+        print("{:<28}".format("stage") + "".join(" {:>14}".format(c[:12]) for c in shown))
+        for stage in stages:
+            cells = []
+            for x in samples:
+                values = x.get(stage)
+                cells.append("{:>14.2f}".format(statistics.median(v["wall_s"] for v in values))
+                             if values else "{:>14}".format("-"))
+            print("{:<28} {}".format(stage, " ".join(cells)))
+    return 0
+
+
+def run(args):
+    chain = toolchain(args.toolchain)
+    if chain == "openroad" and not openroad_exe():
+        sys.exit("[ERROR] --toolchain openroad: no OpenROAD (OPENROAD_EXE or PATH)")
+    os.makedirs(args.work, exist_ok=True)
+    commit = scripts_commit()
+    version = "N/A"
+    if chain == "openroad":
+        version = "{} {}".format(*openroad_version(openroad_exe()))
+    failed = []
+    for platform in _split(args.platforms, PLATFORMS):
+        for design in _split(args.designs):
+            for k in range(args.repeat):
+                if chain == "openroad":
+                    status, stages = run_openroad(platform, design, args)
+                else:
+                    status, stages = run_stub(platform, design, args)
+                record = {
+                    "run__flow__scripts_commit": commit,
+                    "run__flow__platform": platform,
+                    "run__flow__design": design,
+                    "run__flow__variant": ORD_VARIANT if chain == "openroad" else STUB_VARIANT,
+                    "run__flow__openroad_version": version,
+                    "toolchain": chain,
+                    "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "environment": _environment(),
+                    "status": status,
+                    "stages": stages,
+                }
+                append_history(args.history, record)
+                total = stages.get("total")
+                print("[FLOW] {}/{} #{} {}: {}".format(
+                    platform, design, k + 1, status,
+                    "{:.2f}s, {:.1f} MB RSS".format(total["wall_s"], total["peak_rss_kb"] / 1024.0)
+                    if total else "-"), flush=True)
+                if status != "ok":
+                    failed.append("{}/{}".format(platform, design))
+                    break
+    print("[INFO] history: {} ({})".format(args.history, commit[:12]))
+    rc = 1 if failed else 0
+    if not args.no_check:
+        rc = check(args, chain, commit) or rc
+    return rc
+
+
+def main():
+    args = parse_args()
+    if args.cmd == "run":
+        return run(args)
+    return check(args) if args.cmd == "check" else report(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+
+# Synthetic inputs for the benchmark suite: a random but reproducible
+# gate-level netlist written as Verilog, DEF COMPONENTS/NETS and a TritonPart
+# style partition.txt, plus the map.json generate_3d_views.py reads, a Yosys
+# JSON with $mem cells, a Liberty library, a 3D tech LEF with an hb_layer
+# stack and the logs/reports/results tree genMetrics.py scans.
+#
+# Everything is streamed: instance i of a netlist only drives net i and its
+# data inputs come from the WINDOW instances before it, so the sinks of a net
+# are known once the generator is WINDOW instances past it and memory stays
+# bounded up to 10M instances. Every 16th instance and net uses an escaped
+# hierarchical name ('core/regs\[i\]' in DEF, '\core/regs[i] ' in Verilog) so
+# the name normalization of the tools is exercised too.
+# -----------------------------------------------------------------------------
+
+import json
+import math
+import os
+import random
+
+# (master, data inputs, output); a "CK" input goes to the clock net
+CELLS = (
+    ("INV_X1", ("A",), "ZN"),
+    ("BUF_X1", ("A",), "Z"),
+    ("NAND2_X1", ("A1", "A2"), "ZN"),
+    ("NOR2_X1", ("A1", "A2"), "ZN"),
+    ("AOI21_X1", ("A", "B1", "B2"), "ZN"),
+    ("OAI21_X1", ("A", "B1", "B2"), "ZN"),
+    ("XOR2_X1", ("A", "B"), "Z"),
+    ("DFF_X1", ("D", "CK"), "Q"),
+)
+WINDOW = 64
+PRIMARY_INPUTS = 32
+DBU = 2000
+SITE_W, ROW_H = 380, 2800
+
+
+def parse_size(text):
+    """'10k', '2.5M', '100000' -> int."""
+    t = text.strip().lower()
+    mult = {"k": 10 ** 3, "m": 10 ** 6, "g": 10 ** 9}.get(t[-1:], 1)
+    if mult != 1:
+        t = t[:-1]
+    return int(float(t) * mult)
+
+
+def format_size(n):
+    for suffix, mult in (("M", 10 ** 6), ("k", 10 ** 3)):
+        if n >= mult and n % mult == 0:
+            return "{}{}".format(n // mult, suffix)
+    return str(n)
+
+
+def _atomic_writer(path):
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    return tmp, open(tmp, "w", buffering=1 << 20)
+
+
+def _finish(tmp, f, path):
+    f.close()
+    os.replace(tmp, path)
+    return path
+
+
+# ==============================================================================
+# Netlist
+# ==============================================================================
+
+
+def def_inst(i):
+    return "core/regs\\[{}\\]".format(i) if i % 16 == 15 else "u{}".format(i)
+
+
+def verilog_inst(i):
+    return "\\core/regs[{}] ".format(i) if i % 16 == 15 else "u{}".format(i)
+
+
+def _def_net(k):
+    if k < 0:
+        return "pi{}".format(-k - 1)
+    return "core/bus\\[{}\\]".format(k) if k % 16 == 7 else "n{}".format(k)
+
+
+def _verilog_net(k):
+    if k < 0:
+        return "pi{}".format(-k - 1)
+    return "\\core/bus[{}] ".format(k) if k % 16 == 7 else "n{}".format(k)
+
+
+class Netlist:
+    """n instances; net k >= 0 is driven by instance k, net -1-j is input pi<j>."""
+
+    CLOCK = None
+
+    def __init__(self, n, seed=1):
+        self.n = n
+        self.seed = seed
+
+    def instances(self):
+        """Yield (i, cell, [(pin, net)]) in instance order, identically on every call."""
+        rng = random.Random(self.seed).random
+        ncells = len(CELLS)
+        for i in range(self.n):
+            cell = CELLS[int(rng() * ncells)]
+            conns = []
+            first = True
+            for pin in cell[1]:
+                if pin == "CK":
+                    conns.append((pin, self.CLOCK))
+                    continue
+                src = i - 1 if first else i - 1 - int(rng() * WINDOW)
+                first = False
+                if src < 0:
+                    src = -1 - (-src - 1) % PRIMARY_INPUTS
+                conns.append((pin, src))
+            yield i, cell, conns
+
+    def die_side(self):
+        cols = max(1, int(math.ceil(math.sqrt(self.n))))
+        return cols, cols * SITE_W * 2, int(math.ceil(self.n / cols)) * ROW_H * 2
+
+
+def write_verilog(netlist, path, module="top"):
+    tmp, f = _atomic_writer(path)
+    ports = ["clk"] + ["pi{}".format(j) for j in range(PRIMARY_INPUTS)]
+    f.write("module {} ({});\n".format(module, ", ".join(ports)))
+    for p in ports:
+        f.write("  input {};\n".format(p))
+    for k in range(netlist.n):
+        f.write("  wire {};\n".format(_verilog_net(k)))
+    f.write("\n")
+    for i, cell, conns in netlist.instances():
+        pins = ["." + pin + "(" + ("clk" if k is None else _verilog_net(k)) + ")"
+                for pin, k in conns]
+        pins.append("." + cell[2] + "(" + _verilog_net(i) + ")")
+        f.write("  " + cell[0] + " " + verilog_inst(i) + " (" + ", ".join(pins) + ");\n")
+    f.write("endmodule\n")
+    return _finish(tmp, f, path)
+
+
+def _write_net(f, name, conns):
+    f.write("    - " + name)
+    for j, (inst, pin) in enumerate(conns):
+        f.write(("\n      " if j % 4 == 0 else " ") + "( " + inst + " " + pin + " )")
+    f.write(" + USE SIGNAL ;\n")
+
+
+def write_def(netlist, path, design="top"):
+    tmp, f = _atomic_writer(path)
+    cols, width, height = netlist.die_side()
+    f.write("VERSION 5.8 ;\nDIVIDERCHAR \"/\" ;\nBUSBITCHARS \"[]\" ;\n")
+    f.write("DESIGN {} ;\nUNITS DISTANCE MICRONS {} ;\n".format(design, DBU))
+    f.write("DIEAREA ( 0 0 ) ( {} {} ) ;\n".format(width, height))
+
+    f.write("COMPONENTS {} ;\n".format(netlist.n))
+    for i, cell, _ in netlist.instances():
+        x, y = (i % cols) * SITE_W * 2, (i // cols) * ROW_H * 2
+        f.write("    - {} {} + PLACED ( {} {} ) {} ;\n".format(
+            def_inst(i), cell[0], x, y, "FS" if (i // cols) % 2 else "N"))
+    f.write("END COMPONENTS\n")
+
+    ports = ["clk"] + ["pi{}".format(j) for j in range(PRIMARY_INPUTS)]
+    f.write("PINS {} ;\n".format(len(ports)))
+    for p in ports:
+        f.write("    - {0} + NET {0} + DIRECTION INPUT + USE SIGNAL ;\n".format(p))
+    f.write("END PINS\n")
+
+    f.write("NETS {} ;\n".format(netlist.n + len(ports)))
+    clock = [("PIN", "clk")]
+    inputs = {-1 - j: [("PIN", "pi{}".format(j))] for j in range(PRIMARY_INPUTS)}
+    pending = {}
+    for i, cell, conns in netlist.instances():
+        inst = def_inst(i)
+        for pin, k in conns:
+            if k is None:
+                clock.append((inst, pin))
+            elif k < 0:
+                inputs[k].append((inst, pin))
+            else:
+                pending[k].append((inst, pin))
+        pending[i] = [(inst, cell[2])]
+        done = i - WINDOW
+        if done >= 0:
+            _write_net(f, _def_net(done), pending.pop(done))
+    for k in sorted(pending):
+        _write_net(f, _def_net(k), pending[k])
+    _write_net(f, "clk", clock)
+    for k in sorted(inputs, reverse=True):
+        _write_net(f, _def_net(k), inputs[k])
+    f.write("END NETS\nEND DESIGN\n")
+    return _finish(tmp, f, path)
+
+
+def write_partition(netlist, path):
+    """Tiers in blocks of 4096 instances with 5% of the cells flipped, like a min-cut result."""
+    tmp, f = _atomic_writer(path)
+    rng = random.Random(netlist.seed + 1).random
+    for i in range(netlist.n):
+        die = (i >> 12) & 1
+        if rng() < 0.05:
+            die ^= 1
+        f.write("{} {}\n".format(def_inst(i), die))
+    return _finish(tmp, f, path)
+
+
+def write_cell_map(path):
+    cells = {}
+    for master, inputs, output in CELLS:
+        pins = list(inputs) + [output]
+        cells[master] = {
+            "base": master,
+            "bottom": {"macro": master + "_bottom", "pins": pins},
+            "upper": {"macro": master + "_upper", "pins": pins},
+            "pin_map": {p: p for p in pins},
+        }
+    tmp, f = _atomic_writer(path)
+    json.dump({"cells": cells}, f, indent=2, sort_keys=True)
+    return _finish(tmp, f, path)
+
+
+# ==============================================================================
+# Yosys JSON
+# ==============================================================================
+
+GATES = (("$_NAND_", ("A", "B")), ("$_NOR_", ("A", "B")), ("$_NOT_", ("A",)),
+         ("$_DFF_P_", ("C", "D")))
+BLOCK_CELLS = 10000
+BLOCK_COPIES = 2
+
+
+def write_yosys_json(n, path, seed=1):
+    """
+    ceil(n / 10000) block modules of up to 10000 gates and one $mem_v2 each,
+    every block instantiated twice by the top module, as 'write_json' of a
+    hierarchical synthesis would look.
+    """
+    rng = random.Random(seed).random
+    blocks = max(1, int(math.ceil(n / BLOCK_CELLS)))
+    tmp, f = _atomic_writer(path)
+    f.write('{\n  "creator": "Yosys 0.38 (benchmark)",\n  "modules": {\n')
+    for b in range(blocks):
+        count = max(1, min(BLOCK_CELLS, n - b * BLOCK_CELLS))
+        src = "rtl/blk{}.v".format(b)
+        f.write('    "blk{}": {{\n'.format(b))
+        f.write('      "attributes": {{"src": "{}:1.1-900.10"}},\n'.format(src))
+        f.write('      "cells": {\n')
+        for c in range(count):
+            gate, pins = GATES[int(rng() * len(GATES))]
+            conns = ", ".join('"{}": [{}]'.format(p, 2 + int(rng() * count)) for p in pins)
+            f.write('        "$abc${}$auto${}": {{"hide_name": 1, "type": "{}", '
+                    '"parameters": {{}}, "attributes": {{"src": "{}:{}.5-{}.30"}}, '
+                    '"connections": {{{}, "Y": [{}]}}}},\n'.format(
+                        b, c, gate, src, 10 + c, 10 + c, conns, 2 + c))
+        depth, width = 1 << (6 + b % 5), 8 << (b % 3)
+        f.write('        "mem{}": {{"hide_name": 0, "type": "$mem_v2", "parameters": '
+                '{{"SIZE": "{:032b}", "WIDTH": "{:032b}", "ABITS": "{:032b}", '
+                '"INIT": "{}"}}, "attributes": {{"src": "{}:5.3-5.40"}}, '
+                '"connections": {{}}}}\n'.format(
+                    b, depth, width, 6 + b % 5, "x" * min(depth * width, 4096), src))
+        f.write("      }\n    },\n")
+    f.write('    "top": {\n      "attributes": {"top": "00000000000000000000000000000001", '
+            '"src": "rtl/top.v:1.1-50.10"},\n      "cells": {\n')
+    insts = ['        "u_blk{0}_{1}": {{"hide_name": 0, "type": "blk{0}", "parameters": {{}}, '
+             '"attributes": {{"src": "rtl/top.v:{2}.3-{2}.40"}}, "connections": {{}}}}'.format(
+                 b, r, 10 + b) for b in range(blocks) for r in range(BLOCK_COPIES)]
+    f.write(",\n".join(insts))
+    f.write("\n      }\n    }\n  }\n}\n")
+    return _finish(tmp, f, path)
+
+
+# ==============================================================================
+# Liberty
+# ==============================================================================
+
+_INDEX = '"0.005, 0.01, 0.02, 0.04, 0.08, 0.16, 0.32"'
+_FUNCTIONS = {"INV_X1": "!A", "BUF_X1": "A", "NAND2_X1": "!(A1 & A2)", "NOR2_X1": "!(A1 | A2)",
+              "AOI21_X1": "!(A | (B1 & B2))", "OAI21_X1": "!(A & (B1 | B2))",
+              "XOR2_X1": "(A ^ B)", "DFF_X1": "IQ"}
+
+
+def write_liberty(cells, path, seed=1):
+    """
+    cells cells in a NLDM library with 7x7 tables. One in eight output pins
+    has an unquoted ': !expr ;' function and every input an 'original_pin'
+    attribute, the two constructs preprocessLib.py rewrites.
+    """
+    rng = random.Random(seed).random
+    tmp, f = _atomic_writer(path)
+    f.write("library (bench_lib) {{\n  delay_model : table_lookup ;\n"
+            "  time_unit : \"1ns\" ;\n  capacitive_load_unit (1, ff) ;\n"
+            "  lu_table_template (delay_7x7) {{\n"
+            "    variable_1 : input_net_transition ;\n"
+            "    variable_2 : total_output_net_capacitance ;\n"
+            "    index_1 ({0}) ;\n    index_2 ({0}) ;\n  }}\n".format(_INDEX))
+    for c in range(cells):
+        master, inputs, output = CELLS[c % len(CELLS)]
+        name = "{}_{}".format(master[:-3], c) + master[-3:]
+        f.write("  cell ({}) {{\n    area : {:.4f} ;\n".format(name, 0.5 + rng() * 4))
+        for pin in inputs:
+            f.write("    pin ({0}) {{\n      direction : input ;\n"
+                    "      capacitance : {1:.6f} ;\n      original_pin : {0} ;\n"
+                    "    }}\n".format(pin, 0.5 + rng() * 2))
+        function = _FUNCTIONS[master]
+        if c % 8 == 0 and function.startswith("!"):
+            function_line = "function : {} ;".format(function)
+        else:
+            function_line = 'function : "{}" ;'.format(function)
+        f.write("    pin ({}) {{\n      direction : output ;\n      {}\n".format(
+            output, function_line))
+        for pin in inputs:
+            f.write('      timing () {{\n        related_pin : "{}" ;\n'.format(pin))
+            for table in ("cell_rise", "cell_fall", "rise_transition", "fall_transition"):
+                f.write("        {} (delay_7x7) {{\n          index_1 ({}) ;\n"
+                        "          index_2 ({}) ;\n          values ( \\\n".format(
+                            table, _INDEX, _INDEX))
+                rows = ['            "' + ", ".join("{:.6f}".format(0.01 + rng() * 0.2)
+                                                   for _ in range(7)) + '"'
+                        for _ in range(7)]
+                f.write(", \\\n".join(rows) + " \\\n          ) ;\n        }\n")
+            f.write("      }\n")
+        f.write("    }\n  }\n")
+    f.write("}\n")
+    return _finish(tmp, f, path)
+
+
+# ==============================================================================
+# Tech LEF
+# ==============================================================================
+
+
+def _lef_layer(f, name, width, pitch, direction):
+    f.write("LAYER {}\n  TYPE ROUTING ;\n  DIRECTION {} ;\n  PITCH {} ;\n"
+            "  WIDTH {} ;\n  SPACING {} ;\nEND {}\n\n".format(
+                name, direction, pitch, width, width, name))
+
+
+def _lef_cut(f, name, width):
+    f.write("LAYER {0}\n  TYPE CUT ;\n  SPACING {1} ;\n  WIDTH {1} ;\nEND {0}\n\n".format(
+        name, width))
+
+
+def _lef_via(f, name, cut, below, above, half):
+    f.write("VIA {} DEFAULT\n  LAYER {} ;\n    RECT {} {} {} {} ;\n".format(
+        name, cut, -half, -half, half, half))
+    for layer in (below, above):
+        f.write("  LAYER {} ;\n    RECT {} {} {} {} ;\n".format(
+            layer, -2 * half, -half, 2 * half, half))
+    f.write("END {}\n".format(name))
+
+
+def write_tech_lef(vias, path, metals=10):
+    """
+    A face-to-face stack M1..M<metals>, hb_layer, M<metals-1>_m..M1_m in the
+    layout of the platform tech LEFs, padded with vias generic VIA definitions
+    split around the hb_layer vias, hb_layerArray-0 and the SAMENET table.
+    """
+    upper = ["M{}_m".format(m) for m in range(metals - 1, 0, -1)]
+    stack = ["M{}".format(m) for m in range(1, metals + 1)] + upper
+    top = len(stack) - 1
+    # cut between stack[j] and stack[j + 1]; hb_layer bonds M<metals> to the upper tier
+    cut_names = ["via{}".format(j + 1) if j < metals - 1 else
+                 "hb_layer" if j == metals - 1 else "via{}_m".format(top - j)
+                 for j in range(top)]
+    tmp, f = _atomic_writer(path)
+    f.write("VERSION 5.8 ;\nBUSBITCHARS \"[]\" ;\nDIVIDERCHAR \"/\" ;\n\n"
+            "UNITS\n  DATABASE MICRONS {} ;\nEND UNITS\n\n"
+            "MANUFACTURINGGRID 0.005 ;\n\n".format(DBU))
+    for j, name in enumerate(stack):
+        width = 0.07 * (1 + min(j, top - j) // 2)
+        _lef_layer(f, name, round(width, 3), round(2 * width, 3),
+                   "HORIZONTAL" if j % 2 == 0 else "VERTICAL")
+        if j < top:
+            _lef_cut(f, cut_names[j], 0.5 if j == metals - 1 else round(width, 3))
+    cuts = [(cut_names[j], stack[j], stack[j + 1]) for j in range(top) if j != metals - 1]
+    per_cut = max(1, vias // len(cuts))
+    for ci, (cut, below, above) in enumerate(cuts):
+        if ci == len(cuts) // 2:
+            f.write("\n# hb_layer via\n")
+            for v in range(9):
+                _lef_via(f, "hb_layer_{}".format(v), "hb_layer", "M{}".format(metals),
+                         upper[0], 0.25)
+            f.write("# hb_layer end\n\n")
+        for v in range(per_cut):
+            _lef_via(f, "{}_{}".format(cut, v), cut, below, above,
+                     round(0.035 * (1 + v % 4), 4))
+    f.write("\nVIARULE hb_layerArray-0 GENERATE\n  LAYER M{} ;\n    ENCLOSURE 0 0 ;\n"
+            "  LAYER {} ;\n    ENCLOSURE 0 0 ;\n  LAYER hb_layer ;\n"
+            "    RECT -0.25 -0.25 0.25 0.25 ;\n    SPACING 1.05 BY 1.05 ;\n"
+            "END hb_layerArray-0\n\nSPACING\n".format(metals, upper[0]))
+    for name in stack:
+        f.write("  SAMENET {0} {0} 0.07 ;\n".format(name))
+    f.write("  SAMENET hb_layer hb_layer 0.55 ;\nEND SPACING\n\nEND LIBRARY\n")
+    return _finish(tmp, f, path)
+
+
+# ==============================================================================
+# genMetrics.py inputs
+# ==============================================================================
+
+GNU_TIME_LOGS = ("1_2_yosys", "2_1_floorplan", "2_2_floorplan_io", "2_3_floorplan_macro",
+                 "2_4_floorplan_tapcell", "2_5_floorplan_pdn", "3_1_place_gp_skip_io",
+                 "3_2_place_iop", "3_3_place_gp", "3_4_place_resized", "3_5_place_dp",
+                 "4_1_cts", "5_1_grt", "5_2_fillcell", "5_3_route", "6_1_merge", "6_report")
+METRIC_JSONS = ("2_1_floorplan", "3_3_place_gp", "3_4_place_resized", "4_1_cts",
+                "5_1_grt", "6_report")
+
+
+def write_metrics_tree(lines, root, seed=1):
+    """
+    logs/, reports/ and results/ of a finished run with lines log lines in
+    total: flow-like [INFO] chatter ending in the GNU time line of every
+    stage, the stage metric JSONs, synth_stat.txt, 6_finish.rpt and the SDC.
+    """
+    rng = random.Random(seed).random
+    dirs = {d: os.path.join(root, d) for d in ("logs", "reports", "results")}
+    for d in dirs.values():
+        os.makedirs(d, exist_ok=True)
+    per_log = max(1, lines // len(GNU_TIME_LOGS))
+    for stage in GNU_TIME_LOGS:
+        tmp, f = _atomic_writer(os.path.join(dirs["logs"], stage + ".log"))
+        for j in range(per_log):
+            if j % 5 == 0:
+                f.write("[INFO GRT-0096] Final congestion report: layer M{} usage {:.2f}%\n".format(
+                    1 + j % 9, rng() * 100))
+            else:
+                f.write("[INFO RSZ-0039] Resized {} instances, inserted {} buffers.\n".format(
+                    int(rng() * 1000), int(rng() * 100)))
+        if stage == "5_1_grt":
+            f.write("[INFO FLW-0007] Clock core_clock slack {:.4f}\n".format(rng() - 0.5))
+        f.write("Elapsed time: 0:{:05.2f}[h:]min:sec. CPU time: user {:.2f} sys {:.2f} ({}%). "
+                "Peak memory: {}KB.\n".format(rng() * 59, rng() * 50, rng(), 99,
+                                               int(rng() * 4e6)))
+        _finish(tmp, f, os.path.join(dirs["logs"], stage + ".log"))
+    for stage in METRIC_JSONS:
+        prefix = stage.split("_", 2)[2] if stage.count("_") > 1 else stage
+        metrics = {"{}__metric__m{}".format(prefix, k): round(rng() * 1e3, 4)
+                   for k in range(max(10, lines // 1000))}
+        with open(os.path.join(dirs["logs"], stage + ".json"), "w") as f:
+            json.dump(metrics, f, indent=2)
+    with open(os.path.join(dirs["reports"], "synth_stat.txt"), "w") as f:
+        f.write("=== top ===\n\n   Number of wires: {0}\n     {0}  {1:.3f} cells\n\n"
+                "   Chip area for module '\\top': {1:.3f}\n".format(lines, lines * 1.2))
+    with open(os.path.join(dirs["reports"], "6_finish.rpt"), "w") as f:
+        f.write("finish slack div critical path delay\n------------\n{:.4f}\n".format(rng()))
+    with open(os.path.join(dirs["results"], "2_floorplan.sdc"), "w") as f:
+        f.write("create_clock -name core_clock -period 400 [get_ports clk]\n")
+    return root
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+
+# This script benchmarks the Python tools of the flow on synthetic inputs of
+# growing size (bench/generators.py): throughput (instances, cells, log lines
+# or vias per second, and MB/s of input) and peak RSS of every tool run as a
+# subprocess, the way the Makefile runs it. Results are compared against a
+# JSON baseline so a change that makes a tool slower or hungrier shows up
+# before it reaches a 10M-instance design.
+#
+#   python3 -m bench run --sizes 10k,100k                  (compare with baseline)
+#   python3 -m bench run --sizes 10k,100k,1M --save        (record the baseline)
+#   python3 -m bench generate --sizes 10M --out /scratch/bench
+#
+# Inputs are generated once per size and seed under --work and reused. Wall
+# time is the best of --repeat runs, peak RSS the largest; a tool regresses
+# when either grows by more than its tolerance over the baseline. Baselines
+# are per machine: they record the host and Python they were taken on.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from bench import generators as gen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "bench")
+INPUTS_VERSION = 1  # bump when the generators change their output
+
+# tool: (script, unit, items per instance of the size)
+TOOLS = {
+    "generate_3d_views": ("scripts_openroad/generate_3d_views.py", "inst", 1.0),
+    "genMetrics": ("util/genMetrics.py", "line", 1.0),
+    "preprocessLib": ("util/preprocessLib.py", "cell", 0.01),
+    "mem_dump": ("scripts_openroad/mem_dump.py", "cell", 1.0),
+    "generate_different_pitchlef": ("test/generate_different_pitchlef.py", "via", 0.01),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Throughput and peak RSS of the flow's Python tools on synthetic inputs"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("run", "generate"):
+        p = sub.add_parser(name)
+        p.add_argument("--sizes", default="10k,100k",
+                       help="Comma separated instance counts, k/M suffixes allowed")
+        p.add_argument("--tools", default="all",
+                       help="Comma separated subset of: {}".format(", ".join(TOOLS)))
+        p.add_argument("--seed", type=int, default=1)
+        p.add_argument("--work", default=os.path.join(BENCH_DIR, "work"),
+                       help="Directory for generated inputs and tool outputs")
+    p = sub.choices["generate"]
+    p.add_argument("--out", default=None, help="Write the inputs here instead of --work")
+    p = sub.choices["run"]
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--timeout", type=float, default=1800.0,
+                   help="Seconds before a tool run is killed and reported as a timeout")
+    p.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"))
+    p.add_argument("--save", action="store_true",
+                   help="Merge the results into the baseline instead of comparing")
+    p.add_argument("--output", default=None, help="Also write the results JSON here")
+    p.add_argument("--time-tolerance", type=float, default=0.15,
+                   help="Allowed relative wall time growth")
+    p.add_argument("--rss-tolerance", type=float, default=0.10,
+                   help="Allowed relative peak RSS growth")
+    p.add_argument("--min-time", type=float, default=0.05,
+                   help="Wall time differences below this many seconds are noise")
+    return parser.parse_args()
+
+
+def _select_tools(spec):
+    if spec == "all":
+        return list(TOOLS)
+    tools = [t.strip() for t in spec.split(",") if t.strip()]
+    unknown = [t for t in tools if t not in TOOLS]
+    if unknown:
+        sys.exit("[ERROR] unknown tool(s): {}".format(", ".join(unknown)))
+    return tools
+
+
+# ==============================================================================
+# Inputs
+# ==============================================================================
+
+
+def input_dir(work, n, seed):
+    return os.path.join(work, "v{}-s{}-n{}".format(INPUTS_VERSION, seed, gen.format_size(n)))
+
+
+def _ensure(path, make):
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        make(path)
+        print("[GEN] {} ({:.1f}s)".format(path, time.perf_counter() - t0), flush=True)
+    return path
+
+
+def prepare_inputs(tool, directory, n, seed):
+    """Generate (once) what tool reads; returns {role: path}."""
+    os.makedirs(directory, exist_ok=True)
+    netlist = gen.Netlist(n, seed)
+    j = lambda name: os.path.join(directory, name)  # noqa: E731
+    if tool == "generate_3d_views":
+        return {
+            "def": _ensure(j("2_2_floorplan_io.def"), lambda p: gen.write_def(netlist, p)),
+            "verilog": _ensure(j("1_synth.v"), lambda p: gen.write_verilog(netlist, p)),
+            "partition": _ensure(j("partition.txt"), lambda p: gen.write_partition(netlist, p)),
+            "map": _ensure(j("map.json"), gen.write_cell_map),
+        }
+    if tool == "genMetrics":
+        root = j("metrics")
+        stamp = os.path.join(root, "results", "2_floorplan.sdc")  # written last
+        if not os.path.exists(stamp):
+            _ensure(root, lambda p: gen.write_metrics_tree(n, p, seed))
+        return {"root": root}
+    if tool == "preprocessLib":
+        cells = max(1, int(n * TOOLS[tool][2]))
+        return {"lib": _ensure(j("bench.lib"), lambda p: gen.write_liberty(cells, p, seed))}
+    if tool == "mem_dump":
+        return {"json": _ensure(j("synth.json"), lambda p: gen.write_yosys_json(n, p, seed))}
+    vias = max(1, int(n * TOOLS[tool][2]))
+    return {"lef": _ensure(j("bench.tech.lef"), lambda p: gen.write_tech_lef(vias, p))}
+
+
+def _metrics_fixture(directory):
+    """genMetrics.py asks '$OPENROAD_EXE -version'; answer without an OpenROAD install."""
+    exe = os.path.join(directory, "openroad-version")
+    if not os.path.exists(exe):
+        with open(exe, "w") as f:
+            f.write("#!/bin/sh\necho bench-version 0000000\n")
+        os.chmod(exe, 0o755)
+    return exe
+
+
+def tool_command(tool, inputs, out_dir):
+    """(argv, extra env) of one run of tool writing below out_dir."""
+    script = os.path.join(ROOT, TOOLS[tool][0])
+    py = sys.executable
+    if tool == "generate_3d_views":
+        return [py, script, "--def-in", inputs["def"], "--v-in", inputs["verilog"],
+                "--partition", inputs["partition"], "--cell-map", inputs["map"],
+                "--def-out", os.path.join(out_dir, "3D.def"),
+                "--v-out", os.path.join(out_dir, "3D.v")], {}
+    if tool == "genMetrics":
+        root = inputs["root"]
+        return [py, script, "-d", "bench", "-p", "bench", "-x",
+                "-o", os.path.join(out_dir, "metadata.json"),
+                "--logs", os.path.join(root, "logs"),
+                "--reports", os.path.join(root, "reports"),
+                "--results", os.path.join(root, "results")], \
+            {"OPENROAD_EXE": _metrics_fixture(root)}
+    if tool == "preprocessLib":
+        return [py, script, "-i", inputs["lib"], "-o", os.path.join(out_dir, "bench.lib")], {}
+    if tool == "mem_dump":
+        return [py, script, inputs["json"]], {}
+    return [py, script, "-i", inputs["lef"], "-o", out_dir,
+            "--pmax", "1.0", "--pmin", "0.2", "--pstep", "0.1"], {}
+
+
+def _input_bytes(inputs):
+    total = 0
+    for path in inputs.values():
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        else:
+            total += os.path.getsize(path)
+    return total
+
+
+# ==============================================================================
+# Measurement
+# ==============================================================================
+
+
+def measure(argv, env, cwd, log_path, timeout):
+    """Run argv; returns (rc, wall s, user s, sys s, peak RSS KB, timed out)."""
+    with open(log_path, "w") as log:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        expired = threading.Event()
+
+        def kill():
+            expired.set()
+            proc.send_signal(signal.SIGKILL)
+
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            # wait4 reports the rusage of this child alone, unlike RUSAGE_CHILDREN
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            if timer:
+                timer.cancel()
+        wall = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    return (proc.returncode, wall, usage.ru_utime, usage.ru_stime, usage.ru_maxrss,
+            expired.is_set())
+
+
+def bench_tool(tool, n, args):
+    directory = input_dir(args.work, n, args.seed)
+    inputs = prepare_inputs(tool, directory, n, args.seed)
+    out_dir = os.path.join(directory, "out", tool)
+    os.makedirs(out_dir, exist_ok=True)
+    argv, extra = tool_command(tool, inputs, out_dir)
+    env = dict(os.environ)
+    env.update(extra)
+    env.pop("PLATFORM_DIR", None)
+    items = max(1, int(n * TOOLS[tool][2]))
+    size = _input_bytes(inputs)
+
+    runs = []
+    for r in range(args.repeat):
+        rc, wall, user, system, rss, timed_out = measure(
+            argv, env, out_dir, os.path.join(out_dir, "run{}.log".format(r)), args.timeout)
+        if timed_out or rc != 0:
+            status = "timeout" if timed_out else "error"
+            print("[WARN] {}@{}: {} (rc {}), see {}".format(
+                tool, gen.format_size(n), status, rc, os.path.join(out_dir, "run{}.log".format(r))))
+            return {"status": status, "rc": rc, "wall_s": round(wall, 3)}
+        runs.append((wall, user + system, rss))
+    wall = min(r[0] for r in runs)
+    return {
+        "status": "ok",
+        "items": items,
+        "unit": TOOLS[tool][1],
+        "input_mb": round(size / 1e6, 3),
+        "wall_s": round(wall, 4),
+        "cpu_s": round(min(r[1] for r in runs), 4),
+        "peak_rss_kb": max(r[2] for r in runs),
+        "items_per_s": round(items / wall, 1),
+        "mb_per_s": round(size / 1e6 / wall, 3),
+        "repeat": len(runs),
+    }
+
+
+# ==============================================================================
+# Baseline
+# ==============================================================================
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(results, baseline, args):
+    """Print a table against the baseline; returns the regressed keys."""
+    regressions = []
+    base = baseline.get("results", {}) if baseline else {}
+    fmt = "{:<36} {:>9} {:>9} {:>7}  {:>10} {:>10} {:>7}  {}"
+    print(fmt.format("tool@size", "wall s", "base", "delta", "rss MB", "base", "delta", ""))
+    for key in sorted(results, key=lambda k: (k.split("@")[0], gen.parse_size(k.split("@")[1]))):
+        cur, ref = results[key], base.get(key)
+        verdict = ""
+        if cur["status"] != "ok":
+            verdict = cur["status"].upper()
+            if ref and ref.get("status") == "ok":
+                regressions.append(key)
+        if cur["status"] != "ok" or not ref or ref.get("status") != "ok":
+            ref_wall = "{:.3f}".format(ref["wall_s"]) if ref and "wall_s" in ref else "-"
+            print(fmt.format(key, "{:.3f}".format(cur["wall_s"]), ref_wall, "", "-", "-", "",
+                             verdict or ("new" if not ref else "")))
+            continue
+        dt = cur["wall_s"] / ref["wall_s"] - 1 if ref["wall_s"] else 0.0
+        dr = cur["peak_rss_kb"] / ref["peak_rss_kb"] - 1 if ref["peak_rss_kb"] else 0.0
+        slow = dt > args.time_tolerance and cur["wall_s"] - ref["wall_s"] > args.min_time
+        fat = dr > args.rss_tolerance
+        if slow or fat:
+            regressions.append(key)
+            verdict = "REGRESSION ({})".format("+".join(
+                w for w, bad in (("time", slow), ("rss", fat)) if bad))
+        print(fmt.format(key, "{:.3f}".format(cur["wall_s"]), "{:.3f}".format(ref["wall_s"]),
+                         "{:+.0%}".format(dt), "{:.1f}".format(cur["peak_rss_kb"] / 1024.0),
+                         "{:.1f}".format(ref["peak_rss_kb"] / 1024.0), "{:+.0%}".format(dr),
+                         verdict))
+    return regressions
+
+
+def _environment():
+    return {"host": socket.gethostname(), "python": platform.python_version(),
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def run(args):
+    sizes = [gen.parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    results = {}
+    for tool in _select_tools(args.tools):
+        for n in sizes:
+            key = "{}@{}".format(tool, gen.format_size(n))
+            results[key] = bench_tool(tool, n, args)
+            res = results[key]
+            if res["status"] == "ok":
+                print("[BENCH] {:<36} {:>8.3f}s {:>12.1f} {}/s {:>8.1f} MB/s {:>8.1f} MB RSS".format(
+                    key, res["wall_s"], res["items_per_s"], res["unit"], res["mb_per_s"],
+                    res["peak_rss_kb"] / 1024.0), flush=True)
+    doc = {"environment": _environment(), "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+           "seed": args.seed, "inputs_version": INPUTS_VERSION, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(doc, f, indent=2, sort_keys=True)
+
+    baseline = _load(args.baseline)
+    if args.save:
+        merged = baseline if baseline and baseline.get("inputs_version") == INPUTS_VERSION else {}
+        merged.update({k: v for k, v in doc.items() if k != "results"})
+        merged.setdefault("results", {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print("[INFO] baseline written to {}".format(args.baseline))
+        return 0
+    if baseline is None:
+        print("[INFO] no baseline at {}; record one with --save".format(args.baseline))
+        compare(results, None, args)
+        return 0
+    if baseline.get("inputs_version") != INPUTS_VERSION or baseline.get("seed") != args.seed:
+        print("[WARN] baseline was taken on other inputs (version/seed); record it again")
+    if baseline.get("environment", {}).get("host") != _environment()["host"]:
+        print("[WARN] baseline was taken on {}, timings are not comparable".format(
+            baseline.get("environment", {}).get("host")))
+    regressions = compare(results, baseline, args)
+    if regressions:
+        print("[ERROR] {} regression(s): {}".format(len(regressions), ", ".join(regressions)))
+        return 1
+    return 0
+
+
+def generate(args):
+    work = args.out or args.work
+    for n in (gen.parse_size(s) for s in args.sizes.split(",") if s.strip()):
+        for tool in _select_tools(args.tools):
+            prepare_inputs(tool, input_dir(work, n, args.seed), n, args.seed)
+    return 0
+
+
+def main():
+    args = parse_args()
+    return run(args) if args.cmd == "run" else generate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Worker agent for `run_experiments.py --agent ...`.
+
+Each node runs one agent next to its checkout. The agent sources env.sh once,
+listens on a Unix socket (default, owner-only) or a TCP port and executes the
+run.sh/eval.sh units the coordinator assigns to it, streaming their output
+back as JSON lines; logs are written on the coordinator side only.
+
+A TCP agent requires a shared token (--token-file, the same file as the
+coordinator's --agent-token-file). Every path of a unit must resolve inside
+--repo-root and its environment may only set the keys the coordinator sends
+(sweep knobs, WORK_HOME, NUM_CORES, FLOW_*), plus --allow-env names for
+custom sweep axes.
+
+    python3 run_agent.py --slots 2                       (unix:/tmp/pin3d-agent.<uid>.sock)
+    python3 run_agent.py --listen 0.0.0.0:7301 --token-file ~/.pin3d-agent.token --slots 8
+"""
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import secrets
+import signal
+import socket
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional
+
+from run_experiments import (
+    _ACTIVE_PGIDS,
+    _LOG_CHUNK,
+    SWEEP_AXES,
+    _agent_mac,
+    _fork_work_home,
+    _kill_all_groups,
+    _load_env_from_script,
+    _parse_agent_addr,
+    _read_token,
+    _reset_shim_state,
+    _resume_env,
+    _terminate,
+)
+
+
+# Environment keys a coordinator sets on a unit (run_experiments._stage_overrides,
+# retries and telemetry); anything else (BASH_ENV, LD_PRELOAD, PATH, ...) is refused.
+UNIT_ENV_KEYS = frozenset(
+    {"WORK_HOME", "NUM_CORES", "FLOW_START_AT", "FLOW_STOP_BEFORE", "FLOW_FAIL_FAST",
+     "FLOW_TELEMETRY"}
+    | {spec.partition("=")[0] for specs, _ in SWEEP_AXES.values() for spec in specs})
+
+
+class Agent:
+
+    def __init__(self, repo_root: Path, slots: int, env: Dict[str, str],
+                 token: Optional[bytes] = None,
+                 env_keys: FrozenSet[str] = UNIT_ENV_KEYS):
+        self.repo_root = repo_root
+        self.slots = slots
+        self.env = env
+        self.token = token
+        self.env_keys = env_keys
+        self.sem = asyncio.Semaphore(slots)
+        self.host = socket.gethostname()
+
+    def _inside(self, path: str, allow_root: bool = False) -> Path:
+        """path (relative to repo_root) resolved; ValueError when it leaves repo_root."""
+        resolved = (self.repo_root / path).resolve()
+        if resolved == self.repo_root and allow_root:
+            return resolved
+        if self.repo_root not in resolved.parents:
+            raise ValueError(f"path outside {self.repo_root}: {path}")
+        return resolved
+
+    def _unit(self, msg: dict):
+        """(script, env overrides, log, fork_from, work_home) of a run message, checked."""
+        overrides = {str(k): str(v) for k, v in (msg.get("env") or {}).items()}
+        refused = sorted(k for k in overrides if k not in self.env_keys)
+        if refused:
+            raise ValueError(f"environment not allowed: {', '.join(refused)}")
+        if "WORK_HOME" in overrides:
+            self._inside(overrides["WORK_HOME"], allow_root=True)
+        script = self._inside(msg["script"])
+        log = self._inside(msg["log"]) if msg.get("log") else None
+        fork_from = work_home = None
+        if msg.get("fork_from"):
+            fork_from = self._inside(msg["fork_from"])
+            work_home = self._inside(msg.get("work_home") or "")
+        return script, overrides, log, fork_from, work_home
+
+    async def _authenticate(self, reader: asyncio.StreamReader, send) -> bool:
+        if self.token is None:
+            return True
+        nonce = secrets.token_hex(16)
+        await send({"op": "challenge", "nonce": nonce})
+        try:
+            msg = json.loads(await reader.readline() or b"{}")
+        except ValueError:
+            return False
+        mac = msg.get("mac") if msg.get("op") == "auth" else None
+        return isinstance(mac, str) and secrets.compare_digest(
+            mac, _agent_mac(self.token, nonce))
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        wlock = asyncio.Lock()
+        procs: Dict[int, "asyncio.subprocess.Process"] = {}
+        units = set()
+
+        async def send(msg: dict) -> None:
+            async with wlock:
+                writer.write((json.dumps(msg) + "\n").encode())
+                await writer.drain()
+
+        try:
+            if not await self._authenticate(reader, send):
+                print("[AGENT] rejected a connection without a valid token", flush=True)
+                writer.close()
+                return
+        except (OSError, ConnectionError):
+            writer.close()
+            return
+        await send({"op": "hello", "host": self.host, "slots": self.slots})
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                if msg.get("op") == "run":
+                    unit = asyncio.ensure_future(self._run(msg, send, procs))
+                    units.add(unit)
+                    unit.add_done_callback(units.discard)
+                elif msg.get("op") == "cancel":
+                    proc = procs.get(msg.get("id"))
+                    if proc is not None:
+                        asyncio.ensure_future(_terminate(proc))
+        except (OSError, ValueError):
+            pass
+        finally:
+            # Coordinator gone: do not leave orphaned flows behind. Completed
+            # stages keep their markers, so a --resume rerun continues.
+            for unit in list(units):
+                unit.cancel()
+            if units:
+                await asyncio.gather(*units, return_exceptions=True)
+            writer.close()
+
+    async def _run(self, msg: dict, send, procs) -> None:
+        uid = msg["id"]
+        try:
+            script, overrides, log, fork_from, work_home = self._unit(msg)
+            if msg.get("shim") and log is None:
+                raise ValueError("shimmed unit without a log path")
+        except (KeyError, ValueError) as e:
+            await send({"op": "log", "id": uid,
+                        "data": f"[AGENT {self.host}] refused: {e}\n"})
+            await send({"op": "exit", "id": uid, "rc": 126})
+            return
+        env = dict(self.env)
+        env.update(overrides)
+        if msg.get("shim"):
+            state_path = _reset_shim_state(log)
+            env = _resume_env(env, state_path, bool(msg.get("resume")))
+
+        async with self.sem:
+            if not script.exists():
+                await send({"op": "log", "id": uid,
+                            "data": f"[AGENT {self.host}] not found: {script}\n"})
+                await send({"op": "exit", "id": uid, "rc": 127})
+                return
+            if fork_from is not None:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, _fork_work_home, fork_from, work_home,
+                        bool(msg.get("resume")))
+                except OSError as e:
+                    await send({"op": "log", "id": uid,
+                                "data": f"[AGENT {self.host}] fork failed: {e}\n"})
+                    await send({"op": "exit", "id": uid, "rc": 1})
+                    return
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            proc = await asyncio.create_subprocess_exec(
+                "bash", str(script),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=str(self.repo_root),
+                env=env,
+                start_new_session=True,
+            )
+            procs[uid] = proc
+            _ACTIVE_PGIDS.add(proc.pid)
+            try:
+                await send({"op": "start", "id": uid, "pid": proc.pid})
+                while True:
+                    chunk = await proc.stdout.read(_LOG_CHUNK)
+                    if not chunk:
+                        break
+                    await send({"op": "log", "id": uid, "data": decoder.decode(chunk)})
+                rc = await proc.wait()
+            except BaseException:
+                await asyncio.shield(_terminate(proc))
+                raise
+            finally:
+                procs.pop(uid, None)
+                _ACTIVE_PGIDS.discard(proc.pid)
+            tail = decoder.decode(b"", final=True)
+            try:
+                if tail:
+                    await send({"op": "log", "id": uid, "data": tail})
+                await send({"op": "exit", "id": uid, "rc": rc})
+            except (OSError, ConnectionError):
+                pass
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Worker agent executing run_experiments.py units.")
+    p.add_argument(
+        "--listen",
+        default=f"unix:/tmp/pin3d-agent.{os.getuid()}.sock",
+        help="unix:/path or host:port; TCP requires --token-file "
+        "(default: unix:/tmp/pin3d-agent.<uid>.sock).",
+    )
+    p.add_argument(
+        "--token-file",
+        default=None,
+        help="Shared secret a coordinator must prove (run_experiments.py "
+        "--agent-token-file).",
+    )
+    p.add_argument(
+        "--allow-env",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Extra environment key units may set (custom --sweep axes). Repeatable.",
+    )
+    p.add_argument(
+        "--slots",
+        type=int,
+        default=os.cpu_count() // 8 or 1,
+        help="Concurrent flows on this node (default: cores/8).",
+    )
+    p.add_argument(
+        "--repo-root",
+        default=str(Path(__file__).resolve().parent),
+        help="Local checkout holding env.sh and test/ (default: script dir).",
+    )
+    return p.parse_args()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    repo_root = Path(args.repo_root).resolve()
+    addr = _parse_agent_addr(args.listen)
+    token = _read_token(args.token_file)
+    if addr[0] == "tcp" and token is None:
+        raise SystemExit("[AGENT] ERROR: a TCP agent requires --token-file")
+    env = _load_env_from_script(repo_root / "env.sh")
+    agent = Agent(repo_root, max(1, args.slots), env, token,
+                  UNIT_ENV_KEYS | frozenset(args.allow_env))
+    if addr[0] == "unix":
+        try:
+            os.unlink(addr[1])
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(agent.handle, addr[1])
+        finally:
+            os.umask(old_umask)
+    else:
+        server = await asyncio.start_server(agent.handle, addr[1], addr[2])
+    print(f"[AGENT] {agent.host} listening on {args.listen} slots={agent.slots} "
+          f"repo_root={repo_root}", flush=True)
+
+    stop = asyncio.get_running_loop().create_future()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(
+            sig, lambda: stop.done() or stop.set_result(None))
+    async with server:
+        await stop
+    _kill_all_groups(signal.SIGKILL)
+
+
+def main() -> int:
+    asyncio.run(serve(parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
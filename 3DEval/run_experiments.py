@@ -1,80 +1,109 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import hashlib
+import hmac
+import importlib
+import itertools
+import json
 import os
+import random
+import re
+import shutil
 import signal
 import socket
 import subprocess
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from dataclasses import dataclass
+import time
+from collections import deque
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import (Callable, Deque, Dict, Iterable, List, Optional, Sequence,
+                    Set, Tuple)
 
 # ==============================================================================
-# Safety: signals + process-group kill
+# Safety: process groups + cancellation
 # ==============================================================================
 
+# Process groups of all running run.sh/eval.sh commands, so an interrupt can
+# take down every flow tree, not just the bash at its root.
+_ACTIVE_PGIDS: Set[int] = set()
 
-def _install_signal_handlers():
-    """Install signal handlers so that SIGINT/SIGTERM raise KeyboardInterrupt."""
+# Variables sourcing env.sh adds or changes, per orchestrator run, keyed by
+# _env_snapshot_key().
+_ENV_SNAPSHOTS: Dict[str, Dict[str, str]] = {}
 
-    def _handler(signum, frame):
-        raise KeyboardInterrupt()
+_KILL_GRACE_S = 10.0
+_LOG_CHUNK = 1 << 16
+
+
+def _kill_group(pid: int, sig: int) -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(pid, sig)
+        else:
+            os.kill(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
 
-    for sig in (signal.SIGINT, signal.SIGTERM):
-        try:
-            signal.signal(sig, _handler)
-        except Exception:
-            pass
 
+def _kill_all_groups(sig: int = signal.SIGTERM) -> None:
+    for pgid in list(_ACTIVE_PGIDS):
+        _kill_group(pgid, sig)
 
-def _run_command_with_log(
+
+async def _terminate(proc: "asyncio.subprocess.Process") -> None:
+    """SIGTERM the process group, escalate to SIGKILL after a grace period."""
+    _kill_group(proc.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=_KILL_GRACE_S)
+    except asyncio.TimeoutError:
+        _kill_group(proc.pid, signal.SIGKILL)
+        await proc.wait()
+
+
+async def _run_command_with_log(
     cmd: Sequence[str],
     log_path: Path,
     cwd: Optional[Path] = None,
     env: Optional[dict] = None,
-):
+    append: bool = False,
+    on_start: Optional[Callable[[int], None]] = None,
+) -> None:
     """
-    Run a command, redirect stdout/stderr to log_path.
-    Start a new process group so we can kill the whole tree via killpg on interrupt.
+    Run a command in its own process group and stream stdout/stderr into
+    log_path chunk by chunk. On cancellation the whole group is killed.
+    Raises subprocess.CalledProcessError on a non-zero exit.
     """
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # 兼容性处理：Windows/非POSIX环境没有 os.setsid
-    preexec = getattr(os, "setsid", None)
-
-    with open(log_path, "w") as log_file:
-        proc = subprocess.Popen(
-            list(cmd),
-            stdout=log_file,
-            stderr=subprocess.STDOUT,
+    with open(log_path, "ab" if append else "wb") as log_file:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
             cwd=str(cwd) if cwd else None,
-            preexec_fn=preexec,
             env=env,
+            start_new_session=True,
         )
-
+        _ACTIVE_PGIDS.add(proc.pid)
+        if on_start is not None:
+            on_start(proc.pid)
         try:
-            ret = proc.wait()
-            if ret != 0:
-                raise subprocess.CalledProcessError(ret, list(cmd))
-        except KeyboardInterrupt:
-            try:
-                if preexec and hasattr(os, "killpg"):
-                    os.killpg(proc.pid, signal.SIGTERM)
-                else:
-                    proc.terminate()
-            except Exception:
-                pass
-            raise
-        except Exception:
-            try:
-                if preexec and hasattr(os, "killpg"):
-                    os.killpg(proc.pid, signal.SIGTERM)
-                else:
-                    proc.terminate()
-            except Exception:
-                pass
+            while True:
+                chunk = await proc.stdout.read(_LOG_CHUNK)
+                if not chunk:
+                    break
+                log_file.write(chunk)
+                log_file.flush()
+            ret = await proc.wait()
+        except BaseException:
+            await asyncio.shield(_terminate(proc))
             raise
+        finally:
+            _ACTIVE_PGIDS.discard(proc.pid)
+    if ret != 0:
+        raise subprocess.CalledProcessError(ret, list(cmd))
 
 
 # ==============================================================================
@@ -90,12 +119,27 @@ class RunConfig:
     repo_root: Path  # local repo root (where test/ exists)
     do_run: bool
     do_eval: bool
+    resume: bool = False  # skip stages with completion markers (util/shim/make)
+    # ---- sweep points (see build_tasks) ----
+    point: str = ""  # e.g. "hbPitch_0p4__CLK_PERIOD_400"; "" outside sweeps
+    knobs: Tuple[Tuple[str, str], ...] = ()  # env overrides of the point
+    work_home: Optional[Path] = None  # isolated WORK_HOME, relative to repo_root
+    fork_from: Optional[Path] = None  # WORK_HOME of the shared-prefix run
+    start_at: str = ""  # FLOW_START_AT: first stage not covered by the prefix
+    stop_before: str = ""  # FLOW_STOP_BEFORE: the prefix run ends here
+
+    @property
+    def tag(self) -> str:
+        base = f"{self.flow}/{self.tech}/{self.case}"
+        return f"{base}@{self.point}" if self.point else base
 
 
-def _log_paths(flow: str, tech: str, case: str) -> Tuple[Path, Path]:
+def _log_paths(flow: str, tech: str, case: str,
+               point: str = "") -> Tuple[Path, Path]:
     base = Path(f"run_logs/{tech}/{flow}")
-    run_log = base / "run" / f"{case}_run.log"
-    eval_log = base / "eval" / f"{case}_eval.log"
+    name = f"{case}.{point}" if point else case
+    run_log = base / "run" / f"{name}_run.log"
+    eval_log = base / "eval" / f"{name}_eval.log"
     return run_log, eval_log
 
 
@@ -106,40 +150,211 @@ def _script_paths(repo_root: Path, flow: str, tech: str,
     return run_script, eval_script
 
 
-def _load_env_from_script(env_script: Path) -> None:
-    if not env_script.exists():
-        return
-    cmd = [
-        "bash",
-        "-lc",
-        f'export FLOW_ENV_QUIET=1; source "{env_script}"; env -0',
-    ]
-    proc = subprocess.run(cmd,
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.PIPE,
-                          check=True)
-    for entry in proc.stdout.split(b"\0"):
+def _parse_env_dump(dump: bytes) -> Dict[str, str]:
+    env: Dict[str, str] = {}
+    for entry in dump.split(b"\0"):
         if not entry:
             continue
         key, _, value = entry.partition(b"=")
-        os.environ[key.decode(errors="ignore")] = value.decode(errors="ignore")
+        env[key.decode(errors="ignore")] = value.decode(errors="ignore")
+    return env
+
+
+# Separates the environment dumps before and after sourcing env.sh
+_ENV_DUMP_MARK = "--flow-env-sourced--"
+
+
+def _env_script_cmd(env_script: Path) -> List[str]:
+    return [
+        "bash",
+        "-lc",
+        f'export FLOW_ENV_QUIET=1; env -0; printf "%s\\0" {_ENV_DUMP_MARK}; '
+        f'source "{env_script}"; env -0',
+    ]
+
+
+# Shell bookkeeping that differs after any `bash -lc`, not set by env.sh
+_ENV_SHELL_KEYS = frozenset({"_", "SHLVL", "PWD", "OLDPWD", "FLOW_ENV_QUIET"})
+_ENV_SNAPSHOT_VERSION = b"delta-1"
+
 
+def _env_delta(dump: bytes) -> Dict[str, str]:
+    """Variables sourcing env.sh added or changed, from the _env_script_cmd() output."""
+    before, _, after = dump.partition(b"\0" + _ENV_DUMP_MARK.encode() + b"\0")
+    base = _parse_env_dump(before)
+    return {k: v for k, v in _parse_env_dump(after).items()
+            if k not in _ENV_SHELL_KEYS and base.get(k) != v}
 
-def run_one(cfg: RunConfig) -> str:
+
+def _env_snapshot_key(env_script: Path) -> str:
+    """
+    Hash of everything the sourced environment depends on: the env.sh text,
+    the working directory ($(pwd) defaults) and the current values of the
+    variables env.sh reads (user overrides, PATH for `which`).
+    """
+    text = env_script.read_bytes()
+    h = hashlib.sha256(_ENV_SNAPSHOT_VERSION)
+    h.update(text)
+    h.update(os.getcwd().encode())
+    names = sorted(set(re.findall(rb"\$\{?([A-Za-z_][A-Za-z0-9_]*)", text)) | {b"PATH"})
+    for name in names:
+        key = name.decode()
+        h.update(f"\0{key}={os.environ.get(key, '')}".encode())
+    return h.hexdigest()
+
+
+def _resume_env(env: Dict[str, str], state_path: Path,
+                resume: bool = True) -> Dict[str, str]:
     """
-    Execute one (flow, tech, case) task.
-    - cds: run.sh + eval.sh locally
-    - ord: run.sh + eval.sh locally
+    Environment for a run.sh under util/shim/make, which shadows make. With
+    resume it skips clean_all plus every stage whose completion marker is still
+    valid, up to the first unfinished one; FLOW_START_AT/FLOW_STOP_BEFORE in
+    env cut the stage list of sweep points (see util/stageMarker.py).
     """
-    _install_signal_handlers()
-    _load_env_from_script(cfg.repo_root / "env.sh")
+    env = dict(env)
+    shim_dir = Path(__file__).resolve().parent / "util" / "shim"
+    env["FLOW_REAL_MAKE"] = shutil.which("make", path=env.get("PATH")) or "make"
+    env["PATH"] = f"{shim_dir}{os.pathsep}{env.get('PATH', '')}"
+    if resume:
+        env["FLOW_RESUME"] = "1"
+    env["FLOW_RESUME_STATE"] = str(state_path.resolve())
+    return env
+
+
+def _reset_shim_state(log_path: Path) -> Path:
+    state_path = log_path.with_suffix(".resume.json")
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        state_path.unlink()
+    except FileNotFoundError:
+        pass
+    return state_path
+
+
+def _stage_overrides(cfg: RunConfig, stage: str,
+                     extra_env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment a sweep point (or a retry) adds on top of the sourced env.sh."""
+    env = dict(cfg.knobs)
+    if cfg.work_home is not None:
+        env["WORK_HOME"] = str(cfg.work_home)
+    if stage == "run":
+        if cfg.start_at:
+            env["FLOW_START_AT"] = cfg.start_at
+        if cfg.stop_before:
+            env["FLOW_STOP_BEFORE"] = cfg.stop_before
+    env.update(extra_env or {})
+    return env
+
 
-    pid = os.getpid()
+def _needs_shim(cfg: RunConfig, stage: str,
+                extra_env: Optional[Dict[str, str]] = None) -> bool:
+    # FLOW_FAIL_FAST (retries) and FLOW_TELEMETRY are shim modes as well
+    return stage == "run" and bool(cfg.resume or cfg.start_at or cfg.stop_before
+                                   or any(k.startswith("FLOW_") for k in extra_env or {}))
+
+
+def _stage_env(cfg: RunConfig, stage: str, env: Dict[str, str],
+               log_path: Path,
+               extra_env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment of one stage script; a shimmed run.sh gets a fresh shim state."""
+    overrides = _stage_overrides(cfg, stage, extra_env)
+    if overrides:
+        env = dict(env)
+        env.update(overrides)
+    if not _needs_shim(cfg, stage, extra_env):
+        return env
+    return _resume_env(env, _reset_shim_state(log_path), cfg.resume)
+
+
+def _fork_work_home(src: Path, dst: Path, keep_existing: bool = False) -> None:
+    """
+    Seed a sweep point's WORK_HOME with the shared-prefix results. A resumed
+    point keeps its own tree (and markers) if it already has one.
+    """
+    if dst.exists():
+        if keep_existing:
+            return
+        shutil.rmtree(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copytree(src, dst, symlinks=True)
+
+
+def _load_env_from_script(env_script: Path,
+                          cache_dir: Optional[Path] = None,
+                          refresh: bool = False) -> Dict[str, str]:
+    """
+    Environment after sourcing env_script, resolved once per key. Only the
+    delta env.sh produces (variables it adds or changes) is kept and applied
+    over the live environment, so the caller's session variables (agent
+    sockets, DISPLAY, TMPDIR, credentials) are never snapshotted or replaced
+    by stale values. With cache_dir the delta is also persisted (mode 0600)
+    as <cache_dir>/<key>.json, so later orchestrator runs (e.g. eval-only
+    sweeps) skip the login shell entirely.
+    """
+    env = os.environ.copy()
+    if not env_script.exists():
+        return env
+    key = _env_snapshot_key(env_script)
+    if key in _ENV_SNAPSHOTS and not refresh:
+        env.update(_ENV_SNAPSHOTS[key])
+        return env
+
+    snap_path = cache_dir / f"{key}.json" if cache_dir else None
+    snapshot = None
+    if snap_path is not None and snap_path.exists() and not refresh:
+        try:
+            with open(snap_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            snapshot = None
+    if snapshot is None:
+        proc = subprocess.run(_env_script_cmd(env_script),
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE,
+                              check=True)
+        snapshot = _env_delta(proc.stdout)
+        if snap_path is not None:
+            snap_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = snap_path.with_suffix(f".{os.getpid()}.tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, snap_path)
+
+    _ENV_SNAPSHOTS[key] = snapshot
+    env.update(snapshot)
+    return env
+
+
+async def run_one(cfg: RunConfig, backend: "LocalBackend",
+                  policy: Optional["RetryPolicy"] = None,
+                  telemetry: Optional["Telemetry"] = None) -> str:
+    """
+    Execute one (flow, tech, case) task on the given backend.
+    - cds: run.sh + eval.sh
+    - ord: run.sh + eval.sh
+    With a policy, failed or hung stage scripts are classified and retried;
+    with telemetry, every stage script is recorded as JSONL events.
+    """
+    tag = cfg.tag
+
+    async def _stage(stage: str, script: Path, log_path: Path) -> None:
+        async def _runner(extra_env: Dict[str, str], info: dict) -> None:
+            if policy is None:
+                await backend.run_stage(cfg, stage, script, log_path, extra_env, info)
+            else:
+                await policy.run_stage(backend, cfg, stage, script, log_path,
+                                       extra_env, info)
+
+        if telemetry is None:
+            await _runner({}, {})
+        else:
+            await telemetry.run_stage(_runner, cfg, stage, log_path)
     host = socket.gethostname()
 
-    run_log, eval_log = _log_paths(cfg.flow, cfg.tech, cfg.case)
+    run_log, eval_log = _log_paths(cfg.flow, cfg.tech, cfg.case, cfg.point)
     # 兼容 Python 3.6: unlink(missing_ok=True) 改为 try-except
-    if cfg.do_run:
+    if cfg.do_run and not cfg.resume:
         try:
             run_log.unlink()
         except FileNotFoundError:
@@ -159,74 +374,810 @@ def run_one(cfg: RunConfig) -> str:
     elif cfg.do_eval and not cfg.do_run:
         mode = "eval-only"
     print(
-        f"[{pid}] Start {cfg.flow.upper()} tech={cfg.tech} case={cfg.case} mode={mode} on host={host}"
+        f"[{tag}] Start {cfg.flow.upper()} tech={cfg.tech} case={cfg.case} mode={mode} on host={host}"
     )
+    if cfg.knobs or cfg.work_home is not None:
+        knobs = " ".join(f"{k}={v}" for k, v in cfg.knobs)
+        print(f"[{tag}] knobs: {knobs or '-'} WORK_HOME={cfg.work_home}"
+              + (f" from {cfg.start_at}" if cfg.start_at else "")
+              + (f" until {cfg.stop_before}" if cfg.stop_before else ""))
 
     # --- run.sh (local) ---
     if cfg.do_run:
         if not run_script.exists():
-            msg = f"[{pid}] ERROR: run.sh not found: {run_script}"
+            msg = f"[{tag}] ERROR: run.sh not found: {run_script}"
             print(msg)
             return msg
 
         try:
-            _run_command_with_log(
-                ["bash", str(run_script)],
-                run_log,
-                cwd=cfg.repo_root,
-                env=os.environ.copy(),
-            )
-        except subprocess.CalledProcessError:
-            msg = f"[{pid}] ERROR: run.sh failed ({cfg.flow}/{cfg.tech}/{cfg.case}). See {run_log}"
+            await _stage("run", run_script, run_log)
+        except subprocess.CalledProcessError as e:
+            msg = f"[{tag}] ERROR: run.sh failed{_failure_note(e)}. See {run_log}"
             print(msg)
             return msg
 
     # --- eval.sh ---
     if not cfg.do_eval:
-        ok = f"[{pid}] OK: {cfg.flow}/{cfg.tech}/{cfg.case}"
+        ok = f"[{tag}] OK"
         print(ok)
         return ok
     if cfg.flow == "cds":
         if not eval_script.exists():
-            msg = f"[{pid}] ERROR: eval.sh not found: {eval_script}"
+            msg = f"[{tag}] ERROR: eval.sh not found: {eval_script}"
             print(msg)
             return msg
         try:
-            _run_command_with_log(
-                ["bash", str(eval_script)],
-                eval_log,
-                cwd=cfg.repo_root,
-                env=os.environ.copy(),
-            )
-        except subprocess.CalledProcessError:
-            msg = f"[{pid}] ERROR: eval.sh failed ({cfg.flow}/{cfg.tech}/{cfg.case}). See {eval_log}"
+            await _stage("eval", eval_script, eval_log)
+        except subprocess.CalledProcessError as e:
+            msg = f"[{tag}] ERROR: eval.sh failed{_failure_note(e)}. See {eval_log}"
             print(msg)
             return msg
 
     elif cfg.flow == "ord":
         if not eval_script.exists():
-            msg = f"[{pid}] ERROR: eval.sh not found: {eval_script}"
+            msg = f"[{tag}] ERROR: eval.sh not found: {eval_script}"
             print(msg)
             return msg
         try:
-            _run_command_with_log(
-                ["bash", str(eval_script)],
-                eval_log,
-                cwd=cfg.repo_root,
-                env=os.environ.copy(),
-            )
-        except subprocess.CalledProcessError:
-            msg = f"[{pid}] ERROR: eval.sh failed ({cfg.flow}/{cfg.tech}/{cfg.case}). See {eval_log}"
+            await _stage("eval", eval_script, eval_log)
+        except subprocess.CalledProcessError as e:
+            msg = f"[{tag}] ERROR: eval.sh failed{_failure_note(e)}. See {eval_log}"
             print(msg)
             return msg
     else:
-        return f"[{pid}] ERROR: unknown flow={cfg.flow}"
+        return f"[{tag}] ERROR: unknown flow={cfg.flow}"
 
-    ok = f"[{pid}] OK: {cfg.flow}/{cfg.tech}/{cfg.case}"
+    ok = f"[{tag}] OK"
     print(ok)
     return ok
 
 
+# ==============================================================================
+# Telemetry (JSONL events, see util/genTimeline.py)
+# ==============================================================================
+
+# Plain /usr/bin/time where -f is unsupported (TIME_CMD lines: logStore.TIME_CMD_RE)
+_TIME_PLAIN_RE = re.compile(
+    r"([\d.]+)user ([\d.]+)system (\S+)elapsed .*?(\d+)maxresident")
+# Printed by util/shim/make under FLOW_TELEMETRY=1
+_SHIM_MARK_RE = re.compile(r"^\[FLOW\] (Begin|End) (\S+)((?: \w+=\S+)*)\s*$")
+
+
+def _clock_seconds(value: str) -> Optional[float]:
+    """'1:02:03', '2:03.45' or '3.2' -> seconds."""
+    try:
+        total = 0.0
+        for part in value.split(":"):
+            total = total * 60 + float(part)
+        return total
+    except ValueError:
+        return None
+
+
+def _parse_stage_log(log_path: Path, offset: int = 0) -> Tuple[List[dict], dict]:
+    """
+    Per make target records (from the shim's Begin/End lines) and stage totals
+    of the TIME_CMD lines in log_path after offset. Tool runs outside any
+    target (eval.sh, unshimmed run.sh) only count towards the totals.
+    """
+    time_cmd_re = _import_util("logStore").TIME_CMD_RE
+    targets: List[dict] = []
+    totals = {"tools": 0, "user_s": 0.0, "sys_s": 0.0, "peak_rss_kb": 0}
+    current: Optional[dict] = None
+    try:
+        f = open(log_path, "rb")
+    except OSError:
+        return targets, totals
+    with f:
+        f.seek(offset)
+        for raw in f:
+            line = raw.decode(errors="ignore")
+            m = _SHIM_MARK_RE.match(line)
+            if m:
+                kv = dict(p.split("=", 1) for p in m.group(3).split())
+                if m.group(1) == "Begin":
+                    current = {"target": m.group(2), "pid": int(kv.get("pid", 0)) or None,
+                               "start": float(kv.get("t", 0)), "tools": 0,
+                               "user_s": 0.0, "sys_s": 0.0, "peak_rss_kb": 0}
+                    targets.append(current)
+                elif current is not None and current["target"] == m.group(2):
+                    current["end"] = float(kv.get("t", 0))
+                    current["rc"] = int(kv.get("rc", 0))
+                    current["wall_s"] = round(current["end"] - current["start"], 3)
+                    current = None
+                continue
+            m = time_cmd_re.search(line)
+            if m:
+                user, sys_, rss = float(m.group(2)), float(m.group(3)), int(m.group(4))
+            else:
+                m = _TIME_PLAIN_RE.search(line)
+                if not m:
+                    continue
+                user, sys_, rss = float(m.group(1)), float(m.group(2)), int(m.group(4))
+            for rec in (totals, current) if current is not None else (totals,):
+                rec["tools"] += 1
+                rec["user_s"] += user
+                rec["sys_s"] += sys_
+                rec["peak_rss_kb"] = max(rec["peak_rss_kb"], rss)
+    for rec in targets + [totals]:
+        rec["user_s"] = round(rec["user_s"], 2)
+        rec["sys_s"] = round(rec["sys_s"], 2)
+        rec["cpu_s"] = round(rec["user_s"] + rec["sys_s"], 2)
+    return targets, totals
+
+
+class Telemetry:
+    """
+    Append-only JSONL event log of one orchestrator run. Events: run_start,
+    task_start/task_end, stage_start/stage_end (one run.sh/eval.sh, with host,
+    pid, exit status, wall/CPU time and peak RSS), target (one make target of
+    run.sh) and run_end. Timestamps are epoch seconds.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.run_id = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a")
+
+    def emit(self, event: str, **fields) -> None:
+        rec = {"ts": round(time.time(), 3), "run": self.run_id, "event": event}
+        rec.update(fields)
+        self._file.write(json.dumps(rec, sort_keys=True, default=str) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    async def run_stage(self, runner, cfg: RunConfig, stage: str,
+                        log_path: Path) -> None:
+        """Await runner(extra_env, info) and record the stage and its targets."""
+        try:
+            offset = log_path.stat().st_size if stage == "run" and cfg.resume else 0
+        except OSError:
+            offset = 0
+        info: dict = {}
+        queued = time.time()
+        self.emit("stage_start", task=cfg.tag, stage=stage)
+        rc = 0
+        try:
+            await runner({"FLOW_TELEMETRY": "1"} if stage == "run" else {}, info)
+        except subprocess.CalledProcessError as e:
+            rc = e.returncode
+            raise
+        except asyncio.CancelledError:
+            rc = None
+            raise
+        finally:
+            end = time.time()
+            started = info.get("started", queued)
+            try:
+                if log_path.stat().st_size < offset:
+                    offset = 0  # rotated by an eval.sh retry
+            except OSError:
+                pass
+            targets, totals = _parse_stage_log(log_path, offset)
+            for rec in targets:
+                self.emit("target", task=cfg.tag, stage=stage,
+                          host=info.get("host"), **rec)
+            self.emit("stage_end", task=cfg.tag, stage=stage,
+                      host=info.get("host"), pid=info.get("pid"), rc=rc,
+                      queued=round(queued, 3), start=round(started, 3),
+                      end=round(end, 3), wall_s=round(end - started, 3),
+                      attempts=info.get("attempts", 1),
+                      failure=info.get("failure") if rc else None, **totals)
+
+
+# ==============================================================================
+# Failure classification + retry policy
+# ==============================================================================
+
+# Log-tail signatures, checked in order; the first match wins.
+_FAILURE_PATTERNS: Tuple[Tuple[str, "re.Pattern"], ...] = (
+    ("oom", re.compile(
+        r"Error 137\b|\bKilled\b|Out of memory|out-of-memory|oom-kill|"
+        r"std::bad_alloc|Cannot allocate memory|MemoryError", re.IGNORECASE)),
+    ("crash", re.compile(
+        r"Segmentation fault|core dumped|Error 1(?:34|35|39)\b|\bAborted\b|"
+        r"Bus error|Stack trace:", re.IGNORECASE)),
+    ("license", re.compile(
+        r"licen[cs]e (?:\S+ )?(?:not available|checkout|server|error)|"
+        r"FLEXnet|FlexNet|lmgrd|No such feature exists", re.IGNORECASE)),
+)
+# Failure classes worth another attempt; "error" (a plain nonzero exit such
+# as a Tcl error or a bad config) would fail the same way again.
+RETRYABLE = ("oom", "crash", "timeout", "license")
+_LOG_TAIL = 64 * 1024
+
+
+class StageFailed(subprocess.CalledProcessError):
+    """A stage script failure with its class and, for timeouts, the make target."""
+
+    def __init__(self, returncode: int, cmd, kind: str, target: str = ""):
+        super().__init__(returncode, cmd)
+        self.kind = kind
+        self.target = target
+
+
+def _failure_note(exc: subprocess.CalledProcessError) -> str:
+    kind = getattr(exc, "kind", "")
+    if not kind:
+        return ""
+    target = getattr(exc, "target", "")
+    return f" ({kind} in {target})" if target else f" ({kind})"
+
+
+def _log_tail(log_path: Path, size: int = _LOG_TAIL) -> str:
+    try:
+        with open(log_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - size))
+            return f.read().decode(errors="ignore")
+    except OSError:
+        return ""
+
+
+def classify_failure(returncode: int, log_tail: str = "") -> str:
+    """
+    One of "oom", "crash", "timeout", "license" or "error", from the exit
+    status of the stage script and the tail of its log. run.sh has no
+    'set -e' and exits with the status of its last make, so a signal that
+    killed a tool shows up as make's "Error 137" rather than in the status.
+    """
+    if returncode in (137, -signal.SIGKILL):
+        return "oom"
+    if returncode in (124, -signal.SIGALRM):
+        return "timeout"
+    if returncode in (134, 135, 139, -signal.SIGSEGV, -signal.SIGABRT, -signal.SIGBUS):
+        return "crash"
+    for kind, pattern in _FAILURE_PATTERNS:
+        if pattern.search(log_tail):
+            return kind
+    return "error"
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    xs = sorted(values)
+    pos = (len(xs) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+class RetryPolicy:
+    """
+    Retries of failed or hung stage scripts.
+
+    A stage script that fails with a retryable class is rerun up to `retries`
+    times after an exponential, jittered backoff. With retries, run.sh runs
+    under FLOW_FAIL_FAST, so a failed make target is not followed by stages
+    working on its missing outputs, and reruns resume at the failed stage
+    (completion markers); without, run.sh keeps its own continue-on-failure
+    behavior. After an OOM the retry gets half the NUM_CORES of the previous
+    attempt and, if one frees up during the backoff, a second job slot, so
+    fewer flows share the node's memory.
+
+    With history loaded, every make target of run.sh gets a wall-clock limit
+    of max(timeout_min_s, timeout_factor * p95) of its past elapsed times in
+    the stage journals; a target running longer is killed and classified as
+    "timeout". The watchdog reads the shim state next to the run log, so it
+    only sees runs whose logs live on this host's filesystem (local backend,
+    or agents sharing repo_root).
+    """
+
+    def __init__(self,
+                 retries: int = 0,
+                 backoff_s: float = 30.0,
+                 timeout_factor: float = 0.0,
+                 timeout_min_s: float = 900.0,
+                 poll_s: float = 10.0):
+        self.retries = max(0, retries)
+        self.backoff_s = backoff_s
+        self.timeout_factor = timeout_factor
+        self.timeout_min_s = timeout_min_s
+        self.poll_s = poll_s
+        self.limits: Dict[str, float] = {}
+        # Job semaphore of run_all, for the extra slot of OOM retries.
+        self.sem: Optional[asyncio.Semaphore] = None
+
+    def load_history(self, repo_root: Path, min_samples: int = 3) -> int:
+        """Derive per-target limits from the stage journals under repo_root."""
+        if self.timeout_factor <= 0:
+            return 0
+        samples: Dict[str, List[float]] = {}
+        journals = list(repo_root.glob("logs/*/*/*/stages/journal.jsonl"))
+        journals += repo_root.glob("sweeps/**/stages/journal.jsonl")
+        for journal in journals:
+            try:
+                lines = journal.read_text(errors="ignore").splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                elapsed = rec.get("elapsed_s")
+                if rec.get("stage") and isinstance(elapsed, (int, float)):
+                    samples.setdefault(rec["stage"], []).append(float(elapsed))
+        self.limits = {
+            stage: max(self.timeout_min_s,
+                       self.timeout_factor * _percentile(xs, 0.95))
+            for stage, xs in samples.items() if len(xs) >= min_samples
+        }
+        return len(self.limits)
+
+    async def run_stage(self, backend: "LocalBackend", cfg: RunConfig,
+                        stage: str, script: Path, log_path: Path,
+                        extra_env: Optional[Dict[str, str]] = None,
+                        info: Optional[dict] = None) -> None:
+        base_cores = _base_cores(backend)
+        extra_env = dict(extra_env or {})
+        if stage == "run" and self.retries > 0:
+            extra_env["FLOW_FAIL_FAST"] = "1"
+        extra_slot = False
+        attempt = 0
+        try:
+            while True:
+                if info is not None:
+                    info["attempts"] = attempt + 1
+                try:
+                    await self._attempt(backend, cfg, stage, script, log_path,
+                                        extra_env, info)
+                    return
+                except subprocess.CalledProcessError as e:
+                    if not isinstance(e, StageFailed):
+                        e = StageFailed(e.returncode, e.cmd,
+                                        classify_failure(e.returncode,
+                                                         _log_tail(log_path)))
+                    if info is not None:
+                        info["failure"] = e.kind
+                    if e.kind not in RETRYABLE or attempt >= self.retries:
+                        raise e
+                    attempt += 1
+                    delay = self.backoff_s * 2 ** (attempt - 1)
+                    delay *= random.uniform(0.75, 1.25)
+                    if e.kind == "oom":
+                        cores = max(1, base_cores >> attempt)
+                        extra_env["NUM_CORES"] = str(cores)
+                    note = (f" with NUM_CORES={extra_env['NUM_CORES']}"
+                            if "NUM_CORES" in extra_env else "")
+                    print(f"[{cfg.tag}] WARN: {script.name} failed"
+                          f"{_failure_note(e)}, retry {attempt}/{self.retries} "
+                          f"in {delay:.0f}s{note}")
+                    t0 = time.monotonic()
+                    if e.kind == "oom" and not extra_slot and self.sem is not None:
+                        try:
+                            await asyncio.wait_for(self.sem.acquire(), delay)
+                            extra_slot = True
+                        except asyncio.TimeoutError:
+                            pass
+                    await asyncio.sleep(max(0.0, delay - (time.monotonic() - t0)))
+                    if stage == "run":
+                        # Rerun from the failed stage; the log keeps growing.
+                        cfg = replace(cfg, resume=True)
+                    else:
+                        try:
+                            log_path.replace(
+                                log_path.with_suffix(f".attempt{attempt}.log"))
+                        except OSError:
+                            pass
+                    log_path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(log_path, "a") as f:
+                        f.write(f"\n[MAIN] retry {attempt}/{self.retries} after "
+                                f"{e.kind}{note}\n")
+        finally:
+            if extra_slot:
+                self.sem.release()
+
+    async def _attempt(self, backend: "LocalBackend", cfg: RunConfig,
+                       stage: str, script: Path, log_path: Path,
+                       extra_env: Dict[str, str], info: Optional[dict]) -> None:
+        task = asyncio.ensure_future(
+            backend.run_stage(cfg, stage, script, log_path, dict(extra_env), info))
+        if stage != "run" or not self.limits:
+            await task
+            return
+        state_path = log_path.with_suffix(".resume.json")
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.poll_s)
+                if done:
+                    break
+                try:
+                    state = json.loads(state_path.read_text())
+                except (OSError, ValueError):
+                    continue
+                target = state.get("current")
+                started = state.get("current_started")
+                limit = self.limits.get(target or "")
+                if limit and started and time.time() - started > limit:
+                    print(f"[{cfg.tag}] WARN: {target} running for "
+                          f"{time.time() - started:.0f}s > limit {limit:.0f}s, "
+                          "killing it")
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    raise StageFailed(124, ["bash", str(script)], "timeout",
+                                      target)
+        except BaseException:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            raise
+        task.result()
+
+
+def _base_cores(backend: "LocalBackend") -> int:
+    env = getattr(backend, "env", None) or os.environ
+    try:
+        return max(1, int(env.get("NUM_CORES", "")))
+    except ValueError:
+        return os.cpu_count() or 16
+
+
+# ==============================================================================
+# Executor backends
+# ==============================================================================
+
+
+class LocalBackend:
+    """Runs every stage script as a child process group of this orchestrator."""
+
+    def __init__(self, env: Dict[str, str]):
+        self.env = env
+        self.host = socket.gethostname()
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def run_stage(self, cfg: RunConfig, stage: str, script: Path,
+                        log_path: Path,
+                        extra_env: Optional[Dict[str, str]] = None,
+                        info: Optional[dict] = None) -> None:
+        """Run one stage script; info (if given) receives its host, pid and start."""
+        if stage == "run" and cfg.fork_from is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, _fork_work_home, cfg.repo_root / cfg.fork_from,
+                cfg.repo_root / cfg.work_home, cfg.resume)
+
+        def _started(pid: int) -> None:
+            if info is not None:
+                info.update(host=self.host, pid=pid, started=time.time())
+
+        await _run_command_with_log(
+            ["bash", str(script)],
+            log_path,
+            cwd=cfg.repo_root,
+            env=_stage_env(cfg, stage, self.env, log_path, extra_env),
+            append=(stage == "run" and cfg.resume),
+            on_start=_started,
+        )
+
+
+# ---- agent protocol: one JSON object per line over TCP or a Unix socket ----
+#   agent -> coordinator : {"op": "hello", "host", "slots"}
+#   coordinator -> agent : {"op": "run", "id", "script", "log", "stage",
+#                           "resume", "env", "shim", "fork_from",
+#                           "work_home"} | {"op": "cancel", "id"}
+#   agent -> coordinator : {"op": "start", "id", "pid"} | {"op": "log", "id", "data"}
+#                          | {"op": "exit", "id", "rc"}
+# An agent started with --token-file first sends {"op": "challenge", "nonce"}
+# and serves the connection only after {"op": "auth", "mac"}, the HMAC-SHA256
+# of the nonce under the shared token (--agent-token-file here).
+
+
+def _read_token(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    token = Path(path).read_bytes().strip()
+    if not token:
+        raise ValueError(f"empty agent token file {path}")
+    return token
+
+
+def _agent_mac(token: bytes, nonce: str) -> str:
+    return hmac.new(token, nonce.encode(), hashlib.sha256).hexdigest()
+
+
+def _parse_agent_addr(addr: str) -> Tuple[str, ...]:
+    """'unix:/path/sock' or '[tcp:]host:port'."""
+    if addr.startswith("unix:"):
+        return ("unix", addr[len("unix:"):])
+    if addr.startswith("tcp:"):
+        addr = addr[len("tcp:"):]
+    host, _, port = addr.rpartition(":")
+    return ("tcp", host or "127.0.0.1", int(port))
+
+
+async def _open_agent_connection(addr: str):
+    kind = _parse_agent_addr(addr)
+    if kind[0] == "unix":
+        return await asyncio.open_unix_connection(kind[1], limit=1 << 24)
+    return await asyncio.open_connection(kind[1], kind[2], limit=1 << 24)
+
+
+async def _recv_msg(reader: asyncio.StreamReader) -> Optional[dict]:
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class _Unit:
+    """One (flow, tech, case, stage) work item of the agent backend."""
+
+    _next_id = 0
+
+    def __init__(self, cfg: RunConfig, stage: str, script: str,
+                 log_path: Path, affinity: Optional["_AgentLink"]):
+        _Unit._next_id += 1
+        self.id = _Unit._next_id
+        self.cfg = cfg
+        self.stage = stage
+        self.script = script
+        self.log_path = log_path
+        self.affinity = affinity
+        self.retries = 0
+        self.link: Optional["_AgentLink"] = None
+        self.done = asyncio.get_running_loop().create_future()
+        self.attempt: Optional[asyncio.Future] = None
+        self.log_file = None
+        self.extra_env: Optional[Dict[str, str]] = None
+        self.info: Optional[dict] = None
+
+
+class _AgentLink:
+    """Coordinator side of one agent connection."""
+
+    def __init__(self, addr: str, on_dead, token: Optional[bytes] = None):
+        self.addr = addr
+        self.token = token
+        self.host = addr
+        self.slots = 1
+        self.alive = False
+        self.queue: Deque[_Unit] = deque()
+        self.running: Dict[int, _Unit] = {}
+        self._on_dead = on_dead
+        self._wlock = asyncio.Lock()
+        self._reader = None
+        self._writer = None
+
+    def load(self) -> float:
+        return (len(self.running) + len(self.queue)) / self.slots
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await _open_agent_connection(self.addr)
+        hello = await _recv_msg(self._reader)
+        if hello and hello.get("op") == "challenge":
+            if self.token is None:
+                raise ConnectionError(f"agent {self.addr} requires --agent-token-file")
+            await self.send({"op": "auth", "mac": _agent_mac(self.token, hello["nonce"])})
+            hello = await _recv_msg(self._reader)
+            if hello is None:
+                raise ConnectionError(f"agent {self.addr} rejected the token")
+        if not hello or hello.get("op") != "hello":
+            raise ConnectionError(f"bad hello from agent {self.addr}")
+        self.host = hello.get("host", self.addr)
+        self.slots = max(1, int(hello.get("slots", 1)))
+        self.alive = True
+        asyncio.ensure_future(self._read_loop())
+
+    async def send(self, msg: dict) -> None:
+        data = (json.dumps(msg) + "\n").encode()
+        async with self._wlock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                msg = await _recv_msg(self._reader)
+                if msg is None:
+                    break
+                unit = self.running.get(msg.get("id"))
+                if unit is None:
+                    continue
+                if msg.get("op") == "log":
+                    unit.log_file.write(msg.get("data", "").encode())
+                    unit.log_file.flush()
+                elif msg.get("op") == "start" and unit.info is not None:
+                    unit.info.update(pid=msg.get("pid"), started=time.time())
+                elif msg.get("op") == "exit" and not unit.attempt.done():
+                    unit.attempt.set_result(int(msg.get("rc", 1)))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.alive = False
+            for unit in list(self.running.values()):
+                if unit.attempt is not None and not unit.attempt.done():
+                    unit.attempt.set_exception(
+                        ConnectionError(f"agent {self.host} disconnected"))
+            self._on_dead(self)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class AgentBackend:
+    """
+    Dispatches stage scripts to worker agents (run_agent.py). Each unit is
+    queued on the least-loaded agent; an agent with a free slot and an empty
+    queue steals the newest unpinned unit from the most loaded agent. eval.sh
+    is pinned to the agent that ran the task's run.sh (its results live there).
+    Units of a disconnected agent are requeued up to max_retries times.
+    """
+
+    def __init__(self, addrs: Sequence[str], max_retries: int = 1,
+                 token: Optional[bytes] = None):
+        self.links = [_AgentLink(a, self._agent_dead, token) for a in addrs]
+        self.max_retries = max_retries
+        self._affinity: Dict[Tuple[str, ...], _AgentLink] = {}
+        self._cond: Optional[asyncio.Condition] = None
+        self._closing = False
+
+    @property
+    def total_slots(self) -> int:
+        return sum(l.slots for l in self.links if l.alive)
+
+    async def start(self) -> None:
+        self._cond = asyncio.Condition()
+        for link in self.links:
+            try:
+                await link.connect()
+                print(f"[MAIN] agent {link.addr}: host={link.host} slots={link.slots}")
+            except (OSError, ConnectionError, ValueError) as e:
+                print(f"[MAIN] WARN: agent {link.addr} unavailable: {e}")
+        if not any(l.alive for l in self.links):
+            raise ConnectionError("no worker agent reachable")
+        for link in self.links:
+            for _ in range(link.slots if link.alive else 0):
+                asyncio.ensure_future(self._slot(link))
+
+    async def close(self) -> None:
+        self._closing = True
+        for link in self.links:
+            for unit in list(link.running.values()):
+                try:
+                    await link.send({"op": "cancel", "id": unit.id})
+                except (OSError, ConnectionError):
+                    pass
+            await link.close()
+
+    async def run_stage(self, cfg: RunConfig, stage: str, script: Path,
+                        log_path: Path,
+                        extra_env: Optional[Dict[str, str]] = None,
+                        info: Optional[dict] = None) -> None:
+        # eval follows its run; a forked sweep point follows its prefix run.
+        key = (cfg.flow, cfg.tech, cfg.case, str(cfg.work_home or ""))
+        if stage == "eval":
+            affinity = self._affinity.get(key)
+        elif cfg.fork_from is not None:
+            affinity = self._affinity.get(key[:3] + (str(cfg.fork_from),))
+        else:
+            affinity = None
+        try:
+            script_rel = str(script.relative_to(cfg.repo_root))
+        except ValueError:
+            script_rel = str(script)
+        unit = _Unit(cfg, stage, script_rel, log_path, affinity)
+        unit.extra_env = extra_env
+        unit.info = info
+        await self._enqueue(unit)
+        try:
+            rc = await unit.done
+        except asyncio.CancelledError:
+            for link in self.links:
+                if unit in link.queue:
+                    link.queue.remove(unit)
+            if unit.link is not None and unit.link.alive:
+                asyncio.ensure_future(unit.link.send({"op": "cancel", "id": unit.id}))
+            raise
+        if stage == "run":
+            self._affinity[key] = unit.link
+        if rc != 0:
+            raise subprocess.CalledProcessError(rc, ["bash", script_rel])
+
+    # ---- scheduling ----
+    async def _enqueue(self, unit: _Unit) -> None:
+        alive = [l for l in self.links if l.alive]
+        if not alive:
+            if not unit.done.done():
+                unit.done.set_exception(ConnectionError("no worker agent alive"))
+            return
+        link = unit.affinity if unit.affinity in alive else min(alive, key=_AgentLink.load)
+        unit.affinity = link if unit.affinity is not None else None
+        link.queue.append(unit)
+        async with self._cond:
+            self._cond.notify_all()
+
+    def _next_unit(self, link: _AgentLink) -> Optional[_Unit]:
+        if link.queue:
+            return link.queue.popleft()
+        victims = sorted((l for l in self.links if l is not link and l.queue),
+                         key=_AgentLink.load, reverse=True)
+        for victim in victims:
+            for i in range(len(victim.queue) - 1, -1, -1):
+                if victim.queue[i].affinity is None:
+                    unit = victim.queue[i]
+                    del victim.queue[i]
+                    return unit
+        return None
+
+    async def _slot(self, link: _AgentLink) -> None:
+        while link.alive:
+            async with self._cond:
+                unit = self._next_unit(link)
+                while unit is None and link.alive:
+                    await self._cond.wait()
+                    unit = self._next_unit(link)
+            if unit is None:
+                return
+            await self._dispatch(link, unit)
+
+    async def _dispatch(self, link: _AgentLink, unit: _Unit) -> None:
+        if unit.done.done():
+            return
+        unit.link = link
+        unit.attempt = asyncio.get_running_loop().create_future()
+        unit.log_path.parent.mkdir(parents=True, exist_ok=True)
+        append = unit.retries > 0 or (unit.stage == "run" and unit.cfg.resume)
+        unit.log_file = open(unit.log_path, "ab" if append else "wb")
+        if unit.retries:
+            unit.log_file.write(
+                f"\n[MAIN] retry {unit.retries} on agent {link.host}\n".encode())
+        link.running[unit.id] = unit
+        if unit.info is not None:
+            unit.info.update(host=link.host, pid=None, started=time.time())
+        try:
+            await link.send({
+                "op": "run",
+                "id": unit.id,
+                "stage": unit.stage,
+                "script": unit.script,
+                "log": str(unit.log_path),
+                "resume": unit.cfg.resume,
+                "env": _stage_overrides(unit.cfg, unit.stage, unit.extra_env),
+                "shim": _needs_shim(unit.cfg, unit.stage, unit.extra_env),
+                "fork_from": (str(unit.cfg.fork_from)
+                              if unit.stage == "run" and unit.cfg.fork_from else None),
+                "work_home": str(unit.cfg.work_home or ""),
+            })
+            rc = await unit.attempt
+            if not unit.done.done():
+                unit.done.set_result(rc)
+        except (OSError, ConnectionError) as e:
+            if unit.retries < self.max_retries and not unit.done.done():
+                unit.retries += 1
+                print(f"[MAIN] WARN: {e}; requeue {unit.stage} {unit.cfg.tag}")
+                unit.affinity = None
+                await self._enqueue(unit)
+            elif not unit.done.done():
+                unit.done.set_exception(e)
+        finally:
+            link.running.pop(unit.id, None)
+            unit.log_file.close()
+
+    def _agent_dead(self, link: _AgentLink) -> None:
+        if self._closing:
+            return
+        print(f"[MAIN] WARN: agent {link.host} lost")
+        orphans = list(link.queue)
+        link.queue.clear()
+
+        async def _requeue():
+            for unit in orphans:
+                unit.affinity = None
+                await self._enqueue(unit)
+            async with self._cond:
+                self._cond.notify_all()
+
+        asyncio.ensure_future(_requeue())
+
+
 # ==============================================================================
 # CLI + orchestration
 # ==============================================================================
@@ -242,6 +1193,124 @@ def _dedup_keep_order(xs: Iterable[str]) -> List[str]:
     return out
 
 
+# ---- parameter sweeps ----
+# --sweep AXIS=v1,v2,...  AXIS -> (environment variables set to the value, or
+# NAME=fixed, stages that read them). Points that agree on every knob affecting earlier
+# stages share one prefix run, which stops before the first affected stage of
+# run.sh; each point then starts from a copy of it. An axis whose stages the
+# run.sh never calls is rejected. Unknown AXIS names are passed through as
+# environment variables that affect the whole flow. UB pins the balance scan
+# of tier_partition.tcl (PAR_BAL_LO..PAR_BAL_HI) to one value; an empty
+# PAR_SCALE_FACTOR keeps it out of the base_balance mode, which ignores UB.
+SWEEP_AXES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "hbPitch": (("hbPitch",), ("ord-pre", "cds-pre", "ord-3d-pdn", "cds-3d-pdn")),
+    "CLK_PERIOD": (("CLK_PERIOD",), ()),
+    "UB": (("PAR_BAL_LO", "PAR_BAL_HI", "PAR_SCALE_FACTOR="),
+           ("ord-tier-partition", "cds-tier-partition")),
+}
+SWEEP_ALIASES = {"pitch": "hbPitch", "clock": "CLK_PERIOD", "clk": "CLK_PERIOD",
+                 "ub": "UB"}
+
+_MAKE_TARGET_RE = re.compile(r"^\s*make\s+(?:\S+=\S*\s+)*([A-Za-z][\w.-]*)\s*$")
+
+
+def _sweep_value(axis: str, value: str) -> str:
+    """hbPitch accepts 0.4 / 0p4 / hbPitch_0p4, as named in lef/*_pitch_variant."""
+    if axis != "hbPitch" or value.startswith("hbPitch_"):
+        return value
+    try:
+        value = f"{float(value):g}".replace(".", "p")
+    except ValueError:
+        pass
+    return f"hbPitch_{value}"
+
+
+def parse_sweep(specs: Sequence[str]) -> List[Tuple[str, List[str]]]:
+    """['hbPitch=0p2,0p4', 'flow=ord'] -> [('hbPitch', [...]), ('flow', ['ord'])]."""
+    axes: List[Tuple[str, List[str]]] = []
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        name = SWEEP_ALIASES.get(name.strip(), name.strip())
+        vals = _dedup_keep_order(v.strip() for v in values.split(",") if v.strip())
+        if not sep or not name or not vals:
+            raise ValueError(f"bad --sweep '{spec}', expected AXIS=v1,v2,...")
+        if any(name == a for a, _ in axes):
+            raise ValueError(f"--sweep axis '{name}' given twice")
+        axes.append((name, [_sweep_value(name, v) for v in vals]))
+    return axes
+
+
+def _axis_knobs(axis: str, value: str) -> Tuple[Tuple[str, str], ...]:
+    """Environment overrides of one axis value."""
+    out = []
+    for spec in SWEEP_AXES.get(axis, ((axis,), ()))[0]:
+        name, fixed, fixed_value = spec.partition("=")
+        out.append((name, fixed_value if fixed else value))
+    return tuple(out)
+
+
+def _point_id(knobs: Sequence[Tuple[str, str]]) -> str:
+    parts = []
+    for axis, value in knobs:
+        part = value if value.startswith(axis + "_") else f"{axis}_{value}"
+        parts.append(re.sub(r"[^\w-]", "p", part))
+    return "__".join(parts)
+
+
+def _script_targets(script: Path) -> List[str]:
+    """Make targets of a run.sh, in call order."""
+    try:
+        lines = script.read_text(errors="ignore").splitlines()
+    except OSError:
+        return []
+    targets = []
+    for line in lines:
+        m = _MAKE_TARGET_RE.match(line)
+        if m:
+            targets.append(m.group(1))
+    return targets
+
+
+def _sweep_tasks(base: RunConfig, axes: Sequence[Tuple[str, List[str]]],
+                 run_script: Path) -> List[RunConfig]:
+    """Expand one (flow, tech, case) over the sweep axes, prefix runs first."""
+    targets = _script_targets(run_script)
+    shared: Dict[str, str] = {}  # axis -> first stage of run.sh it affects
+    for axis, values in axes:
+        stages = SWEEP_AXES.get(axis, ((axis,), ()))[1]
+        hits = [t for t in targets if t in stages]
+        if stages and not hits:
+            raise ValueError(f"{run_script} runs none of {', '.join(stages)}, "
+                             f"every {axis} point would be the same flow")
+        if hits and len(values) > 1:
+            shared[axis] = hits[0]
+    fork = min(shared.values(), key=targets.index) if shared else ""
+    root = Path("sweeps") / base.tech / base.case / base.flow
+
+    tasks: List[RunConfig] = []
+    prefixes: Dict[str, RunConfig] = {}
+    grid = itertools.product(*[[(axis, v) for v in values] for axis, values in axes])
+    for point in grid:
+        knobs = tuple(kv for a, v in point for kv in _axis_knobs(a, v))
+        pid = _point_id(point)
+        cfg = replace(base, point=pid, knobs=knobs, work_home=root / pid)
+        if fork and base.do_run:
+            prefix_knobs = tuple(kv for a, v in point if a not in shared
+                                 for kv in _axis_knobs(a, v))
+            prefix_pid = "_prefix" + ("__" + _point_id(
+                [p for p in point if p[0] not in shared]) if prefix_knobs else "")
+            prefix = prefixes.get(prefix_pid)
+            if prefix is None:
+                prefix = replace(base, point=prefix_pid, knobs=prefix_knobs,
+                                 do_eval=False, work_home=root / prefix_pid,
+                                 stop_before=fork)
+                prefixes[prefix_pid] = prefix
+                tasks.append(prefix)
+            cfg = replace(cfg, fork_from=prefix.work_home, start_at=fork)
+        tasks.append(cfg)
+    return tasks
+
+
 def build_tasks(
     flows: List[str],
     techs: List[str],
@@ -249,23 +1318,517 @@ def build_tasks(
     repo_root: Path,
     do_run: bool,
     do_eval: bool,
+    resume: bool = False,
+    sweep: Sequence[Tuple[str, List[str]]] = (),
 ) -> List[RunConfig]:
     tasks: List[RunConfig] = []
     for flow in flows:
         for tech in techs:
             for case in cases:
-                tasks.append(
-                    RunConfig(
-                        flow=flow,
-                        tech=tech,
-                        case=case,
-                        repo_root=repo_root,
-                        do_run=do_run,
-                        do_eval=do_eval,
-                    ))
+                cfg = RunConfig(
+                    flow=flow,
+                    tech=tech,
+                    case=case,
+                    repo_root=repo_root,
+                    do_run=do_run,
+                    do_eval=do_eval,
+                    resume=resume,
+                )
+                if not sweep:
+                    tasks.append(cfg)
+                    continue
+                run_script, _ = _script_paths(repo_root, flow, tech, case)
+                tasks.extend(_sweep_tasks(cfg, sweep, run_script))
     return tasks
 
 
+# ---- adaptive clock search ----
+_FINISH_RPT_RE = re.compile(
+    r"^finish slack div critical path delay\n^-*\n^(\S+)", re.MULTILINE)
+
+
+def read_finish_timing(work_home: Path) -> Dict[str, float]:
+    """
+    Setup timing of a finished run under work_home, from (in this order) the
+    finish metrics merged by genMetrics.py (metadata*.json, 6_*.json), the
+    OpenROAD 6_finish.rpt and the Innovus final_metrics.csv of the eval stage.
+    Returns any of wns_percent (slack / critical path delay, %) and wns.
+    """
+    timing: Dict[str, float] = {}
+    for path in sorted(work_home.glob("logs/*/*/*/*.json")):
+        if not (path.name.startswith("6_") or path.name.startswith("metadata")):
+            continue
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for key, name in (("finish__timing__wns_percent_delay", "wns_percent"),
+                          ("finish__timing__setup__ws", "wns")):
+            try:
+                timing.setdefault(name, float(data[key]))
+            except (KeyError, TypeError, ValueError):
+                pass
+    if "wns_percent" not in timing:
+        for path in work_home.glob("reports/*/*/*/6_finish.rpt"):
+            m = _FINISH_RPT_RE.search(path.read_text(errors="ignore"))
+            if m:
+                try:
+                    timing["wns_percent"] = float(m.group(1))
+                except ValueError:
+                    pass
+    if "wns" not in timing:
+        for path in work_home.glob("logs/*/*/*/final_metrics.csv"):
+            rows = path.read_text(errors="ignore").splitlines()
+            if len(rows) >= 2:
+                row = dict(zip(rows[0].split(","), rows[-1].split(",")))
+                try:
+                    timing["wns"] = float(row["wns"])
+                except (KeyError, ValueError):
+                    pass
+    return timing
+
+
+def _fmt_period(value: float) -> str:
+    return f"{value:.6g}"
+
+
+class ClockSearch:
+    """
+    Bracketing search for the minimum passing CLK_PERIOD of one task. Each
+    round probes `width` periods in parallel: the k-section points of the
+    current (failing, passing) bracket, one of them moved to the period the
+    closest passing probe's WNS predicts. The bracket grows outward while every
+    probe passes (or fails), and the search stops once it is narrower than
+    `step` or after max_rounds.
+    """
+
+    def __init__(self, seed: RunConfig, lo: float, hi: float, step: float,
+                 width: int = 3, max_rounds: int = 8):
+        self.seed = seed
+        self.lo, self.hi = lo, hi
+        self.step = step
+        self.width = max(2, width)
+        self.max_rounds = max_rounds
+        self.probes: Dict[float, dict] = {}
+
+    @property
+    def tag(self) -> str:
+        return f"{self.seed.tag} clock-search"
+
+    def _snap(self, value: float) -> float:
+        return round(round(value / self.step) * self.step, 9)
+
+    def _points(self, lo: float, hi: float, n: int,
+                ends: bool = False) -> List[float]:
+        if ends:
+            raw = [lo + (hi - lo) * i / (n - 1) for i in range(n)]
+        else:
+            raw = [lo + (hi - lo) * (i + 1) / (n + 1) for i in range(n)]
+        pts = []
+        for v in raw:
+            v = self._snap(v)
+            if v > 0 and v not in self.probes and v not in pts:
+                pts.append(v)
+        return pts
+
+    def _probe_cfg(self, period: float) -> RunConfig:
+        knobs = tuple(kv for kv in self.seed.knobs if kv[0] != "CLK_PERIOD")
+        knobs += (("CLK_PERIOD", _fmt_period(period)),)
+        pid = _point_id([kv for kv in knobs])
+        root = Path("sweeps") / self.seed.tech / self.seed.case / self.seed.flow
+        return replace(self.seed, point=pid, knobs=knobs,
+                       work_home=root / "clock" / pid,
+                       fork_from=None, start_at="", stop_before="")
+
+    def _estimate(self, passing: float) -> Optional[float]:
+        pct = self.probes[passing]["timing"].get("wns_percent")
+        if pct is None or pct <= -100:
+            return None
+        return passing / (1.0 + pct / 100.0)
+
+    def _next_points(self) -> List[float]:
+        passing = sorted(p for p, r in self.probes.items() if r["pass"])
+        failing = sorted(p for p, r in self.probes.items() if not r["pass"])
+        span = self.hi - self.lo
+        if not passing:
+            top = failing[-1]
+            return self._points(top, top + span, self.width, ends=True)[-self.width:]
+        best = passing[0]
+        below = [p for p in failing if p < best]
+        if not below:
+            return self._points(max(self.step, best - span), best, self.width,
+                                ends=True)[:self.width]
+        fail = below[-1]
+        if best - fail <= self.step * 1.0001:
+            return []
+        pts = self._points(fail, best, self.width)
+        est = self._estimate(best)
+        if pts and est is not None and fail < est < best:
+            est = self._snap(est)
+            if est not in self.probes and est not in pts:
+                pts[min(range(len(pts)), key=lambda i: abs(pts[i] - est))] = est
+        return sorted(pts)
+
+    async def run(self, probe) -> str:
+        """probe(cfg) runs one full flow and returns its status message."""
+        points = self._points(self.lo, self.hi, self.width, ends=True)
+        for rnd in range(1, self.max_rounds + 1):
+            if not points:
+                break
+            print(f"[{self.tag}] round {rnd}: CLK_PERIOD="
+                  + ",".join(_fmt_period(p) for p in points))
+            cfgs = [self._probe_cfg(p) for p in points]
+            msgs = await asyncio.gather(*(probe(c) for c in cfgs))
+            for period, cfg, msg in zip(points, cfgs, msgs):
+                timing = read_finish_timing(cfg.repo_root / cfg.work_home)
+                slack = timing.get("wns_percent", timing.get("wns"))
+                ok = "ERROR" not in msg and slack is not None and slack >= 0
+                self.probes[period] = {"pass": ok, "timing": timing,
+                                       "work_home": str(cfg.work_home),
+                                       "failed": "ERROR" in msg}
+            points = self._next_points()
+        return self._report()
+
+    def _report(self) -> str:
+        passing = sorted(p for p, r in self.probes.items() if r["pass"])
+        best = passing[0] if passing else None
+        out = {
+            "flow": self.seed.flow, "tech": self.seed.tech, "case": self.seed.case,
+            "knobs": dict(self.seed.knobs), "step": self.step,
+            "min_passing_period": best,
+            "probes": {_fmt_period(p): r for p, r in sorted(self.probes.items())},
+        }
+        run_log, _ = _log_paths(self.seed.flow, self.seed.tech, self.seed.case,
+                                self.seed.point)
+        path = run_log.parent.parent / "clock_search" / (
+            run_log.name.replace("_run.log", ".json"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(out, f, indent=2, sort_keys=True)
+        if best is None:
+            msg = (f"[{self.tag}] ERROR: no passing period in "
+                   f"{len(self.probes)} runs, see {path}")
+        else:
+            msg = (f"[{self.tag}] OK min CLK_PERIOD={_fmt_period(best)} "
+                   f"({len(self.probes)} runs, see {path})")
+        print(msg)
+        return msg
+
+
+# ---- early pruning of sweep points ----
+
+
+def _import_util(name: str):
+    """Import a util/ script as a module (they import their siblings by name)."""
+    util_dir = str(Path(__file__).resolve().parent / "util")
+    if util_dir not in sys.path:
+        sys.path.insert(0, util_dir)
+    return importlib.import_module(name)
+
+
+class SweepPruner:
+    """
+    Scores in-flight sweep points when they pass a stage boundary (placement:
+    *-legalize-upper completed; global route: 5_1_grt.log finished) with
+    util/sweepPredictor.py models trained on the completed points of the same
+    (flow, tech, case) plus earlier sweeps (sweeps/**/sweep_row.json). A point
+    whose predicted final metrics are beaten on every objective by an already
+    completed point, by more than margin * the model's LOO error, is reported
+    (mode "report") or cancelled (mode "cancel"). Cancelled points keep their
+    stage markers, so --resume can still finish them.
+    """
+
+    def __init__(self, mode: str, objectives: Sequence[Tuple[str, str]],
+                 margin: float = 1.0, history: Sequence[str] = (),
+                 interval: float = 60.0):
+        self.sp = _import_util("sweepPredictor")
+        self.mode = mode
+        self.objectives = list(objectives)
+        self.margin = margin
+        self.interval = interval
+        self.history: List[dict] = self.sp.load_rows(list(history)) if history else []
+        self.watched: Set[str] = set()
+        self.running: Dict[str, Tuple[RunConfig, asyncio.Future]] = {}
+        self.scored: Dict[str, Set[str]] = {}
+        self.pruned: Dict[str, str] = {}
+        self.completed: Dict[Tuple[str, str, str], List[dict]] = {}
+        self.untrained: Set[Tuple[str, str, str]] = set()
+
+    @staticmethod
+    def _group(cfg: RunConfig) -> Tuple[str, str, str]:
+        return (cfg.flow, cfg.tech, cfg.case)
+
+    def watch(self, tasks: Sequence[RunConfig]) -> None:
+        self.watched = {t.tag for t in tasks
+                        if t.point and t.do_run and not t.stop_before}
+        roots = {t.repo_root / "sweeps" for t in tasks if t.tag in self.watched}
+        for root in roots:
+            for path in root.glob("**/sweep_row.json"):
+                self.history += self.sp.load_rows([str(path)])
+
+    @staticmethod
+    def _log_dir(cfg: RunConfig) -> Optional[Path]:
+        dirs = sorted((cfg.repo_root / cfg.work_home).glob(f"logs/{cfg.tech}/*/*"))
+        return dirs[0] if dirs else None
+
+    def _boundary(self, log_dir: Path) -> Optional[str]:
+        if "Elapsed" in self.sp.read_stage_log(str(log_dir / "5_1_grt.log")):
+            return "grt"
+        journal = log_dir / "stages" / "journal.jsonl"
+        if journal.exists() and "legalize-upper" in journal.read_text(errors="ignore"):
+            return "place"
+        return None
+
+    def _row(self, cfg: RunConfig, log_dir: Optional[Path]) -> dict:
+        row = self.sp.collect_run_metrics(str(log_dir)) if log_dir else {}
+        timing = read_finish_timing(cfg.repo_root / cfg.work_home)
+        if "wns_percent" in timing:
+            row["finish__timing__wns_percent_delay"] = timing["wns_percent"]
+        if "wns" in timing:
+            row.setdefault("finish__timing__setup__ws", timing["wns"])
+        for name, value in cfg.knobs:
+            v = self.sp.knob_value(value)
+            if v is not None:
+                row[f"knob__{name}"] = v
+        row.update({"sweep__flow": cfg.flow, "sweep__tech": cfg.tech,
+                    "sweep__case": cfg.case, "sweep__point": cfg.point})
+        return row
+
+    def _training_rows(self, group: Tuple[str, str, str]) -> List[dict]:
+        rows = [r for r in self.history
+                if (r.get("sweep__flow"), r.get("sweep__tech"), r.get("sweep__case"))
+                in (group, (None, None, None))]
+        return rows + self.completed.get(group, [])
+
+    async def run(self, cfg: RunConfig, coro) -> str:
+        """Await one watched point; returns a PRUNED message if it was cancelled."""
+        inner = asyncio.ensure_future(coro)
+        self.running[cfg.tag] = (cfg, inner)
+        try:
+            msg = await inner
+        except asyncio.CancelledError:
+            if cfg.tag not in self.pruned or not inner.cancelled():
+                raise
+            msg = f"[{cfg.tag}] PRUNED: {self.pruned[cfg.tag]}"
+            print(msg)
+            return msg
+        finally:
+            self.running.pop(cfg.tag, None)
+        if "ERROR" not in msg:
+            row = self._row(cfg, self._log_dir(cfg))
+            missing = [k for k, _ in self.objectives
+                       if self.sp.target_counts([row], [(k, None)])[k] == 0]
+            if missing:
+                print(f"[{cfg.tag}] WARN: --prune: no {', '.join(missing)} in this "
+                      f"point's final metrics; it cannot train or dominate others")
+            self.completed.setdefault(self._group(cfg), []).append(row)
+            with open(cfg.repo_root / cfg.work_home / "sweep_row.json", "w") as f:
+                json.dump(row, f, indent=2, sort_keys=True)
+        return msg
+
+    def _score(self, cfg: RunConfig, inner: asyncio.Future, boundary: str,
+               log_dir: Path) -> bool:
+        """False if nothing could be predicted yet (retried on the next poll)."""
+        group = self._group(cfg)
+        done = self.completed.get(group, [])
+        if not done:
+            return False
+        rows = self._training_rows(group)
+        models = self.sp.train_models(rows, boundary, self.objectives)
+        if not models:
+            counts = self.sp.target_counts(rows, self.objectives)
+            if len(done) >= self.sp.MIN_ROWS and group not in self.untrained:
+                self.untrained.add(group)
+                print(f"[{cfg.tag}] WARN: --prune: no model after {len(done)} "
+                      f"completed points ("
+                      + ", ".join(f"{k}: {n} rows" for k, n in counts.items())
+                      + f", {self.sp.MIN_ROWS} needed); nothing is pruned")
+            return False
+        feats = self.sp.features_at(self._row(cfg, log_dir), boundary)
+        pred = self.sp.predict(models, feats)
+        shown = " ".join(f"{k.split('__')[-1]}={mu:.4g}+-{err:.2g}"
+                         for k, (mu, err) in pred.items())
+        idx = self.sp.dominated_by(pred, done, self.objectives, self.margin)
+        if idx is None:
+            print(f"[{cfg.tag}] predict@{boundary}: {shown}")
+            return True
+        reason = (f"predicted at {boundary} ({shown}) to be dominated by "
+                  f"{done[idx].get('sweep__point')}")
+        print(f"[{cfg.tag}] {'PRUNE' if self.mode == 'cancel' else 'WARN'}: {reason}")
+        if self.mode == "cancel":
+            self.pruned[cfg.tag] = reason
+            inner.cancel()
+        return True
+
+    async def monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for tag, (cfg, inner) in list(self.running.items()):
+                if tag in self.pruned or inner.done():
+                    continue
+                log_dir = self._log_dir(cfg)
+                boundary = self._boundary(log_dir) if log_dir else None
+                if boundary is None or boundary in self.scored.setdefault(tag, set()):
+                    continue
+                try:
+                    if self._score(cfg, inner, boundary, log_dir):
+                        self.scored[tag].add(boundary)
+                except (OSError, ValueError, ArithmeticError) as e:
+                    self.scored[tag].add(boundary)
+                    print(f"[{tag}] WARN: prediction failed: {e}")
+
+
+def _sdc_reads_clk_period(repo_root: Path, tech: str, case: str) -> bool:
+    sdc = repo_root / "designs" / tech / case / "constraint.sdc"
+    try:
+        return "CLK_PERIOD" in sdc.read_text(errors="ignore")
+    except OSError:
+        return False
+
+
+async def _report_progress(state: Dict[str, int], total: Optional[int],
+                           interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        elapsed = time.monotonic() - state["t0"]
+        done = f"{state['done']}/{total}" if total is not None else state["done"]
+        print(f"[MAIN] progress: done={done} "
+              f"running={state['running']} failed={state['failed']} "
+              f"elapsed={elapsed:.0f}s")
+
+
+async def run_all(tasks: Sequence[RunConfig],
+                  jobs: int,
+                  backend: LocalBackend,
+                  progress_interval: float = 60.0,
+                  searches: Sequence[ClockSearch] = (),
+                  pruner: Optional[SweepPruner] = None,
+                  policy: Optional[RetryPolicy] = None,
+                  telemetry: Optional[Telemetry] = None) -> Optional[int]:
+    """
+    Drive all tasks (and the probe runs of all clock searches) from one event
+    loop with at most `jobs` flows in flight. Returns the number of failed
+    tasks and searches, or None if interrupted by SIGINT/SIGTERM (every
+    running process group is terminated before returning).
+    """
+    loop = asyncio.get_running_loop()
+    await backend.start()
+    if isinstance(backend, AgentBackend):
+        # Agents queue and balance units themselves; keep every task in flight.
+        jobs = max(jobs, len(tasks) + sum(s.width for s in searches))
+    sem = asyncio.Semaphore(max(1, jobs))
+    if policy is not None:
+        policy.sem = sem
+    state = {"done": 0, "running": 0, "failed": 0, "t0": time.monotonic()}
+    # Sweep points wait (outside the semaphore) for their shared-prefix run.
+    prefix_done: Dict[Path, asyncio.Future] = {
+        t.work_home: loop.create_future() for t in tasks if t.stop_before
+    }
+    if pruner is not None:
+        pruner.watch(tasks)
+    if telemetry is not None:
+        telemetry.emit("run_start", host=socket.gethostname(), pid=os.getpid(),
+                       jobs=jobs, tasks=len(tasks), searches=len(searches),
+                       cpus=os.cpu_count(), num_cores=os.environ.get("NUM_CORES"),
+                       backend=type(backend).__name__, argv=sys.argv[1:])
+
+    async def _guarded(cfg: RunConfig) -> str:
+        if cfg.do_run and cfg.fork_from in prefix_done:
+            prefix_msg = await prefix_done[cfg.fork_from]
+            if "ERROR" in prefix_msg:
+                msg = f"[{cfg.tag}] ERROR: shared prefix {cfg.fork_from} failed"
+                print(msg)
+                state["done"] += 1
+                state["failed"] += 1
+                return msg
+        async with sem:
+            state["running"] += 1
+            t0 = time.time()
+            if telemetry is not None:
+                telemetry.emit("task_start", task=cfg.tag, flow=cfg.flow,
+                               tech=cfg.tech, case=cfg.case, point=cfg.point,
+                               work_home=cfg.work_home, fork_from=cfg.fork_from)
+            try:
+                if pruner is not None and cfg.tag in pruner.watched:
+                    msg = await pruner.run(cfg, run_one(cfg, backend, policy,
+                                                        telemetry))
+                else:
+                    msg = await run_one(cfg, backend, policy, telemetry)
+            except (OSError, ConnectionError,
+                    subprocess.CalledProcessError) as e:
+                msg = f"[{cfg.tag}] ERROR: {e}"
+                print(msg)
+            finally:
+                state["running"] -= 1
+            if telemetry is not None:
+                status = ("error" if "ERROR" in msg
+                          else "pruned" if "PRUNED" in msg else "ok")
+                telemetry.emit("task_end", task=cfg.tag, status=status,
+                               start=round(t0, 3), end=round(time.time(), 3),
+                               wall_s=round(time.time() - t0, 3))
+            state["done"] += 1
+            if "ERROR" in msg:
+                state["failed"] += 1
+            if cfg.stop_before:
+                prefix_done[cfg.work_home].set_result(msg)
+            return msg
+
+    async def _search(search: ClockSearch) -> str:
+        msg = await search.run(_guarded)
+        if "ERROR" in msg:
+            state["failed"] += 1
+        return msg
+
+    main_task = asyncio.ensure_future(
+        asyncio.gather(*(_guarded(t) for t in tasks),
+                       *(_search(s) for s in searches)))
+
+    interrupted = False
+
+    def _on_signal() -> None:
+        nonlocal interrupted
+        if not interrupted:
+            interrupted = True
+            print("[MAIN] Interrupt received, terminating running flows...")
+        main_task.cancel()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, _on_signal)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    watcher = asyncio.ensure_future(pruner.monitor()) if pruner else None
+    reporter = None
+    if progress_interval > 0:
+        reporter = asyncio.ensure_future(
+            _report_progress(state, None if searches else len(tasks),
+                             progress_interval))
+    try:
+        await main_task
+    except asyncio.CancelledError:
+        _kill_all_groups(signal.SIGKILL)
+        if telemetry is not None:
+            telemetry.emit("run_end", interrupted=True, failed=state["failed"])
+        return None
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        if watcher is not None:
+            watcher.cancel()
+        await backend.close()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+    if telemetry is not None:
+        telemetry.emit("run_end", interrupted=False, failed=state["failed"],
+                       wall_s=round(time.monotonic() - state["t0"], 3))
+    return state["failed"]
+
+
 def parse_args(default_repo_root: Optional[str], ) -> argparse.Namespace:
     p = argparse.ArgumentParser(
         description=
@@ -292,7 +1855,13 @@ def parse_args(default_repo_root: Optional[str], ) -> argparse.Namespace:
         "--jobs",
         type=int,
         default=9,
-        help="Parallel workers.",
+        help="Maximum number of flows running concurrently.",
+    )
+    p.add_argument(
+        "--progress-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between progress lines (0 disables).",
     )
     stage_group = p.add_mutually_exclusive_group()
     stage_group.add_argument(
@@ -306,6 +1875,132 @@ def parse_args(default_repo_root: Optional[str], ) -> argparse.Namespace:
         help="Only run run.sh for each task.",
     )
 
+    p.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        metavar="AXIS=V1,V2,...",
+        help="Sweep axis (hbPitch, CLK_PERIOD, UB, flow or any env var). "
+        "Repeatable; the cross product runs with one WORK_HOME per point "
+        "under sweeps/, sharing upstream stages where possible.",
+    )
+    p.add_argument(
+        "--clock-search",
+        default=None,
+        metavar="LO:HI",
+        help="Search the minimum passing CLK_PERIOD (SDC units) per design and "
+        "flow, starting from the bracket LO:HI, instead of one run per task.",
+    )
+    p.add_argument(
+        "--clock-step",
+        type=float,
+        default=None,
+        help="Resolution of --clock-search (default: (HI-LO)/16).",
+    )
+    p.add_argument(
+        "--clock-probes",
+        type=int,
+        default=3,
+        help="Periods probed in parallel per search round (default: 3).",
+    )
+    p.add_argument(
+        "--prune",
+        choices=["off", "report", "cancel"],
+        default="off",
+        help="Predict final metrics of sweep points after placement and global "
+        "route (util/sweepPredictor.py) and report or cancel points predicted "
+        "to be dominated by a completed one (default: off).",
+    )
+    p.add_argument(
+        "--prune-objective",
+        action="append",
+        default=[],
+        metavar="KEY:min|max",
+        help="Final metric for --prune dominance, a final__<column> of the "
+        "eval stage's final_metrics.csv or a genMetrics key. Repeatable "
+        "(default: final__wns:max, final__wire_length:min).",
+    )
+    p.add_argument(
+        "--prune-margin",
+        type=float,
+        default=1.0,
+        help="Required win, in model errors (LOO RMSE), on every objective.",
+    )
+    p.add_argument(
+        "--prune-history",
+        action="append",
+        default=[],
+        help="Extra training rows: metadata.json files or LOG_DIRs (globs).",
+    )
+    p.add_argument(
+        "--prune-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between stage-boundary checks of running points.",
+    )
+    p.add_argument(
+        "--agent",
+        action="append",
+        default=[],
+        help="Worker agent address (host:port or unix:/path), see run_agent.py. "
+        "Repeatable; without it every flow runs locally.",
+    )
+    p.add_argument(
+        "--agent-token-file",
+        default=None,
+        help="Shared secret of the agents started with --token-file.",
+    )
+    p.add_argument(
+        "--resume",
+        action="store_true",
+        help="Keep run logs and restart each run.sh at its first unfinished "
+        "stage (per-stage completion markers under LOG_DIR/stages).",
+    )
+    p.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Reruns of a stage script that failed with OOM, a tool crash, a "
+        "timeout or a license error; run.sh then stops at its first failing "
+        "make (FLOW_FAIL_FAST) (default: 0, off).",
+    )
+    p.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=30.0,
+        help="Seconds before the first retry, doubled per retry (default: 30).",
+    )
+    p.add_argument(
+        "--stage-timeout-factor",
+        type=float,
+        default=0.0,
+        help="Kill a make target running longer than this times the p95 of "
+        "its past runtimes in the stage journals, e.g. 3 (default: 0, off).",
+    )
+    p.add_argument(
+        "--stage-timeout-min",
+        type=float,
+        default=900.0,
+        help="Lower bound of every stage timeout in seconds (default: 900).",
+    )
+    p.add_argument(
+        "--telemetry",
+        default="none",
+        metavar="PATH",
+        help="Append a JSONL event log of this run to PATH, e.g. "
+        "run_logs/telemetry/run.jsonl (default: none). Report: util/genTimeline.py.",
+    )
+    p.add_argument(
+        "--env-cache",
+        action="store_true",
+        help="Persist the sourced env.sh snapshot under run_logs/.env_cache/.",
+    )
+    p.add_argument(
+        "--refresh-env",
+        action="store_true",
+        help="Re-source env.sh even if a cached snapshot exists.",
+    )
+
     p.add_argument(
         "--repo-root",
         default=default_repo_root,
@@ -315,15 +2010,23 @@ def parse_args(default_repo_root: Optional[str], ) -> argparse.Namespace:
 
 
 def main() -> int:
-    _install_signal_handlers()
     script_root = Path(__file__).resolve().parent
-    _load_env_from_script(script_root / "env.sh")
+    args = parse_args(default_repo_root=None)
 
-    default_repo_root = os.environ.get("FLOW_HOME", str(script_root))
-    args = parse_args(default_repo_root=default_repo_root, )
+    cache_dir = Path("run_logs/.env_cache") if args.env_cache else None
+    main_env = _load_env_from_script(script_root / "env.sh", cache_dir,
+                                     args.refresh_env)
+    os.environ.update(main_env)
 
-    repo_root = Path(args.repo_root).resolve() if args.repo_root else Path(
-        __file__).resolve().parent
+    repo_root = Path(args.repo_root or os.environ.get(
+        "FLOW_HOME", str(script_root))).resolve()
+    # Resolved once here and handed to every task instead of re-sourcing
+    # env.sh per task.
+    if (repo_root / "env.sh").resolve() == (script_root / "env.sh").resolve():
+        task_env = main_env
+    else:
+        task_env = _load_env_from_script(repo_root / "env.sh", cache_dir,
+                                         args.refresh_env)
 
     # Default suites (match your originals)
     default_techs = ["asap7_3D", "nangate45_3D", "asap7_nangate45_3D"]
@@ -337,42 +2040,148 @@ def main() -> int:
     else:
         flows = [args.flow]
 
+    try:
+        sweep = parse_sweep(args.sweep)
+    except ValueError as e:
+        print(f"[MAIN] ERROR: {e}")
+        return 2
+    for axis, values in sweep:
+        if axis == "flow":
+            bad = [v for v in values if v not in ("ord", "cds")]
+            if bad:
+                print(f"[MAIN] ERROR: unknown flow(s) in --sweep: {bad}")
+                return 2
+            flows = values
+    sweep = [(axis, values) for axis, values in sweep if axis != "flow"]
+
+    clock_bracket = None
+    if args.clock_search:
+        try:
+            lo, hi = sorted(float(v) for v in args.clock_search.split(":"))
+        except ValueError:
+            print(f"[MAIN] ERROR: bad --clock-search '{args.clock_search}', expected LO:HI")
+            return 2
+        if any(axis == "CLK_PERIOD" for axis, _ in sweep):
+            print("[MAIN] ERROR: --clock-search and --sweep CLK_PERIOD are exclusive")
+            return 2
+        if lo <= 0 or args.eval_only or args.run_only:
+            print("[MAIN] ERROR: --clock-search needs 0 < LO and both run and eval stages")
+            return 2
+        clock_bracket = (lo, hi, args.clock_step or (hi - lo) / 16)
+
     do_run = not args.eval_only
     do_eval = not args.run_only
 
-    tasks = build_tasks(
-        flows=flows,
-        techs=techs,
-        cases=cases,
-        repo_root=repo_root,
-        do_run=do_run,
-        do_eval=do_eval,
-    )
+    try:
+        tasks = build_tasks(
+            flows=flows,
+            techs=techs,
+            cases=cases,
+            repo_root=repo_root,
+            do_run=do_run,
+            do_eval=do_eval,
+            resume=args.resume,
+            sweep=sweep,
+        )
+    except ValueError as e:
+        print(f"[MAIN] ERROR: {e}")
+        return 2
+    searches: List[ClockSearch] = []
+    if clock_bracket is not None:
+        # Every (flow, tech, case[, sweep point]) becomes one search; probes
+        # change synthesis, so nothing is shared between them.
+        for seed in tasks:
+            if seed.stop_before:
+                continue
+            if not _sdc_reads_clk_period(repo_root, seed.tech, seed.case):
+                print(f"[MAIN] WARN: designs/{seed.tech}/{seed.case}/constraint.sdc "
+                      f"ignores CLK_PERIOD, no clock search for {seed.tag}")
+                continue
+            searches.append(ClockSearch(seed, *clock_bracket,
+                                        width=args.clock_probes))
+        tasks = []
 
     print(f"[MAIN] repo_root={repo_root}")
     print(f"[MAIN] flows={flows} techs={techs} cases={cases} jobs={args.jobs}")
-    print(f"[MAIN] stages: run={do_run} eval={do_eval}")
+    print(f"[MAIN] stages: run={do_run} eval={do_eval} resume={args.resume}")
+    if sweep:
+        axes = " ".join(f"{a}={','.join(v)}" for a, v in sweep)
+        prefixes = sum(1 for t in tasks if t.stop_before)
+        print(f"[MAIN] sweep: {axes} ({prefixes} shared prefix runs, "
+              f"WORK_HOME under sweeps/<tech>/<case>/<flow>/<point>)")
+    if clock_bracket is not None:
+        print(f"[MAIN] clock search: {len(searches)} searches, bracket "
+              f"{_fmt_period(clock_bracket[0])}:{_fmt_period(clock_bracket[1])} "
+              f"step={_fmt_period(clock_bracket[2])} probes={args.clock_probes}")
     print(
         f"[MAIN] total_tasks={len(tasks)} logs under run_logs/<tech>/<flow>/..."
     )
 
+    pruner = None
+    if args.prune != "off":
+        if not sweep:
+            print("[MAIN] WARN: --prune only applies to --sweep points, ignored")
+        elif not do_eval:
+            print("[MAIN] ERROR: --prune needs the eval stage (final_metrics.csv "
+                  "holds the objectives), drop --run-only")
+            return 2
+        else:
+            sp = _import_util("sweepPredictor")
+            try:
+                objectives = sp.parse_objectives(args.prune_objective)
+            except ValueError as e:
+                print(f"[MAIN] ERROR: {e}")
+                return 2
+            pruner = SweepPruner(args.prune, objectives, args.prune_margin,
+                                 args.prune_history, args.prune_interval)
+            print(f"[MAIN] prune={args.prune} objectives="
+                  + ",".join(f"{k}:{d}" for k, d in objectives))
+
+    policy = None
+    if args.retries > 0 or args.stage_timeout_factor > 0:
+        policy = RetryPolicy(args.retries, args.retry_backoff,
+                             args.stage_timeout_factor, args.stage_timeout_min)
+        limits = policy.load_history(repo_root)
+        print(f"[MAIN] retries={policy.retries} backoff={policy.backoff_s:.0f}s "
+              f"stage timeouts={limits} from history")
+
+    telemetry = None
+    if args.telemetry and args.telemetry != "none":
+        telemetry = Telemetry(Path(args.telemetry))
+        print(f"[MAIN] telemetry={telemetry.path} "
+              f"(report: python3 util/genTimeline.py {telemetry.path})")
+
+    try:
+        token = _read_token(args.agent_token_file)
+    except (OSError, ValueError) as e:
+        print(f"[MAIN] ERROR: agent token: {e}")
+        return 2
+
     # Run
-    executor: Optional[ProcessPoolExecutor] = None
     try:
-        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
-            futures = [executor.submit(run_one, t) for t in tasks]
-            for fut in as_completed(futures):
-                _ = fut.result()
+        backend = (AgentBackend(args.agent, token=token)
+                   if args.agent else LocalBackend(task_env))
+        failed = asyncio.run(
+            run_all(tasks,
+                    args.jobs,
+                    backend,
+                    progress_interval=args.progress_interval,
+                    searches=searches,
+                    pruner=pruner,
+                    policy=policy,
+                    telemetry=telemetry))
     except KeyboardInterrupt:
+        _kill_all_groups(signal.SIGKILL)
         print("[MAIN] KeyboardInterrupt received, shutting down...")
-        if executor is not None:
-            try:
-                executor.shutdown(wait=False, cancel_futures=True)
-            except Exception:
-                pass
+        return 130
+    except ConnectionError as e:
+        print(f"[MAIN] ERROR: {e}")
+        return 1
+    if failed is None:
+        print("[MAIN] Interrupted, all running flows were terminated.")
         return 130
 
-    print("[MAIN] All experiments completed.")
+    print(f"[MAIN] All experiments completed ({failed} failed).")
     return 0
 
 
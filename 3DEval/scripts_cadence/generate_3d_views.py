@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cadence flow entry point of the 3D view generator (views3d package).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from views3d.core import main  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(main(default_profile="cadence"))
@@ -15,6 +15,7 @@
 #
 # Mode B) PAR_SCALE_FACTOR is not set:
 #   - Scan UB (balance_constraint) uniformly on [PAR_BAL_LO .. PAR_BAL_HI], N points
+#     (a single point when PAR_BAL_LO == PAR_BAL_HI, e.g. a --sweep UB point)
 #   - base_balance is FIXED to {0.5 0.5}
 #
 # Inputs (env) [ONLY these partition knobs are read]:
@@ -398,16 +399,17 @@ if {$mode eq "BB_SWEEP"} {
   set base_balance [list "0.500000" "0.500000"]
 
   set span [expr {$::PAR_BAL_HI - $::PAR_BAL_LO}]
-  if {$span <= 0.0} {
+  if {$span < 0.0} {
     utl::error PAR 963 [format "Invalid UB sweep range: lo=%.6f hi=%.6f" $::PAR_BAL_LO $::PAR_BAL_HI]
   }
-  set step [expr {$span / double($::PAR_BAL_ITER - 1)}]
-  if {$step <= 0.0} { utl::error PAR 964 [format "Invalid UB step: %.6f" $step] }
+  # lo == hi pins UB: one point instead of N identical runs
+  set n_ub [expr {$span == 0.0 ? 1 : $::PAR_BAL_ITER}]
+  set step [expr {$n_ub > 1 ? $span / double($n_ub - 1) : 0.0}]
 
   set ub_points {}
-  for {set i 0} {$i < $::PAR_BAL_ITER} {incr i} {
+  for {set i 0} {$i < $n_ub} {incr i} {
     set ub [expr {$::PAR_BAL_LO + double($i)*$step}]
-    if {$i == ($::PAR_BAL_ITER - 1)} { set ub $::PAR_BAL_HI } ;# exact endpoint
+    if {$i == ($n_ub - 1)} { set ub $::PAR_BAL_HI } ;# exact endpoint
     set ubs [format "%.6f" $ub]
     lappend points [dict create ub $ub base_balance $base_balance tag "ub${ubs}" delta ""]
     lappend ub_points $ubs
@@ -419,7 +421,7 @@ if {$mode eq "BB_SWEEP"} {
 
 set fh [open $plan_file w]; puts $fh $plan; close $fh
 
-puts [format {INFO %s: mode=%s N=%d plan=%s} [_ts] $mode $::PAR_BAL_ITER $plan_file]
+puts [format {INFO %s: mode=%s N=%d plan=%s} [_ts] $mode [llength $points] $plan_file]
 flush stdout
 
 # ============================================================
@@ -506,7 +508,7 @@ set sum_dict [dict create \
   mode [dict get $best mode] \
   seed $::PAR_FIXED_SEED \
   timing_aware true \
-  N $::PAR_BAL_ITER \
+  N [llength $points] \
   PAR_BAL_LO $::PAR_BAL_LO \
   PAR_BAL_HI $::PAR_BAL_HI \
   PAR_SCALE_FACTOR $center_bb \
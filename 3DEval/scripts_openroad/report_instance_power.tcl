@@ -0,0 +1,27 @@
+# Per-instance power report for one tier, consumed by util/thermalPrep.py.
+#
+# Inputs (env):
+#   - LIB_FILES     : liberty files of the tier (SC_LIB_UPPER / SC_LIB_BOTTOM)
+#   - POWER_TIER    : upper | bottom; only *_<tier> instances are reported
+#   - POWER_REPORT  : output file
+#   - RESULTS_DIR, DESIGN_NAME : 6_final.v / 6_final.sdc / 6_final.spef
+#
+# Cells of the other tier have no liberty here and are linked as black boxes,
+# so both tiers can be analysed concurrently by independent sta processes.
+
+foreach libFile $::env(LIB_FILES) {
+  read_liberty $libFile
+}
+
+read_verilog $::env(RESULTS_DIR)/6_final.v
+link_design -make_black_boxes $::env(DESIGN_NAME)
+read_sdc $::env(RESULTS_DIR)/6_final.sdc
+if {[file exists $::env(RESULTS_DIR)/6_final.spef]} {
+  read_spef $::env(RESULTS_DIR)/6_final.spef
+}
+
+set tier_cells [get_cells -hierarchical -filter "ref_name =~ *_$::env(POWER_TIER)"]
+puts "Reporting power of [llength $tier_cells] $::env(POWER_TIER) instances -> $::env(POWER_REPORT)"
+report_power -instances $tier_cells > $::env(POWER_REPORT)
+
+exit
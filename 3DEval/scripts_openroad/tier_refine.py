@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fiduccia-Mattheyses refinement of a two-tier partition.
+
+Reads an existing partition.txt (e.g. produced by TritonPart in
+ord-tier-partition) plus the netlist hypergraph from the floorplan DEF, runs
+time-bounded FM passes that minimize the number of cut nets under an area
+balance constraint, and writes a refined partition.txt that
+generate_3d_views.py consumes unchanged.
+
+Balance follows TritonPart's -balance_constraint semantics: with UB factor
+`ub` (in percent) and base balance (b0, b1), tier i may hold at most
+(b_i + ub / 100) of the total cell area.
+"""
+
+import argparse
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from generate_3d_views import (
+    COMP_BEGIN_RE,
+    COMP_END_RE,
+    COMP_FIRST_RE,
+    DEF_CONN_RE,
+    NETS_BEGIN_RE,
+    NETS_END_RE,
+    normalize_from_def,
+    normalize_name,
+    parse_partition_file,
+    strip_tier_suffix,
+)
+
+IGNORE_NET_NAMES = {"VDD", "VSS", "VPWR", "VGND", "TOP_VDD", "TOP_VSS", "BOT_VDD", "BOT_VSS"}
+
+# ==========================================================
+# Inputs: LEF areas, partition summary, DEF hypergraph
+# ==========================================================
+
+LEF_MACRO_RE = re.compile(r"^\s*MACRO\s+(\S+)")
+LEF_SIZE_RE  = re.compile(r"^\s*SIZE\s+([0-9.eE+-]+)\s+BY\s+([0-9.eE+-]+)\s*;")
+
+def parse_lef_areas(lef_paths: List[str]) -> Dict[str, float]:
+    """
+    Collect base master -> area (um^2) from MACRO ... SIZE w BY h in LEF files.
+    Tier suffixes are stripped; the bottom-tier view wins when both exist so
+    that heterogeneous platforms balance on a single, stable weight.
+    """
+    areas: Dict[str, float] = {}
+    from_bottom: Dict[str, bool] = {}
+    for path in lef_paths:
+        if not path or not os.path.exists(path):
+            print(f"[WARN] LEF file '{path}' not found, ignored.")
+            continue
+        macro = None
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                m = LEF_MACRO_RE.match(line)
+                if m:
+                    macro = m.group(1)
+                    continue
+                if macro is None:
+                    continue
+                m = LEF_SIZE_RE.match(line)
+                if m:
+                    base = strip_tier_suffix(macro)
+                    is_bottom = macro.endswith("_bottom")
+                    if base not in areas or (is_bottom and not from_bottom[base]):
+                        areas[base] = float(m.group(1)) * float(m.group(2))
+                        from_bottom[base] = is_bottom
+                    macro = None
+    return areas
+
+def read_partition_summary(result_path: Optional[str]) -> Dict[str, object]:
+    """
+    Pick best_ub / best_base_balance out of the partition.result.tcl dict
+    written by tier_partition.tcl, so refinement honours the same constraint.
+    """
+    summary: Dict[str, object] = {}
+    if not result_path or not os.path.exists(result_path):
+        return summary
+    with open(result_path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    m = re.search(r"\bbest_ub\s+([0-9.eE+-]+)", text)
+    if m:
+        summary["ub"] = float(m.group(1))
+    m = re.search(r"\bbest_base_balance\s+\{\s*([0-9.eE+-]+)\s+([0-9.eE+-]+)\s*\}", text)
+    if m:
+        summary["base_balance"] = (float(m.group(1)), float(m.group(2)))
+    return summary
+
+class Hypergraph:
+    """Instances (vertices) with area weights and nets as vertex-id lists."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.area: List[float] = []
+        self.nets: List[List[int]] = []
+        self.net_names: List[str] = []
+        self.vertex_nets: List[List[int]] = []
+
+    def add_vertex(self, name: str, area: float) -> int:
+        vid = self.index.get(name)
+        if vid is None:
+            vid = len(self.names)
+            self.index[name] = vid
+            self.names.append(name)
+            self.area.append(area)
+            self.vertex_nets.append([])
+        return vid
+
+    def add_net(self, name: str, vids: List[int]) -> None:
+        eid = len(self.nets)
+        self.nets.append(vids)
+        self.net_names.append(name)
+        for v in vids:
+            self.vertex_nets[v].append(eid)
+
+def build_hypergraph_from_def(
+    def_path: str,
+    areas: Dict[str, float],
+    max_net_degree: int = 0,
+) -> Hypergraph:
+    """
+    Stream COMPONENTS (vertices) and NETS (hyperedges) from a DEF.
+    IO pins, power nets, single-instance nets and nets above max_net_degree
+    (when > 0) do not contribute to the cut and are dropped.
+    """
+    hg = Hypergraph()
+    missing = set()
+    in_comp = False
+    in_nets = False
+    net_name = None
+    net_buf: List[str] = []
+
+    def _flush_net():
+        text = "".join(net_buf)
+        vids = []
+        seen = set()
+        for m in DEF_CONN_RE.finditer(text):
+            inst = m.group(1)
+            if inst == "PIN" or inst == "*":
+                continue
+            vid = hg.index.get(normalize_from_def(inst))
+            if vid is None or vid in seen:
+                continue
+            seen.add(vid)
+            vids.append(vid)
+        if len(vids) < 2:
+            return
+        if max_net_degree > 0 and len(vids) > max_net_degree:
+            return
+        hg.add_net(net_name, vids)
+
+    with open(def_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not in_comp and COMP_BEGIN_RE.match(line):
+                in_comp = True
+                continue
+            if in_comp:
+                if COMP_END_RE.match(line):
+                    in_comp = False
+                    continue
+                m = COMP_FIRST_RE.match(line)
+                if m:
+                    _, inst_raw, master, _ = m.groups()
+                    base = strip_tier_suffix(master)
+                    area = areas.get(base)
+                    if area is None:
+                        missing.add(base)
+                        area = 1.0
+                    hg.add_vertex(normalize_from_def(inst_raw), area)
+                continue
+
+            if not in_nets and NETS_BEGIN_RE.match(line):
+                in_nets = True
+                continue
+            if in_nets:
+                if NETS_END_RE.match(line):
+                    in_nets = False
+                    continue
+                stripped = line.lstrip()
+                if net_name is None:
+                    if not stripped.startswith("-"):
+                        continue
+                    toks = stripped[1:].split()
+                    net_name = normalize_name(toks[0]) if toks else ""
+                    net_buf = [line]
+                else:
+                    net_buf.append(line)
+                if ";" in line:
+                    if net_name not in IGNORE_NET_NAMES:
+                        _flush_net()
+                    net_name = None
+                    net_buf = []
+
+    if missing:
+        print(f"[WARN] {len(missing)} masters have no LEF SIZE, using unit area "
+              f"(e.g. {sorted(missing)[:5]}).")
+    return hg
+
+# ==========================================================
+# FM engine
+# ==========================================================
+
+class FMRefiner:
+    """
+    Classic two-way FM with bucketed gains.
+
+    Gains are kept in one bucket array per source side, each bucket being an
+    intrusive doubly linked list over vertex ids (nxt/prv arrays), so insert,
+    remove and max-gain lookup are O(1) amortized.
+    """
+
+    def __init__(
+        self,
+        hg: Hypergraph,
+        part: List[int],
+        max_area: Tuple[float, float],
+        fixed: Optional[List[bool]] = None,
+    ):
+        self.hg = hg
+        self.part = part
+        self.max_area = max_area
+        n = len(hg.names)
+        self.fixed = fixed if fixed is not None else [False] * n
+        self.pmax = max((len(e) for e in hg.vertex_nets), default=0)
+        self.side_area = [0.0, 0.0]
+        for v in range(n):
+            self.side_area[part[v]] += hg.area[v]
+        self.cnt = [[0, 0] for _ in hg.nets]
+        for e, vids in enumerate(hg.nets):
+            c = self.cnt[e]
+            for v in vids:
+                c[part[v]] += 1
+
+    # ---- metrics ----
+    def cut(self) -> int:
+        return sum(1 for c in self.cnt if c[0] and c[1])
+
+    def overflow(self) -> float:
+        return (max(0.0, self.side_area[0] - self.max_area[0]) +
+                max(0.0, self.side_area[1] - self.max_area[1]))
+
+    # ---- gain buckets ----
+    def _init_pass(self) -> None:
+        n = len(self.hg.names)
+        size = 2 * self.pmax + 1
+        self.head = [[-1] * size, [-1] * size]
+        self.maxg = [-1, -1]
+        self.nxt = [-1] * n
+        self.prv = [-1] * n
+        self.gain = [0] * n
+        self.locked = list(self.fixed)
+        part, cnt = self.part, self.cnt
+        for v in range(n):
+            if self.locked[v]:
+                continue
+            s = part[v]
+            g = 0
+            for e in self.hg.vertex_nets[v]:
+                c = cnt[e]
+                if c[s] == 1:
+                    g += 1
+                if c[1 - s] == 0:
+                    g -= 1
+            self.gain[v] = g
+            self._insert(v)
+
+    def _insert(self, v: int) -> None:
+        s = self.part[v]
+        b = self.gain[v] + self.pmax
+        h = self.head[s]
+        self.prv[v] = -1
+        self.nxt[v] = h[b]
+        if h[b] >= 0:
+            self.prv[h[b]] = v
+        h[b] = v
+        if b > self.maxg[s]:
+            self.maxg[s] = b
+
+    def _remove(self, v: int) -> None:
+        s = self.part[v]
+        p, q = self.prv[v], self.nxt[v]
+        if p >= 0:
+            self.nxt[p] = q
+        else:
+            self.head[s][self.gain[v] + self.pmax] = q
+        if q >= 0:
+            self.prv[q] = p
+
+    def _bump(self, v: int, delta: int) -> None:
+        if self.locked[v]:
+            return
+        self._remove(v)
+        self.gain[v] += delta
+        self._insert(v)
+
+    def _best_candidate(self, s: int, scan_limit: int) -> int:
+        """Highest-gain unlocked vertex on side s whose move keeps balance."""
+        h = self.head[s]
+        room = self.max_area[1 - s] - self.side_area[1 - s]
+        b = self.maxg[s]
+        while b >= 0 and h[b] < 0:
+            b -= 1
+        self.maxg[s] = b
+        area = self.hg.area
+        while b >= 0:
+            v = h[b]
+            scanned = 0
+            while v >= 0 and scanned < scan_limit:
+                if area[v] <= room + 1e-12:
+                    return v
+                v = self.nxt[v]
+                scanned += 1
+            b -= 1
+        return -1
+
+    def _move(self, v: int) -> None:
+        """Move v across and apply the FM critical-net gain updates."""
+        s = self.part[v]
+        t = 1 - s
+        self._remove(v)
+        self.locked[v] = True
+        part, cnt, nets = self.part, self.cnt, self.hg.nets
+        for e in self.hg.vertex_nets[v]:
+            c = cnt[e]
+            if c[t] == 0:
+                for u in nets[e]:
+                    if u != v:
+                        self._bump(u, 1)
+            elif c[t] == 1:
+                for u in nets[e]:
+                    if u != v and part[u] == t:
+                        self._bump(u, -1)
+                        break
+            c[s] -= 1
+            c[t] += 1
+            if c[s] == 0:
+                for u in nets[e]:
+                    if u != v:
+                        self._bump(u, -1)
+            elif c[s] == 1:
+                for u in nets[e]:
+                    if u != v and part[u] == s:
+                        self._bump(u, 1)
+                        break
+        part[v] = t
+        a = self.hg.area[v]
+        self.side_area[s] -= a
+        self.side_area[t] += a
+
+    def _undo(self, v: int) -> None:
+        s = self.part[v]
+        t = 1 - s
+        for e in self.hg.vertex_nets[v]:
+            c = self.cnt[e]
+            c[s] -= 1
+            c[t] += 1
+        self.part[v] = t
+        a = self.hg.area[v]
+        self.side_area[s] -= a
+        self.side_area[t] += a
+
+    def run_pass(self, deadline: float, scan_limit: int = 64) -> Tuple[int, int]:
+        """
+        One FM pass: move every movable vertex once (best feasible gain first),
+        then roll back to the best prefix. Returns (moves kept, cut gain).
+        """
+        self._init_pass()
+        moves: List[int] = []
+        run_gain = 0
+        best_gain = 0
+        best_len = 0
+        best_ovf = self.overflow()
+        while True:
+            if len(moves) & 255 == 0 and time.monotonic() > deadline:
+                break
+            cands = []
+            for s in (0, 1):
+                v = self._best_candidate(s, scan_limit)
+                if v >= 0:
+                    cands.append(v)
+            if not cands:
+                break
+            # Prefer gain, then the move that relieves the heavier tier.
+            v = max(cands, key=lambda x: (self.gain[x],
+                                          self.side_area[self.part[x]] - self.max_area[self.part[x]]))
+            run_gain += self.gain[v]
+            self._move(v)
+            moves.append(v)
+            ovf = self.overflow()
+            if run_gain > best_gain or (run_gain == best_gain and ovf < best_ovf):
+                best_gain = run_gain
+                best_len = len(moves)
+                best_ovf = ovf
+        for v in reversed(moves[best_len:]):
+            self._undo(v)
+        return best_len, best_gain
+
+    def rebalance(self) -> int:
+        """
+        Greedily move the cheapest-loss vertices off an overfull tier so FM
+        starts from a feasible point. Returns the number of moves made.
+        """
+        moved = 0
+        for s in (0, 1):
+            if self.side_area[s] <= self.max_area[s]:
+                continue
+            self._init_pass()
+            while self.side_area[s] > self.max_area[s]:
+                v = self._best_candidate(s, scan_limit=1 << 30)
+                if v < 0:
+                    print(f"[WARN] Cannot rebalance tier {s}: no movable vertex fits.")
+                    break
+                self._move(v)
+                moved += 1
+        return moved
+
+    def refine(self, time_limit: float, max_passes: int) -> Dict[str, float]:
+        start = time.monotonic()
+        deadline = start + time_limit if time_limit > 0 else float("inf")
+        initial_cut = self.cut()
+        rebalanced = self.rebalance()
+        passes = 0
+        for _ in range(max_passes):
+            if time.monotonic() > deadline:
+                break
+            kept, gain = self.run_pass(deadline)
+            passes += 1
+            print(f"[INFO] FM pass {passes}: kept {kept} moves, cut gain {gain}, "
+                  f"cut {self.cut()}, area {self.side_area[0]:.3f}/{self.side_area[1]:.3f}")
+            if kept == 0 or gain <= 0:
+                break
+        return {
+            "initial_cut": initial_cut,
+            "final_cut": self.cut(),
+            "passes": passes,
+            "rebalance_moves": rebalanced,
+            "runtime_s": time.monotonic() - start,
+        }
+
+# ==========================================================
+# Partition I/O
+# ==========================================================
+
+def write_partition_file(
+    out_path: str,
+    part_in_path: str,
+    assignment: Dict[str, int],
+) -> None:
+    """
+    Rewrite partition.txt keeping the input line order and instance spelling;
+    only the trailing die token changes.
+    """
+    out: List[str] = []
+    with open(part_in_path, "r", encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            toks = raw.split()
+            if len(toks) >= 2 and toks[-1] in ("0", "1"):
+                die = assignment.get(normalize_name(toks[0]))
+                if die is not None:
+                    toks[-1] = str(die)
+                    out.append(" ".join(toks) + "\n")
+                    continue
+            out.append(raw)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.writelines(out)
+
+# ==========================================================
+# Main
+# ==========================================================
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Refine a two-tier partition.txt with time-bounded FM passes."
+    )
+    ap.add_argument("--def-in", required=True, help="DEF providing COMPONENTS/NETS (e.g. 2_2_floorplan_io.def)")
+    ap.add_argument("--partition", required=True, help="Input partition.txt: <inst> <die(0/1)>")
+    ap.add_argument("--partition-out", required=True, help="Refined partition.txt")
+    ap.add_argument("--lef", nargs="*", default=[], help="LEF files providing MACRO SIZE for area weights")
+    ap.add_argument("--result", default=None,
+                    help="partition.result.tcl; supplies UB and base balance when not given")
+    ap.add_argument("--ub-factor", type=float, default=None,
+                    help="Balance constraint in percent, as TritonPart -balance_constraint")
+    ap.add_argument("--base-balance", type=float, nargs=2, default=None, metavar=("B0", "B1"))
+    ap.add_argument("--fixed", default=None, help="File of <inst> <die> lines pinned to their die")
+    ap.add_argument("--time-limit", type=float, default=30.0, help="Seconds for all passes (0 = unbounded)")
+    ap.add_argument("--max-passes", type=int, default=10)
+    ap.add_argument("--max-net-degree", type=int, default=0,
+                    help="Ignore nets with more instances than this (0 = keep all)")
+    args = ap.parse_args()
+
+    summary = read_partition_summary(args.result)
+    ub = args.ub_factor if args.ub_factor is not None else summary.get("ub", 1.0)
+    base_balance = tuple(args.base_balance) if args.base_balance else summary.get("base_balance", (0.5, 0.5))
+
+    part_map = parse_partition_file(args.partition)
+    if not part_map:
+        raise SystemExit(f"[ERROR] No partition entries parsed from '{args.partition}'.")
+
+    areas = parse_lef_areas(args.lef)
+    hg = build_hypergraph_from_def(args.def_in, areas, args.max_net_degree)
+
+    fixed_map = parse_partition_file(args.fixed) if args.fixed else {}
+    part: List[int] = []
+    fixed: List[bool] = []
+    unassigned = 0
+    for name in hg.names:
+        die = fixed_map.get(name, part_map.get(name))
+        if die is None:
+            unassigned += 1
+            die = 1
+        part.append(die)
+        fixed.append(name in fixed_map or name not in part_map)
+    if unassigned:
+        print(f"[WARN] {unassigned} DEF instances missing from partition; pinned to die 1.")
+
+    total = sum(hg.area)
+    max_area = ((base_balance[0] + ub / 100.0) * total,
+                (base_balance[1] + ub / 100.0) * total)
+    print(f"[INFO] {len(hg.names)} instances, {len(hg.nets)} nets, total area {total:.3f}, "
+          f"ub {ub:.3f}%, base balance {base_balance[0]:.3f}/{base_balance[1]:.3f}")
+
+    fm = FMRefiner(hg, part, max_area, fixed)
+    stats = fm.refine(args.time_limit, args.max_passes)
+    print(f"[INFO] cut {stats['initial_cut']} -> {stats['final_cut']} in {stats['passes']} passes "
+          f"({stats['runtime_s']:.2f}s), area {fm.side_area[0]:.3f}/{fm.side_area[1]:.3f} "
+          f"(max {max_area[0]:.3f}/{max_area[1]:.3f})")
+
+    assignment = dict(zip(hg.names, fm.part))
+    write_partition_file(args.partition_out, args.partition, assignment)
+    print(f"[INFO] Refined partition written to {args.partition_out}")
+
+if __name__ == "__main__":
+    main()
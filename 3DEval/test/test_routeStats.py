@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+# Route statement parsing of util/routeStats.py.
+#
+#   python3 test/test_routeStats.py
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+from routeStats import RouteStats  # noqa: E402
+
+
+class AddNetTest(unittest.TestCase):
+    def add(self, route):
+        stats = RouteStats()
+        rec = stats.add_net("NETS", ["- n1 ( a Y ) ( b A )", route + " ;"])
+        return stats, rec
+
+    def test_virtual_then_via(self):
+        stats, (_, wire, vias, hb, _) = self.add(
+            "+ ROUTED M2 ( 0 0 ) ( 100 0 ) VIRTUAL ( 100 500 ) ( 300 500 ) M2_M3")
+        self.assertEqual(wire, 100 + 200)  # no wire into the VIRTUAL point
+        self.assertEqual(vias, 1)
+        self.assertEqual(dict(stats.vias["NETS"]), {"M2_M3": 1})
+        self.assertEqual(dict(stats.wire["NETS"]), {"M2": 300})
+        self.assertEqual(hb, 0)
+
+    def test_virtual_repeats_coordinate(self):
+        _, (_, wire, vias, _, _) = self.add(
+            "+ ROUTED M2 ( 0 0 ) ( 100 0 ) VIRTUAL ( * 500 ) ( 100 700 ) hb_layer_0 "
+            "NEW M3 ( 5 5 ) ( 5 25 )")
+        self.assertEqual(wire, 100 + 200 + 20)
+        self.assertEqual(vias, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
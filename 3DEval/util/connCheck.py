@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+# This script checks that the 3D views written by generate_3d_views.py
+# (<design>_3D.fp.def/.v) are connectivity-equivalent to the 2D views they
+# were derived from (2_2_floorplan_io.def/.v), modulo the tier masters and
+# the pin_map of map.json. It is a cheap gate for ord-pre/cds-pre, not LVS.
+#
+# Both views are streamed and reduced to (key, instance, pin) elements: one
+# per net connection (key = net) and one per component (pin = base master),
+# with upper-tier pins mapped back through the inverse pin_map. A multiset
+# hash (sum of element hashes, order independent) of each view is compared
+# first; only when they differ are per-net hashes of the 2D view built and
+# cancelled against the 3D view, leaving exactly the differing nets, whose
+# connections are then collected in one more pass for the report.
+#
+#   connCheck.py --def-2d 2_2_floorplan_io.def --def-3d gcd_3D.fp.def \
+#                --v-2d 2_2_floorplan_io.v --v-3d gcd_3D.fp.v --cell-map map.json
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from defStream import iter_def_statements, net_connections, normalize_name, open_def
+
+MASK = (1 << 64) - 1
+V_INST_RE = re.compile(
+    r"^\s*(\\\S+|[A-Za-z_][\w$]*)\s*(?:#\s*\(.*?\)\s*)?(\\\S+|[A-Za-z_][\w$]*)\s*\((.*)\)\s*$",
+    re.S,
+)
+V_PORT_RE = re.compile(r"\.\s*([A-Za-z_][\w$]*)\s*\(\s*(\\\S+|[^()]*?)\s*\)")
+V_CONST_RE = re.compile(r"^(?:\d*'[sS]?[bBoOdDhH][0-9a-fA-FxXzZ_?]+|\d+)$")
+V_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+V_KEYWORDS = {"module", "input", "output", "inout", "wire", "reg", "assign", "supply0",
+              "supply1", "tri", "parameter", "localparam", "endmodule"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Connectivity equivalence of generated 3D views against the 2D views"
+    )
+    parser.add_argument("--def-2d", help="2D DEF (e.g. 2_2_floorplan_io.def)")
+    parser.add_argument("--def-3d", help="3D DEF written by generate_3d_views.py")
+    parser.add_argument("--v-2d", help="2D netlist (e.g. 2_2_floorplan_io.v)")
+    parser.add_argument("--v-3d", help="3D netlist written by generate_3d_views.py")
+    parser.add_argument("--cell-map", default=None,
+                        help="map.json used for the conversion (tier macros and pin_map)")
+    parser.add_argument("--max-report", type=int, default=20,
+                        help="Differing nets/instances to detail per view")
+    args = parser.parse_args()
+    if not (args.def_2d and args.def_3d) and not (args.v_2d and args.v_3d):
+        parser.error("give --def-2d/--def-3d and/or --v-2d/--v-3d")
+    if bool(args.def_2d) != bool(args.def_3d) or bool(args.v_2d) != bool(args.v_3d):
+        parser.error("2D and 3D views come in pairs")
+    return args
+
+
+# ==============================================================================
+# Cell map
+# ==============================================================================
+
+
+class CellMap:
+    """Tier master -> base master, and base -> inverse pin_map of its upper view."""
+
+    def __init__(self, path=None):
+        self.macro_base = {}
+        self.upper_macros = set()
+        self.inverse_pins = {}
+        if not path:
+            return
+        if not os.path.exists(path):
+            print("[WARN] cell map JSON '{}' not found, using the _upper/_bottom suffixes".format(path))
+            return
+        with open(path) as f:
+            cells = json.load(f).get("cells", {})
+        for key, cell in cells.items():
+            if not isinstance(cell, dict):
+                continue
+            base = cell.get("base", key)
+            for tier in ("bottom", "upper"):
+                view = cell.get(tier)
+                if isinstance(view, dict) and view.get("macro"):
+                    self.macro_base[view["macro"]] = base
+                    if tier == "upper":
+                        self.upper_macros.add(view["macro"])
+            pin_map = cell.get("pin_map")
+            if isinstance(pin_map, dict):
+                inverse = {v: k for k, v in pin_map.items() if k != v}
+                if inverse:
+                    self.inverse_pins[base] = inverse
+
+    def resolve(self, master):
+        """(base master, inverse pin map or None) of a 2D or 3D master."""
+        base = self.macro_base.get(master)
+        upper = master in self.upper_macros
+        if base is None:
+            if master.endswith("_upper"):
+                base, upper = master[:-6], True
+            elif master.endswith("_bottom"):
+                base = master[:-7]
+            else:
+                base = master
+        return base, (self.inverse_pins.get(base) if upper else None)
+
+
+# ==============================================================================
+# Views as (key, instance, pin) elements
+# ==============================================================================
+
+
+def def_elements(path, cell_map):
+    """
+    Yield (key, inst, pin) of a DEF: ('C', inst) -> base master for every
+    component, ('N', net) -> (inst, base pin) for every net connection.
+    Routing after the first '+' option is ignored.
+    """
+    remap = {}  # upper instances whose pins were renamed -> inverse pin map
+    with open_def(path) as f:
+        for section, lines in iter_def_statements(f):
+            if section == "COMPONENTS":
+                toks = lines[0].split()
+                if len(toks) < 3:
+                    continue
+                inst = normalize_name(toks[1])
+                base, inverse = cell_map.resolve(toks[2])
+                if inverse:
+                    remap[inst] = inverse
+                yield ("C", inst), inst, base
+            elif section == "NETS":
+                net, conns = net_connections(lines)
+                if net is None:
+                    continue
+                key = ("N", net)
+                for inst, pin in conns:
+                    inverse = remap.get(inst)
+                    if inverse:
+                        pin = inverse.get(pin, pin)
+                    yield key, inst, pin
+
+
+def verilog_statements(path):
+    """Yield the ';'-terminated statements of a netlist with comments removed."""
+    buf = []
+    in_block = False
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if in_block:
+                end = line.find("*/")
+                if end < 0:
+                    continue
+                line = line[end + 2:]
+                in_block = False
+            line = V_COMMENT_RE.sub(" ", line)
+            start = line.find("/*")
+            if start >= 0:
+                line, in_block = line[:start], True
+            else:
+                k = line.find("//")
+                if k >= 0:
+                    line = line[:k]
+            while ";" in line:
+                head, line = line.split(";", 1)
+                buf.append(head)
+                yield "".join(buf)
+                buf = []
+            if line.strip():
+                buf.append(line)
+    if buf and "".join(buf).strip():
+        yield "".join(buf)
+
+
+def verilog_elements(path, cell_map):
+    """
+    Yield (key, inst, pin) of a structural netlist, keyed per module:
+    ('C', module, inst) -> base master, ('N', module, net) -> (inst, base pin).
+    Constant port bindings (the 1'b0 ties added for extra upper pins) and
+    empty ports are not connections. Other statements (assign, port and wire
+    declarations) become ('S', module, text) elements.
+    """
+    module = ""
+    for stmt in verilog_statements(path):
+        text = " ".join(stmt.split())
+        if not text:
+            continue
+        word = text.split(None, 1)[0]
+        if word == "endmodule" or text.startswith("endmodule "):
+            # 'endmodule' carries no ';' and sticks to the next statement
+            text = text[len("endmodule"):].strip()
+            module = ""
+            if not text:
+                continue
+            word = text.split(None, 1)[0]
+        if word == "module":
+            module = normalize_name(text.split(None, 2)[1].split("(")[0])
+            continue
+        m = V_INST_RE.match(text) if word not in V_KEYWORDS else None
+        if not m:
+            yield ("S", module, text), "", ""
+            continue
+        inst = normalize_name(m.group(2))
+        base, inverse = cell_map.resolve(normalize_name(m.group(1)))
+        yield ("C", module, inst), inst, base
+        for pm in V_PORT_RE.finditer(m.group(3)):
+            pin, net = pm.group(1), pm.group(2).strip()
+            if not net or V_CONST_RE.match(net):
+                continue
+            if inverse:
+                pin = inverse.get(pin, pin)
+            yield ("N", module, normalize_name(net)), inst, pin
+
+
+# ==============================================================================
+# Comparison
+# ==============================================================================
+
+
+def _h(key, inst, pin):
+    return hash((key, inst, pin)) & MASK
+
+
+def fingerprint(elements):
+    total = count = 0
+    for key, inst, pin in elements:
+        total += _h(key, inst, pin)
+        count += 1
+    return total & MASK, count
+
+
+def differing_keys(elements_a, elements_b):
+    """Keys whose element multisets differ between the two views."""
+    sums = {}
+    for key, inst, pin in elements_a:
+        sums[key] = (sums.get(key, 0) + _h(key, inst, pin)) & MASK
+    for key, inst, pin in elements_b:
+        sums[key] = (sums.get(key, 0) - _h(key, inst, pin)) & MASK
+    return [k for k, v in sums.items() if v]
+
+
+def _collect(elements, keys):
+    found = {k: [] for k in keys}
+    for key, inst, pin in elements:
+        if key in found:
+            found[key].append((inst, pin))
+    return found
+
+
+def _key_label(key):
+    kind = {"C": "instance", "N": "net", "S": "statement"}[key[0]]
+    return "{} {}".format(kind, "/".join(k for k in key[1:] if k))
+
+
+def _fmt(pairs):
+    return " ".join("( {} {} )".format(i, p) if i else "" for i, p in pairs).strip() or "-"
+
+
+def check_view(label, path_2d, path_3d, elements_of, cell_map, max_report):
+    """Compare one pair of views; returns the number of differing keys."""
+    fp_2d = fingerprint(elements_of(path_2d, cell_map))
+    fp_3d = fingerprint(elements_of(path_3d, cell_map))
+    if fp_2d == fp_3d:
+        print("[CONN] {}: {} elements equivalent ({} vs {})".format(
+            label, fp_2d[1], os.path.basename(path_2d), os.path.basename(path_3d)))
+        return 0
+    keys = differing_keys(elements_of(path_2d, cell_map), elements_of(path_3d, cell_map))
+    if not keys:
+        # Only possible for a hash collision in the per-key pass
+        print("[WARN] {}: view fingerprints differ but no key does".format(label))
+        return 0
+    print("[ERROR] {}: {} net(s)/instance(s) differ between {} and {}".format(
+        label, len(keys), path_2d, path_3d))
+    shown = sorted(keys, key=str)[:max_report]
+    a = _collect(elements_of(path_2d, cell_map), shown)
+    b = _collect(elements_of(path_3d, cell_map), shown)
+    for key in shown:
+        missing = sorted(set(a[key]) - set(b[key]))
+        extra = sorted(set(b[key]) - set(a[key]))
+        if key[0] == "C":
+            print("  {}: master {} vs {}".format(
+                _key_label(key), _fmt_master(a[key]), _fmt_master(b[key])))
+            continue
+        if not missing and not extra:
+            missing, extra = a[key], b[key]  # same set, different multiplicity
+        print("  {}: missing {} ; extra {}".format(_key_label(key), _fmt(missing), _fmt(extra)))
+    if len(keys) > len(shown):
+        print("  ... {} more".format(len(keys) - len(shown)))
+    return len(keys)
+
+
+def _fmt_master(pairs):
+    return ",".join(p for _, p in pairs) or "(absent)"
+
+
+def main():
+    args = parse_args()
+    cell_map = CellMap(args.cell_map)
+    bad = 0
+    if args.def_2d:
+        bad += check_view("DEF", args.def_2d, args.def_3d, def_elements, cell_map, args.max_report)
+    if args.v_2d:
+        bad += check_view("Verilog", args.v_2d, args.v_3d, verilog_elements, cell_map,
+                          args.max_report)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+# This script splits a 3D DEF (e.g. 6_final.def) into per-die DEFs
+# (<stem>_upper.def / <stem>_bottom.def) in a single streaming pass.
+# COMPONENTS are classified by their _upper/_bottom master suffix (the same
+# convention strip_tier_suffix relies on); NETS/SPECIALNETS keep only the
+# connections of the die's instances and, for routed nets, only the wire
+# pieces on that die's metal stack. Section bodies are spooled to temporary
+# files so the rewritten section counts can be emitted without holding the
+# design in memory.
+# -----------------------------------------------------------------------------
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from defStream import SECTION_BEGIN_RE, SECTION_END_RE, iter_def_statements, open_def, tier_of_master
+
+TIER_NAMES = ("upper", "bottom")  # index == partition.txt die id
+COUNTED_SECTIONS = ("COMPONENTS", "NETS", "SPECIALNETS")
+ROUTE_KEYWORDS = ("ROUTED", "FIXED", "COVER", "NOSHIELD")
+IN_ROUTE_OPTIONS = ("SHAPE", "STYLE", "MASK")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Streams a 3D DEF and writes one DEF per die"
+    )
+    parser.add_argument("--def", "-i", dest="def_files", nargs="+", required=True,
+                        help="DEF file(s) to split")
+    parser.add_argument("--outdir", "-o", default=None,
+                        help="Output directory (default: next to each input)")
+    parser.add_argument("--upper-suffix", nargs="+", default=["_m", "_add"],
+                        help="Metal layer suffixes of the upper tier stack (default: _m _add)")
+    parser.add_argument("--no-routing", action="store_true",
+                        help="Drop routing from the per-die NETS/SPECIALNETS")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Number of DEFs split in parallel")
+    return parser.parse_args()
+
+
+class NetFilter:
+    """Rewrites one '- net ... ;' statement for a single die."""
+
+    def __init__(self, inst_tier, upper_suffix=("_m", "_add"), keep_routing=True):
+        self.inst_tier = inst_tier
+        self.upper_suffix = tuple(upper_suffix)
+        self.keep_routing = keep_routing
+
+    def layer_tier(self, layer):
+        return 0 if layer.endswith(self.upper_suffix) else 1
+
+    def split(self, lines):
+        """
+        Parse a net statement once and return (name, conns, props, pieces):
+        conns as (tier or None, text), props as plain '+ ...' texts, pieces as
+        (route keyword, [(tier, text), ...]).
+        """
+        toks = " ".join(lines).split()
+        n = len(toks)
+        name = toks[1] if n > 1 else ""
+        conns = []
+        i = 2
+        while i < n and toks[i] == "(":
+            j = i + 1
+            while j < n and toks[j] != ")":
+                j += 1
+            inst = toks[i + 1] if i + 1 < j else "*"
+            conns.append((self.inst_tier.get(inst), " ".join(toks[i:j + 1])))
+            i = j + 1
+
+        props = []
+        routes = []
+        while i < n:
+            if toks[i] == ";":
+                break
+            if toks[i] != "+" or i + 1 >= n:
+                i += 1
+                continue
+            if toks[i + 1] not in ROUTE_KEYWORDS:
+                j = i + 1
+                while j < n and toks[j] not in ("+", ";"):
+                    j += 1
+                props.append(" ".join(toks[i:j]))
+                i = j
+                continue
+            keyword = toks[i + 1]
+            i += 2
+            pieces = []
+            cur = []
+            while i < n:
+                tok = toks[i]
+                if tok == ";":
+                    break
+                if tok == "+" and not (i + 1 < n and toks[i + 1] in IN_ROUTE_OPTIONS):
+                    break
+                if tok == "NEW":
+                    if cur:
+                        pieces.append(cur)
+                    cur = []
+                    i += 1
+                    continue
+                cur.append(tok)
+                i += 1
+            if cur:
+                pieces.append(cur)
+            routes.append((keyword, [(self.layer_tier(p[0]), " ".join(p)) for p in pieces]))
+        return name, conns, props, routes
+
+    def render(self, parsed, tier):
+        """Return the statement text for tier, or None if the net has no member there."""
+        name, conns, props, routes = parsed
+        tiers = {t for t, _ in conns if t is not None}
+        if tiers and tier not in tiers:
+            return None
+        kept = [text for t, text in conns if t is None or t == tier]
+        out = ["- " + name]
+        if kept:
+            out.append(" " + " ".join(kept))
+        if self.keep_routing:
+            for keyword, pieces in routes:
+                mine = [text for t, text in pieces if t == tier]
+                if mine:
+                    out.append("\n  + {} ".format(keyword) + "\n    NEW ".join(mine))
+        for prop in props:
+            out.append("\n  " + prop)
+        out.append(" ;\n")
+        return "".join(out)
+
+
+def split_def(def_path, outdir=None, upper_suffix=("_m", "_add"), keep_routing=True):
+    """Split def_path into per-die DEFs; returns the output paths (upper, bottom)."""
+    stem = os.path.basename(def_path)
+    ext = ".def"
+    for suffix in (".def.gz", ".def"):
+        if stem.endswith(suffix):
+            stem, ext = stem[: -len(suffix)], suffix
+            break
+    outdir = outdir or os.path.dirname(os.path.abspath(def_path))
+    os.makedirs(outdir, exist_ok=True)
+    out_paths = tuple(os.path.join(outdir, "{}_{}{}".format(stem, t, ext)) for t in TIER_NAMES)
+
+    inst_tier = {}
+    net_filter = NetFilter(inst_tier, upper_suffix, keep_routing)
+    src = open_def(def_path)
+    outs = [open_def(p, "wt") for p in out_paths]
+    spools = None
+    counts = [0, 0]
+    section = None
+    try:
+        for sec, lines in iter_def_statements(src):
+            if sec is None:
+                line = lines[0]
+                if section is None:
+                    m = SECTION_BEGIN_RE.match(line)
+                    if m and m.group(1) in COUNTED_SECTIONS:
+                        section = m.group(1)
+                        spools = [tempfile.TemporaryFile("w+t") for _ in outs]
+                        counts = [0, 0]
+                        continue
+                elif SECTION_END_RE.match(line):
+                    for k, out in enumerate(outs):
+                        out.write("{} {} ;\n".format(section, counts[k]))
+                        spools[k].seek(0)
+                        shutil.copyfileobj(spools[k], out)
+                        spools[k].close()
+                        out.write(line)
+                    spools = None
+                    section = None
+                    continue
+                targets = spools if spools else outs
+                for out in targets:
+                    out.write(line)
+                continue
+
+            if sec == "COMPONENTS":
+                toks = " ".join(lines).split()
+                tier = tier_of_master(toks[2]) if len(toks) >= 3 else None
+                if len(toks) >= 2 and tier is not None:
+                    inst_tier[toks[1]] = tier
+                for k in range(len(outs)):
+                    if tier is None or tier == k:
+                        spools[k].writelines(lines)
+                        counts[k] += 1
+            elif sec in ("NETS", "SPECIALNETS"):
+                parsed = net_filter.split(lines)
+                for k in range(len(outs)):
+                    text = net_filter.render(parsed, k)
+                    if text is not None:
+                        spools[k].write(text)
+                        counts[k] += 1
+            else:
+                for out in outs:
+                    out.writelines(lines)
+    finally:
+        src.close()
+        for out in outs:
+            out.close()
+        for spool in spools or ():
+            spool.close()
+    return out_paths
+
+
+def main():
+    args = parse_args()
+    keep_routing = not args.no_routing
+    failed = False
+    if args.jobs <= 1 or len(args.def_files) == 1:
+        for path in args.def_files:
+            upper, bottom = split_def(path, args.outdir, args.upper_suffix, keep_routing)
+            print("[INFO] {} -> {}, {}".format(path, upper, bottom))
+        return
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(split_def, path, args.outdir, args.upper_suffix, keep_routing): path
+            for path in args.def_files
+        }
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                upper, bottom = fut.result()
+                print("[INFO] {} -> {}, {}".format(path, upper, bottom))
+            except Exception as e:
+                print("[ERROR] {}: {}".format(path, e))
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# Streaming helpers shared by the DEF analysis scripts in util/. A DEF is
+# consumed one ';'-terminated statement at a time, so memory stays bounded by
+# the largest single statement (usually one big routed net) instead of the
+# file size.
+# -----------------------------------------------------------------------------
+
+import gzip
+import re
+
+SECTION_BEGIN_RE = re.compile(r"^\s*(COMPONENTS|NETS|SPECIALNETS|PINS|BLOCKAGES|VIAS)\b")
+SECTION_END_RE = re.compile(r"^\s*END\s+(COMPONENTS|NETS|SPECIALNETS|PINS|BLOCKAGES|VIAS)\b")
+UNITS_RE = re.compile(r"^\s*UNITS\s+DISTANCE\s+MICRONS\s+(\d+)")
+DIEAREA_RE = re.compile(r"^\s*DIEAREA\b(.*)")
+# NETS connection tuple: ( inst pin ), ( PIN name ) or a routing point ( x y )
+DEF_CONN_RE = re.compile(r"\(\s*(\S+)\s+(\S+)\s*\)")
+# Start of the first '+' option of a statement (USE, ROUTED, ...)
+DEF_OPTION_RE = re.compile(r"\s\+\s")
+
+
+def open_def(path, mode="rt"):
+    """Open a DEF, transparently handling .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8", errors="ignore")
+    return open(path, mode, encoding="utf-8", errors="ignore")
+
+
+def iter_def_statements(f):
+    """
+    Yield (section, lines) for every line group of the DEF read from f.
+
+    Inside COMPONENTS/NETS/SPECIALNETS/PINS/BLOCKAGES/VIAS each '- ...;' item
+    is yielded as one group tagged with its section name. Everything else
+    (header lines, section begin/end lines) is yielded line by line with
+    section None, so writers can copy it through verbatim.
+    """
+    section = None
+    buf = []
+    for line in f:
+        if buf:
+            buf.append(line)
+            if ";" in line:
+                yield section, buf
+                buf = []
+            continue
+        if section is None:
+            m = SECTION_BEGIN_RE.match(line)
+            if m:
+                section = m.group(1)
+            yield None, [line]
+            continue
+        if SECTION_END_RE.match(line):
+            section = None
+            yield None, [line]
+            continue
+        if line.lstrip().startswith("-"):
+            if ";" in line:
+                yield section, [line]
+            else:
+                buf = [line]
+            continue
+        yield None, [line]
+    if buf:
+        yield section, buf
+
+
+def normalize_name(s):
+    """
+    Instance/net identifier as DEF, Verilog and partition.txt spell it:
+    surrounding whitespace and a Verilog escape backslash removed, DEF/SPEF
+    bracket and divider escapes ('\\[', '\\]', '\\/') unescaped.
+    """
+    t = s.strip()
+    if t.startswith("\\"):
+        t = t[1:]
+    return t.replace("\\[", "[").replace("\\]", "]").replace("\\/", "/")
+
+
+def net_connections(lines):
+    """
+    (net, [(inst, pin)]) of one NETS statement from iter_def_statements, or
+    (None, []) for an empty one. Routing after the first '+' option is
+    ignored; net and instance names are normalized, IO pins have inst 'PIN'.
+    """
+    text = "".join(lines).lstrip()[1:]
+    head = DEF_OPTION_RE.split(text, 1)[0].rstrip().rstrip(";")
+    parts = head.split(None, 1)
+    if not parts:
+        return None, []
+    conns = []
+    for m in DEF_CONN_RE.finditer(parts[1] if len(parts) > 1 else ""):
+        inst = m.group(1)
+        conns.append((inst if inst == "PIN" else normalize_name(inst), m.group(2)))
+    return normalize_name(parts[0]), conns
+
+
+def parse_units(line):
+    """Return DEF database units per micron from a UNITS line, else None."""
+    m = UNITS_RE.match(line)
+    return int(m.group(1)) if m else None
+
+
+def parse_diearea(line):
+    """Return (xmin, ymin, xmax, ymax) in DBU from a DIEAREA line, else None."""
+    m = DIEAREA_RE.match(line)
+    if not m:
+        return None
+    nums = [int(float(x)) for x in re.findall(r"-?\d+(?:\.\d+)?", m.group(1))]
+    if len(nums) < 4:
+        return None
+    xs, ys = nums[0::2], nums[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def tier_of_master(master):
+    """0 for *_upper masters, 1 for *_bottom, None otherwise (partition.txt die ids)."""
+    if master.endswith("_upper"):
+        return 0
+    if master.endswith("_bottom"):
+        return 1
+    return None
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+
+# This script keeps the design of one run loaded in a local daemon and
+# answers queries about it over a Unix socket, so analysis scripts and the
+# orchestrator's stage checks do not re-parse DEF/LEF for every question.
+#
+# The daemon loads from a results/ directory the newest DEF (or --def), the
+# partition.txt, the netlist written with that DEF (same stem, or --netlist)
+# and the macro sizes of --lef / --platform-dir LEFs (through the
+# lefMacroDb.py cache) into flat arrays: an instance table (master, tier,
+# module), a master table (size, area), the nets as CSR (net_ptr into
+# net_inst/net_pin) with its instance -> net transpose, and per-net tier
+# spans. The module of an instance is the deepest hierarchical instance of
+# the netlist on its path; a flat (or missing) netlist leaves only the name
+# prefix the flattening kept, which is used instead. Before answering it re-stats its inputs (at most every --poll
+# seconds) and reloads when one changed or a newer DEF appeared.
+#
+# Protocol: one JSON request per line, a query {"op": ...} or a list of them
+# (answered in order, as a list); one JSON line back. Ops:
+#   stats | inst name | net name | cross_tier_nets inst | cut_nets [limit]
+#   tier_area [by: module|master] [depth] | reload
+#
+#   serve : designQuery.py serve --results results/asap7_3D/gcd/base --platform-dir platforms/asap7_3D
+#   query : designQuery.py query --results results/asap7_3D/gcd/base stats \
+#               '{"op": "cross_tier_nets", "inst": "_123_"}'
+#
+#   from designQuery import DesignClient
+#   DesignClient(socket_path(results)).query([{"op": "tier_area", "by": "module"}])
+# -----------------------------------------------------------------------------
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import numpy as np
+
+from connCheck import V_INST_RE, V_KEYWORDS, verilog_statements
+from defStream import (iter_def_statements, net_connections, normalize_name, open_def,
+                       tier_of_master)
+from lefMacroDb import MacroDb
+
+TIERS = ("upper", "bottom")  # partition.txt die ids 0 / 1
+NO_TIER = -1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Design query daemon over the results/ artifacts of one run"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "query"):
+        p = sub.add_parser(name)
+        p.add_argument("--results", "-r", default=None, help="Results directory of the run")
+        p.add_argument("--socket", default=None,
+                       help="Socket path (default: derived from --results)")
+    p = sub.choices["serve"]
+    p.add_argument("--def", dest="def_file", default=None,
+                   help="DEF to serve (default: newest *.def in --results)")
+    p.add_argument("--partition", default=None,
+                   help="partition.txt (default: --results/partition.txt)")
+    p.add_argument("--netlist", default=None,
+                   help="Verilog netlist for the module hierarchy (default: the DEF's .v)")
+    p.add_argument("--lef", nargs="*", default=[], help="LEFs with the macro sizes")
+    p.add_argument("--platform-dir", default=None, help="Use every LEF of a platform")
+    p.add_argument("--lef-cache", default=None, help="lefMacroDb.py cache file")
+    p.add_argument("--poll", type=float, default=1.0,
+                   help="Minimum seconds between input change checks")
+    p = sub.choices["query"]
+    p.add_argument("queries", nargs="+",
+                   help="Op names or JSON queries, sent as one batch")
+    p.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    if not args.socket and not args.results:
+        parser.error("give --results or --socket")
+    return args
+
+
+def socket_path(results):
+    """Default socket of a results directory (short enough for AF_UNIX)."""
+    key = hashlib.blake2b(os.path.abspath(results).encode(), digest_size=6).hexdigest()
+    base = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(base, "3deval-query.{}.sock".format(key))
+
+
+# ==============================================================================
+# Design arrays
+# ==============================================================================
+
+
+class _Interner:
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __call__(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+
+def newest_def(results):
+    paths = [p for p in glob.glob(os.path.join(results, "*.def"))
+             + glob.glob(os.path.join(results, "*.def.gz")) if ".tmp." not in p]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def read_partition(path):
+    part = {}
+    if not path or not os.path.exists(path):
+        return part
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            toks = line.split()
+            if len(toks) >= 2 and toks[-1] in ("0", "1") and not toks[0].startswith(("#", "//")):
+                part[normalize_name(toks[0])] = int(toks[-1])
+    return part
+
+
+def netlist_of(def_path):
+    """The netlist written with a DEF (<stem>.v), or None."""
+    stem = def_path[:-len(".gz")] if def_path.endswith(".gz") else def_path
+    path = os.path.splitext(stem)[0] + ".v"
+    return path if os.path.exists(path) else None
+
+
+def read_hierarchy(path):
+    """
+    (top, {instance path: module}) of the hierarchical instances of a
+    netlist, i.e. those whose master is a module of the file; the map is
+    empty for a flat netlist.
+    """
+    insts = {}
+    module = None
+    for stmt in verilog_statements(path):
+        text = " ".join(stmt.split())
+        if text.startswith("endmodule"):
+            # 'endmodule' carries no ';' and sticks to the next statement
+            text = text[len("endmodule"):].strip()
+            module = None
+        if not text:
+            continue
+        word = text.split(None, 1)[0]
+        if word == "module":
+            module = normalize_name(text.split(None, 2)[1].split("(")[0])
+            insts[module] = []
+            continue
+        m = V_INST_RE.match(text) if module is not None and word not in V_KEYWORDS else None
+        if m:
+            insts[module].append((normalize_name(m.group(2)), normalize_name(m.group(1))))
+    children = {mod: [(i, sub) for i, sub in subs if sub in insts] for mod, subs in insts.items()}
+    used = {sub for subs in children.values() for _, sub in subs}
+    tops = [mod for mod in insts if mod not in used]
+    if not tops:
+        return None, {}
+    top = max(tops, key=lambda mod: len(insts[mod]))
+    paths = {}
+    stack = [("", top)]
+    while stack:
+        prefix, mod = stack.pop()
+        for inst, sub in children[mod]:
+            paths[prefix + inst] = sub
+            stack.append((prefix + inst + "/", sub))
+    return top, paths
+
+
+class Design:
+    """One DEF as flat arrays; instance/net/master ids index them."""
+
+    def __init__(self, def_path, partition=None, macros=None, hierarchy=None):
+        self.def_path = def_path
+        insts, masters, nets, pins = _Interner(), _Interner(), _Interner(), _Interner()
+        inst_master, inst_suffix_tier = [], []
+        net_ptr, net_inst, net_pin = [0], [], []
+        with open_def(def_path) as f:
+            for section, lines in iter_def_statements(f):
+                if section == "COMPONENTS":
+                    toks = lines[0].split()
+                    if len(toks) < 3:
+                        continue
+                    i = insts(normalize_name(toks[1]))
+                    if i == len(inst_master):
+                        inst_master.append(masters(toks[2]))
+                        tier = tier_of_master(toks[2])
+                        inst_suffix_tier.append(NO_TIER if tier is None else tier)
+                elif section == "NETS":
+                    net, conns = net_connections(lines)
+                    if net is None:
+                        continue
+                    nets(net)
+                    for inst, pin in conns:
+                        net_inst.append(-1 if inst == "PIN" else insts.ids.get(inst, -1))
+                        net_pin.append(pins(pin))
+                    net_ptr.append(len(net_inst))
+
+        self.inst_names, self.inst_ids = insts.names[:len(inst_master)], insts.ids
+        self.master_names, self.master_ids = masters.names, masters.ids
+        self.net_names, self.net_ids = nets.names, nets.ids
+        self.pin_names = pins.names
+        self.inst_master = np.asarray(inst_master, dtype=np.int32)
+        self.net_ptr = np.asarray(net_ptr, dtype=np.int64)
+        self.net_inst = np.asarray(net_inst, dtype=np.int32)
+        self.net_pin = np.asarray(net_pin, dtype=np.int32)
+
+        # tier: partition.txt first, else the master suffix
+        tier = np.asarray(inst_suffix_tier, dtype=np.int8)
+        for name, die in (partition or {}).items():
+            i = self.inst_ids.get(name)
+            if i is not None and i < len(tier):
+                tier[i] = die
+        self.inst_tier = tier
+
+        # module: deepest netlist hierarchy instance on the path, else the name prefix
+        top, paths = hierarchy or (None, {})
+        modules, deepest = _Interner(), {}
+
+        def module_of(name):
+            prefix = name.rpartition("/")[0]
+            k = deepest.get(prefix)
+            if k is None:
+                p = prefix
+                while paths and p and p not in paths:
+                    p = p.rpartition("/")[0]
+                k = deepest[prefix] = modules(p)
+            return k
+
+        self.inst_module = np.fromiter((module_of(n) for n in self.inst_names),
+                                       dtype=np.int32, count=len(self.inst_names))
+        self.module_names = modules.names
+        self.module_types = [paths.get(m, top if not m else None) for m in modules.names]
+
+        # masters: LEF size, NaN when no LEF has the macro
+        macros = macros or {}
+        size = np.full((len(self.master_names), 2), np.nan)
+        for k, name in enumerate(self.master_names):
+            found = macros.get(name)  # (record, LEF) of lefMacroDb.MacroDb.index
+            if found is not None:
+                size[k] = found[0][:2]
+        self.master_size = size
+        self.master_area = size[:, 0] * size[:, 1]
+        self.inst_area = self.master_area[self.inst_master] if len(self.inst_master) else np.zeros(0)
+
+        # instance -> nets transpose of the CSR (instance pins only)
+        conn_net = np.repeat(np.arange(len(self.net_names), dtype=np.int32), np.diff(self.net_ptr))
+        on_inst = self.net_inst >= 0
+        order = np.argsort(self.net_inst[on_inst], kind="stable")
+        self.inst_net = conn_net[on_inst][order]
+        self.inst_ptr = np.zeros(len(self.inst_names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.net_inst[on_inst], minlength=len(self.inst_names)),
+                  out=self.inst_ptr[1:])
+
+        # per-net tier span over its tiered instances; cut = both tiers present
+        conn_tier = np.append(self.inst_tier, NO_TIER)[self.net_inst]  # PIN (-1) -> NO_TIER
+        has = np.zeros((len(self.net_names), len(TIERS)), dtype=bool)
+        tiered = conn_tier >= 0
+        has[conn_net[tiered], conn_tier[tiered]] = True
+        self.net_tiers = has
+        self.net_cut = has.all(axis=1)
+
+    # --------------------------------------------------------------------------
+
+    def _tier_name(self, t):
+        return TIERS[t] if t >= 0 else None
+
+    def _inst(self, name):
+        i = self.inst_ids.get(normalize_name(name))
+        if i is None or i >= len(self.inst_names):
+            raise KeyError("no instance {}".format(name))
+        return i
+
+    def _net(self, name):
+        n = self.net_ids.get(normalize_name(name))
+        if n is None:
+            raise KeyError("no net {}".format(name))
+        return n
+
+    def _nets_of(self, i):
+        return self.inst_net[self.inst_ptr[i]:self.inst_ptr[i + 1]]
+
+    def stats(self):
+        return {
+            "def": self.def_path,
+            "instances": len(self.inst_names),
+            "masters": len(self.master_names),
+            "nets": len(self.net_names),
+            "connections": int(len(self.net_inst)),
+            "tier_instances": {t: int((self.inst_tier == k).sum()) for k, t in enumerate(TIERS)},
+            "untiered_instances": int((self.inst_tier == NO_TIER).sum()),
+            "cut_nets": int(self.net_cut.sum()),
+            "masters_without_size": int(np.isnan(self.master_area).sum()),
+        }
+
+    def inst(self, name):
+        i = self._inst(name)
+        m = self.inst_master[i]
+        return {
+            "name": self.inst_names[i],
+            "master": self.master_names[m],
+            "tier": self._tier_name(self.inst_tier[i]),
+            "module": self.module_names[self.inst_module[i]],
+            "module_type": self.module_types[self.inst_module[i]],
+            "area": _num(self.master_area[m]),
+            "nets": [self.net_names[n] for n in self._nets_of(i)],
+        }
+
+    def net(self, name):
+        n = self._net(name)
+        a, b = self.net_ptr[n], self.net_ptr[n + 1]
+        return {
+            "name": self.net_names[n],
+            "cut": bool(self.net_cut[n]),
+            "tiers": [t for k, t in enumerate(TIERS) if self.net_tiers[n, k]],
+            "connections": [["PIN" if i < 0 else self.inst_names[i], self.pin_names[p]]
+                            for i, p in zip(self.net_inst[a:b], self.net_pin[a:b])],
+        }
+
+    def cross_tier_nets(self, inst):
+        nets = self._nets_of(self._inst(inst))
+        return [self.net_names[n] for n in nets[self.net_cut[nets]]]
+
+    def cut_nets(self, limit=None):
+        ids = np.flatnonzero(self.net_cut)
+        if limit is not None:
+            ids = ids[:int(limit)]
+        return [self.net_names[n] for n in ids]
+
+    def tier_area(self, by=None, depth=None):
+        """Instance area per tier, optionally per module (prefix at depth) or master."""
+        area = np.nan_to_num(self.inst_area)
+        tier = self.inst_tier.astype(np.int64) + 1  # 0 = untiered
+        names = ["untiered"] + list(TIERS)
+        if by is None:
+            total = np.bincount(tier, weights=area, minlength=len(names))
+            return {names[k]: float(total[k]) for k in range(len(names)) if total[k]}
+        if by == "master":
+            keys, groups = self.master_names, self.inst_master
+        elif by == "module":
+            keys = self.module_names
+            if depth is not None:
+                cut = _Interner()
+                remap = np.fromiter(
+                    (cut("/".join(m.split("/")[:int(depth)]) if m else "") for m in keys),
+                    dtype=np.int32, count=len(keys))
+                keys, groups = cut.names, remap[self.inst_module]
+            else:
+                groups = self.inst_module
+        else:
+            raise ValueError("tier_area: 'by' must be module or master")
+        flat = np.bincount(groups.astype(np.int64) * len(names) + tier, weights=area,
+                           minlength=len(keys) * len(names)).reshape(len(keys), len(names))
+        return {keys[g] or "(top)": {names[k]: float(flat[g, k]) for k in range(len(names)) if flat[g, k]}
+                for g in np.flatnonzero(flat.sum(axis=1))}
+
+
+def _num(v):
+    return None if v != v else float(v)
+
+
+# ==============================================================================
+# Daemon
+# ==============================================================================
+
+
+class DesignStore:
+    """The served Design, reloaded when its inputs change."""
+
+    def __init__(self, args):
+        self.results = args.results
+        self.fixed_def = args.def_file
+        self.fixed_netlist = args.netlist
+        self.partition = args.partition or (
+            os.path.join(args.results, "partition.txt") if args.results else None)
+        lefs = list(args.lef)
+        if args.platform_dir:
+            lefs += [p for p in sorted(glob.glob(os.path.join(args.platform_dir, "**", "*.lef"),
+                                                 recursive=True))
+                     if "cover" not in os.path.basename(p)]
+        self.lefs = lefs
+        self.lef_cache = args.lef_cache
+        self.poll = args.poll
+        self.lock = threading.Lock()
+        self.design = None
+        self.stamp = None
+        self.checked = 0.0
+        self.loads = 0
+
+    def _inputs(self):
+        def_path = self.fixed_def or (newest_def(self.results) if self.results else None)
+        netlist = self.fixed_netlist or (netlist_of(def_path) if def_path else None)
+        return [p for p in [def_path, netlist, self.partition] + self.lefs if p]
+
+    def _stamp(self, paths):
+        stamp = []
+        for p in paths:
+            try:
+                st = os.stat(p)
+                stamp.append((p, st.st_size, st.st_mtime_ns))
+            except OSError:
+                stamp.append((p, None, None))
+        return stamp
+
+    def current(self, force=False):
+        """The Design, reloading first when an input changed since the last check."""
+        now = time.monotonic()
+        if not force and self.design is not None and now - self.checked < self.poll:
+            return self.design
+        with self.lock:
+            paths = self._inputs()
+            stamp = self._stamp(paths)
+            self.checked = time.monotonic()
+            if force or stamp != self.stamp or self.design is None:
+                self._load(paths[0] if paths else None,
+                           self.fixed_netlist or (netlist_of(paths[0]) if paths else None))
+                self.stamp = stamp
+        return self.design
+
+    def _load(self, def_path, netlist=None):
+        if not def_path or not os.path.exists(def_path):
+            raise FileNotFoundError("no DEF to serve in {}".format(self.results))
+        t0 = time.perf_counter()
+        db = MacroDb(self.lef_cache)
+        macros = db.index(self.lefs) if self.lefs else {}
+        db.save()
+        hierarchy = read_hierarchy(netlist) if netlist and os.path.exists(netlist) else None
+        if not (hierarchy and hierarchy[1]):
+            print("[WARNING] {}: modules taken from instance name prefixes".format(
+                "flat netlist " + netlist if hierarchy else "no netlist for " + def_path),
+                flush=True)
+        self.design = Design(def_path, read_partition(self.partition), macros, hierarchy)
+        self.loads += 1
+        print("[INFO] loaded {} ({} instances, {} nets) in {:.2f}s".format(
+            def_path, len(self.design.inst_names), len(self.design.net_names),
+            time.perf_counter() - t0), flush=True)
+
+
+def answer(store, query):
+    """Result of one query dict, or {'error': ...}."""
+    try:
+        if isinstance(query, str):
+            query = {"op": query}
+        op = query.get("op")
+        design = store.current(force=(op == "reload"))
+        if op in ("stats", "reload"):
+            result = design.stats()
+            result["loads"] = store.loads
+            return result
+        if op == "inst":
+            return design.inst(query["name"])
+        if op == "net":
+            return design.net(query["name"])
+        if op == "cross_tier_nets":
+            return design.cross_tier_nets(query["inst"])
+        if op == "cut_nets":
+            return design.cut_nets(query.get("limit"))
+        if op == "tier_area":
+            return design.tier_area(query.get("by"), query.get("depth"))
+        return {"error": "unknown op {}".format(op)}
+    except (KeyError, ValueError, OSError) as e:
+        return {"error": str(e).strip("'\"")}
+    except Exception as e:  # a malformed DEF/query must still get a reply
+        return {"error": "{}: {}".format(type(e).__name__, e)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                reply = {"error": "bad request: {}".format(e)}
+            else:
+                if isinstance(request, list):
+                    reply = [answer(self.server.store, q) for q in request]
+                else:
+                    reply = answer(self.server.store, request)
+            self.wfile.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(args, path):
+    if os.path.exists(path):
+        try:
+            DesignClient(path, timeout=1.0).query({"op": "stats"})
+            print("[ERROR] a daemon is already serving {}".format(path))
+            return 1
+        except OSError:
+            os.unlink(path)  # stale socket of a dead daemon
+    store = DesignStore(args)
+    try:
+        store.current()
+    except OSError as e:
+        print("[ERROR] {}".format(e))
+        return 1
+    server = _Server(path, _Handler)
+    server.store = store
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # still remove the socket
+    print("[INFO] serving on {}".format(path), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+# ==============================================================================
+# Client
+# ==============================================================================
+
+
+class DesignClient:
+    """Connection to a running daemon; query() takes one query or a batch."""
+
+    def __init__(self, path, timeout=30.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.rfile = self.sock.makefile("rb")
+
+    def query(self, queries):
+        self.sock.sendall(json.dumps(queries).encode() + b"\n")
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+def main():
+    args = parse_args()
+    path = args.socket or socket_path(args.results)
+    if args.cmd == "serve":
+        return serve(args, path)
+    batch = [json.loads(q) if q.lstrip().startswith("{") else {"op": q} for q in args.queries]
+    try:
+        client = DesignClient(path, args.timeout)
+        replies = client.query(batch)
+        client.close()
+    except OSError as e:
+        print("[ERROR] no daemon on {}: {}".format(path, e))
+        return 1
+    print(json.dumps(replies if len(replies) > 1 else replies[0], indent=2))
+    return 1 if any(isinstance(r, dict) and "error" in r for r in replies) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@
 # in the flow and prints it in a table
 # ---------------------------------------------------------------------------
 
+import contextlib
 import pathlib
 import os
 import argparse  # argument parsing
@@ -25,17 +26,29 @@ if not args.logDir:
     parser.print_help()
     sys.exit(1)
 
+def open_log(path):
+    if str(path).endswith('.gz'):
+        from logStore import LogStore
+        lines = [text + '\n' for _, text in LogStore(str(path)).tagged('elapsed')]
+        return contextlib.nullcontext(lines)
+    return open(str(path))
+
 def print_log_dir_times(logdir):
     first = True
     totalElapsed = 0
     print(logdir)
 
-    # Loop on all log files in the directory
-    for f in sorted(pathlib.Path(logdir).glob('**/*.log')):
+    # Loop on all log files in the directory, including the logStore.py
+    # ones (*.log.gz) whose indexed 'Elapsed time' lines are read directly
+    logs = {str(f): f for f in pathlib.Path(logdir).glob('**/*.log')}
+    for f in pathlib.Path(logdir).glob('**/*.log.gz'):
+        logs.setdefault(str(f)[:-3], f)
+    for name in sorted(logs):
+        f = logs[name]
         if "eqy_output" in str(f):
             continue
         # Extract Elapsed Time line from log file
-        with open(str(f)) as logfile:
+        with open_log(f) as logfile:
             found = False
             for line in logfile:
                 elapsedTime = 0
@@ -68,7 +81,7 @@ def print_log_dir_times(logdir):
             if first and not args.noHeader:
                 print("%-25s %10s" % ("Log", "Elapsed seconds"))
                 first = False
-            print('%-25s %10s' % (os.path.splitext(os.path.basename(str(f)))[0], elapsedTime))
+            print('%-25s %10s' % (os.path.splitext(os.path.basename(name))[0], elapsedTime))
         totalElapsed += elapsedTime
 
     if totalElapsed != 0:
@@ -3,21 +3,28 @@
 # This scripts attempts to extract relevant data from a completed flow design
 # and save it into a 'metadata.json'. It achieves this by looking for specific
 # information in specific files using regular expressions
+#
+# It is also a library: importing it has no side effects, and
+#   extract_metrics(flow_root, platform, design, flow_variant) -> dict
+# collects the metrics of one run in-process (output=... also writes them).
+# Tool and repository versions are probed once per process, so collecting
+# many runs from one interpreter costs no extra subprocesses.
 # -----------------------------------------------------------------------------
 
 import os
+import sys
 from datetime import datetime, timedelta
 from collections import defaultdict
-from uuid import uuid4 as uuid
-from subprocess import check_output, call, STDOUT
+from functools import lru_cache
 
-import argparse
 import json
 import re
 from glob import glob
 
 
 def parse_args():
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Generates metadata from OpenROAD flow"
     )
@@ -56,6 +63,11 @@ def parse_args():
     return args
 
 
+def flow_root():
+    """The flow directory this script belongs to."""
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), "../")
+
+
 # Functions
 # =============================================================================
 # Main function to do specific extraction of patterns from a file
@@ -65,7 +77,21 @@ def parse_args():
 # which occurrence it uses (default -1, i.e., last). If pattern not found, it
 # will print an error and set the value to N/A. If a 'defaultNotFound' is set,
 # it will use that instead.  If count is set to True, it will return the count
-# of the pattern.
+# of the pattern. A log missing as 'file' is read from the 'file.gz' of
+# logStore.py, only its lines indexed under 'tag' when one is given.
+
+
+def read_log(file, tag=None):
+    if os.path.isfile(file):
+        with open(file) as f:
+            return f.read()
+    from logStore import read_log as read_stored_log
+
+    return read_stored_log(file, tag)
+
+
+def log_exists(file):
+    return os.path.isfile(file) or os.path.isfile(file + ".gz")
 
 
 def extractTagFromFile(
@@ -78,13 +104,13 @@ def extractTagFromFile(
     defaultNotFound="N/A",
     t=float,
     required=True,
+    tag=None,
 ):
     if jsonTag in jsonFile:
         print("[WARN] Overwriting Tag", jsonTag)
 
     try:
-        with open(file) as f:
-            content = f.read()
+        content = read_log(file, tag)
 
         parsedMetrics = re.findall(pattern, content, re.M)
 
@@ -118,22 +144,28 @@ def extractTagFromFile(
 
 
 def extractGnuTime(prefix, jsonFile, file):
-    if not os.path.isfile(file):
+    if not log_exists(file):
         return
     extractTagFromFile(
         prefix + "__runtime__total",
         jsonFile,
         "^Elapsed time: (\\S+)\\[h:\\]min:sec.*",
         file,
+        tag="elapsed",
     )
     extractTagFromFile(
         prefix + "__cpu__total",
         jsonFile,
         "^Elapsed time:.*CPU time: user (\\S+) .*",
         file,
+        tag="elapsed",
     )
     extractTagFromFile(
-        prefix + "__mem__peak", jsonFile, "^Elapsed time:.*Peak memory: (\\S+)KB.", file
+        prefix + "__mem__peak",
+        jsonFile,
+        "^Elapsed time:.*Peak memory: (\\S+)KB.",
+        file,
+        tag="elapsed",
     )
 
 
@@ -174,11 +206,44 @@ def read_sdc(file_name):
 
 
 def is_git_repo(folder=None):
+    from subprocess import call, DEVNULL, STDOUT
+
     cmd = ["git", "branch"]
     if folder is not None:
-        return call(cmd, stderr=STDOUT, stdout=open(os.devnull, "w"), cwd=folder) == 0
+        return call(cmd, stderr=STDOUT, stdout=DEVNULL, cwd=folder) == 0
     else:
-        return call(cmd, stderr=STDOUT, stdout=open(os.devnull, "w")) == 0
+        return call(cmd, stderr=STDOUT, stdout=DEVNULL) == 0
+
+
+# Version probes, memoized per process (cleared with openroad_version.cache_clear()
+# and _git_head.cache_clear())
+# =============================================================================
+
+
+@lru_cache(maxsize=None)
+def openroad_version(exe):
+    """(version, commit) printed by '<exe> -version'; commit is N/A when absent."""
+    from subprocess import check_output
+
+    cmdFields = [x.decode("utf-8") for x in check_output([exe, "-version"]).split()]
+    return str(cmdFields[0]), str(cmdFields[1]) if len(cmdFields) > 1 else "N/A"
+
+
+def git_commit(folder=None):
+    """HEAD of the git repository at folder (default: cwd), None outside one."""
+    # keyed by absolute path: a cached None (cwd) or relative path would
+    # outlive an os.chdir
+    return _git_head(os.path.abspath(folder or os.getcwd()))
+
+
+@lru_cache(maxsize=None)
+def _git_head(folder):
+    from subprocess import check_output
+
+    if not is_git_repo(folder=folder):
+        return None
+    cmdOutput = check_output(["git", "rev-parse", "HEAD"], cwd=folder)
+    return cmdOutput.decode("utf-8").strip()
 
 
 def merge_jsons(root_path, output, files):
@@ -191,24 +256,39 @@ def merge_jsons(root_path, output, files):
 
 
 def extract_metrics(
-    cwd, platform, design, flow_variant, output, hier_json, logPath, rptPath, resultPath
+    cwd,
+    platform,
+    design,
+    flow_variant="base",
+    output=None,
+    hier_json=False,
+    logPath=None,
+    rptPath=None,
+    resultPath=None,
+    now=None,
 ):
+    """
+    Metrics of one flow run as a dict (hierarchical with hier_json), also
+    written to 'output' when given. logPath/rptPath/resultPath default to
+    <cwd>/{logs,reports,results}/<platform>/<design>/<flow_variant>.
+    """
+    from uuid import uuid4 as uuid
+
+    run = os.path.join(platform, design, flow_variant)
+    logPath = logPath or os.path.join(cwd, "logs", run)
+    rptPath = rptPath or os.path.join(cwd, "reports", run)
+    resultPath = resultPath or os.path.join(cwd, "results", run)
+    now = now or datetime.now()
     baseRegEx = "^{}\n^-*\n^{}"
 
     metrics_dict = defaultdict(dict)
     metrics_dict["run__flow__generate_date"] = now.strftime("%Y-%m-%d %H:%M")
     metrics_dict["run__flow__metrics_version"] = "Metrics_2.1.2"
-    cmdOutput = check_output([os.environ.get("OPENROAD_EXE", "openroad"), "-version"])
-    cmdFields = [x.decode("utf-8") for x in cmdOutput.split()]
-    metrics_dict["run__flow__openroad_version"] = str(cmdFields[0])
-    if len(cmdFields) > 1:
-        metrics_dict["run__flow__openroad_commit"] = str(cmdFields[1])
-    else:
-        metrics_dict["run__flow__openroad_commit"] = "N/A"
-    if is_git_repo():
-        cmdOutput = check_output(["git", "rev-parse", "HEAD"])
-        cmdOutput = cmdOutput.decode("utf-8").strip()
-    else:
+    version, commit = openroad_version(os.environ.get("OPENROAD_EXE", "openroad"))
+    metrics_dict["run__flow__openroad_version"] = version
+    metrics_dict["run__flow__openroad_commit"] = commit
+    cmdOutput = git_commit()
+    if cmdOutput is None:
         cmdOutput = "not a git repo"
         print("[WARN]", cmdOutput)
     metrics_dict["run__flow__scripts_commit"] = cmdOutput
@@ -219,12 +299,11 @@ def extract_metrics(
     if platformDir is None:
         print("[INFO]", "PLATFORM_DIR env variable not set")
         cmdOutput = "N/A"
-    elif is_git_repo(folder=platformDir):
-        cmdOutput = check_output(["git", "rev-parse", "HEAD"], cwd=platformDir)
-        cmdOutput = cmdOutput.decode("utf-8").strip()
     else:
-        print("[WARN]", "not a git repo")
-        cmdOutput = "N/A"
+        cmdOutput = git_commit(platformDir)
+        if cmdOutput is None:
+            print("[WARN]", "not a git repo")
+            cmdOutput = "N/A"
     metrics_dict["run__flow__platform_commit"] = cmdOutput
     metrics_dict["run__flow__variant"] = flow_variant
 
@@ -272,10 +351,13 @@ def extract_metrics(
         metrics_dict,
         "^\\[INFO FLW-....\\] Clock .* slack (\\S+)",
         logPath + "/5_1_grt.log",
+        tag="flw",
     )
 
     # Finish
     # =========================================================================
+    # Also picks up 6_route_stats.json (util/routeStats.py) and
+    # 6_spef_stats.json (util/spefStats.py)
     merge_jsons(logPath, metrics_dict, "6_*.json")
     extractTagFromFile(
         "finish__timing__wns_percent_delay",
@@ -356,21 +438,27 @@ def extract_metrics(
                 hier_dict[key_list[0]][key_list[1]] = metrics_dict[metric]
         metrics_dict = hier_dict
 
-    with open(output, "w") as resultSpecfile:
-        json.dump(metrics_dict, resultSpecfile, indent=2, sort_keys=True)
-
+    if output:
+        with open(output, "w") as resultSpecfile:
+            json.dump(metrics_dict, resultSpecfile, indent=2, sort_keys=True)
+    return metrics_dict
+
+
+def main():
+    args = parse_args()
+    extract_metrics(
+        flow_root(),
+        args.platform,
+        args.design,
+        args.flowVariant,
+        args.output,
+        args.hier,
+        args.logs,
+        args.reports,
+        args.results,
+    )
+    return 0
 
-args = parse_args()
-now = datetime.now()
 
-extract_metrics(
-    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../"),
-    args.platform,
-    args.design,
-    args.flowVariant,
-    args.output,
-    args.hier,
-    args.logs,
-    args.reports,
-    args.results,
-)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+
+# This script reports the telemetry of run_experiments.py runs (--telemetry,
+# JSONL events under run_logs/telemetry/): a per-worker Gantt timeline of the
+# run.sh/eval.sh stages, the idle gaps of every worker, the critical path of
+# the run and the achieved parallel and CPU efficiency, to tune --jobs and
+# NUM_CORES.
+#
+# Workers are the job slots of a host: the stages run on a host are packed
+# into lanes in start order, so a lane is one slot as seen from the outside.
+#
+#   genTimeline.py run_logs/telemetry/20250101-120000.jsonl
+#   genTimeline.py run_logs/telemetry/*.jsonl --run <run id> --svg timeline.svg
+# -----------------------------------------------------------------------------
+
+import argparse
+import glob
+import json
+import sys
+from collections import defaultdict
+
+STAGE_CHARS = {"run": "R", "eval": "E"}
+STAGE_COLORS = {"run": "#4c78a8", "eval": "#72b7b2"}
+FAILED_COLOR = "#e45756"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Timeline, idle gaps and parallel efficiency of experiment runs"
+    )
+    parser.add_argument("input", nargs="+", help="Telemetry JSONL files (globs allowed)")
+    parser.add_argument("--run", default=None,
+                        help="Run id to report (default: the last run of the input)")
+    parser.add_argument("--width", type=int, default=100, help="Gantt width in columns")
+    parser.add_argument("--min-gap", type=float, default=60.0,
+                        help="Smallest idle gap to list, in seconds")
+    parser.add_argument("--top", type=int, default=10, help="Rows of the longer tables")
+    parser.add_argument("--svg", default=None, help="Also write the Gantt chart as SVG")
+    return parser.parse_args()
+
+
+def load_events(inputs):
+    """{run id: [events]} in file order."""
+    runs = defaultdict(list)
+    for spec in inputs:
+        for path in sorted(glob.glob(spec)) or [spec]:
+            try:
+                f = open(path)
+            except OSError as e:
+                print("[WARN] skipping {}: {}".format(path, e), file=sys.stderr)
+                continue
+            with f:
+                for line in f:
+                    try:
+                        ev = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(ev, dict) and "run" in ev:
+                        runs[ev["run"]].append(ev)
+    return runs
+
+
+def fmt_s(seconds):
+    if seconds < 10:
+        return "{:.1f}s".format(seconds)
+    seconds = int(round(seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return "{}:{:02d}:{:02d}".format(h, m, s) if h else "{}:{:02d}".format(m, s)
+
+
+# ==============================================================================
+# Model of one run
+# ==============================================================================
+
+
+class Run:
+
+    def __init__(self, events):
+        self.events = events
+        self.info = next((e for e in events if e["event"] == "run_start"), {})
+        self.stages = [e for e in events if e["event"] == "stage_end" and e.get("start")]
+        self.stages.sort(key=lambda e: e["start"])
+        self.targets = [e for e in events if e["event"] == "target" and "end" in e]
+        starts = {e["task"]: e for e in events if e["event"] == "task_start"}
+        self.tasks = {}
+        for e in events:
+            if e["event"] == "task_end":
+                task = dict(starts.get(e["task"], {}))
+                task.update(e)
+                self.tasks[e["task"]] = task
+        times = [e["ts"] for e in events]
+        self.t0 = self.info.get("ts", min(times) if times else 0.0)
+        self.t1 = max(times) if times else self.t0
+        self.makespan = max(self.t1 - self.t0, 1e-9)
+        self.lanes = self._pack_lanes()
+
+    def _pack_lanes(self):
+        """[(worker name, [stage events])], stages packed per host in start order."""
+        by_host = defaultdict(list)
+        for st in self.stages:
+            by_host[st.get("host") or "?"].append(st)
+        lanes = []
+        for host in sorted(by_host):
+            host_lanes = []
+            for st in by_host[host]:
+                for lane in host_lanes:
+                    if lane[-1]["end"] <= st["start"] + 1e-3:
+                        lane.append(st)
+                        break
+                else:
+                    host_lanes.append([st])
+            for i, lane in enumerate(host_lanes):
+                lanes.append(("{}#{}".format(host, i), lane))
+        return lanes
+
+    @property
+    def slots(self):
+        """Job slots the run could use: --jobs locally, the lanes seen on agents."""
+        jobs = self.info.get("jobs")
+        if self.info.get("backend") == "LocalBackend" and jobs:
+            return jobs
+        return max(len(self.lanes), 1)
+
+    # ---- reports ----
+    def idle_gaps(self, min_gap):
+        """(seconds, worker, start, ended task, next task), longest first."""
+        gaps = []
+        for name, lane in self.lanes:
+            prev_end, prev_task = self.t0, "<start>"
+            for st in lane + [None]:
+                start = st["start"] if st else self.t1
+                if start - prev_end >= min_gap:
+                    gaps.append((start - prev_end, name, prev_end, prev_task,
+                                 "{} {}".format(st["task"], st["stage"]) if st else "<end>"))
+                if st:
+                    prev_end, prev_task = st["end"], "{} {}".format(st["task"], st["stage"])
+        return sorted(gaps, reverse=True)
+
+    def critical_path(self):
+        """
+        Chain of tasks ending with the last one to finish. Each step goes back
+        to the shared-prefix run the task was forked from or, if the task was
+        waiting for a job slot instead, to the task whose slot it got.
+        """
+        if not self.tasks:
+            return []
+        by_home = {t.get("work_home"): t for t in self.tasks.values() if t.get("work_home")}
+        task = max(self.tasks.values(), key=lambda t: t["end"])
+        chain, seen = [], set()
+        while task is not None and task["task"] not in seen:
+            seen.add(task["task"])
+            prefix = by_home.get(task.get("fork_from")) if task.get("fork_from") else None
+            before = [t for t in self.tasks.values()
+                      if t["task"] not in seen and t["end"] <= task["start"] + 1.0]
+            slot = max(before, key=lambda t: t["end"]) if before else None
+            if prefix is not None and prefix["task"] not in seen and (
+                    slot is None or prefix["end"] >= slot["end"] - 1.0):
+                chain.append((task, "prefix"))
+                task = prefix
+            elif slot is not None and task["start"] - self.t0 > 1.0:
+                chain.append((task, "slot"))
+                task = slot
+            else:
+                chain.append((task, "start"))
+                task = None
+        return chain
+
+    def efficiency(self):
+        busy = sum(st["end"] - st["start"] for st in self.stages)
+        cpu = sum(st.get("cpu_s") or 0.0 for st in self.stages)
+        cpus = self.info.get("cpus") or 0
+        hosts = len({st.get("host") for st in self.stages}) or 1
+        return {
+            "busy_s": busy,
+            "parallel": busy / (self.slots * self.makespan),
+            "avg_running": busy / self.makespan,
+            "cpu_s": cpu,
+            # CPU seconds per wall second of the whole run vs. the cores there
+            "cpu": cpu / (cpus * hosts * self.makespan) if cpus else None,
+        }
+
+    def peak_rss(self):
+        """Largest sum of target peak RSS over concurrently running targets (KB)."""
+        edges = []
+        for t in self.targets:
+            if t.get("peak_rss_kb"):
+                edges.append((t["start"], t["peak_rss_kb"]))
+                edges.append((t["end"], -t["peak_rss_kb"]))
+        peak = cur = 0
+        for _, delta in sorted(edges, key=lambda e: (e[0], e[1])):
+            cur += delta
+            peak = max(peak, cur)
+        return peak
+
+
+# ==============================================================================
+# Output
+# ==============================================================================
+
+
+def print_gantt(run, width):
+    scale = width / run.makespan
+    print("Timeline ({} per column, R=run.sh E=eval.sh x=failed)".format(
+        fmt_s(run.makespan / width)))
+    name_w = max([len(n) for n, _ in run.lanes] + [6])
+    for name, lane in run.lanes:
+        row = [" "] * width
+        for st in lane:
+            a = int((st["start"] - run.t0) * scale)
+            b = max(a + 1, int((st["end"] - run.t0) * scale))
+            ch = "x" if st.get("rc") else STAGE_CHARS.get(st["stage"], "?")
+            for i in range(max(a, 0), min(b, width)):
+                row[i] = ch
+        print("{:<{}} |{}|".format(name, name_w, "".join(row)))
+    print()
+
+
+def print_report(run, args):
+    info = run.info
+    print("Run {}: {} tasks, makespan {}, jobs={} backend={} cpus={} NUM_CORES={}".format(
+        info.get("run", "?"), len(run.tasks), fmt_s(run.makespan), info.get("jobs"),
+        info.get("backend"), info.get("cpus"), info.get("num_cores") or "-"))
+    print()
+    print_gantt(run, args.width)
+
+    eff = run.efficiency()
+    print("Efficiency")
+    print("  busy worker time     {} over {} slots".format(fmt_s(eff["busy_s"]), run.slots))
+    print("  parallel efficiency  {:.1%} (avg {:.2f} stages running)".format(
+        eff["parallel"], eff["avg_running"]))
+    if eff["cpu"] is not None:
+        print("  CPU efficiency       {:.1%} ({} CPU time)".format(eff["cpu"], fmt_s(eff["cpu_s"])))
+    peak = run.peak_rss()
+    if peak:
+        print("  peak concurrent RSS  {:.1f} GB".format(peak / 1048576.0))
+    waits = [st["start"] - st["queued"] for st in run.stages if st.get("queued")]
+    if waits:
+        print("  stage queue wait     avg {} max {}".format(
+            fmt_s(sum(waits) / len(waits)), fmt_s(max(waits))))
+    print()
+
+    gaps = run.idle_gaps(args.min_gap)
+    print("Idle gaps >= {} ({} total)".format(fmt_s(args.min_gap), fmt_s(sum(g[0] for g in gaps))))
+    for dur, name, start, before, after in gaps[:args.top]:
+        print("  {:>8}  {:<14} at +{:<8} after {} -> {}".format(
+            fmt_s(dur), name, fmt_s(start - run.t0), before, after))
+    print()
+
+    chain = run.critical_path()
+    if chain:
+        print("Critical path (latest task first)")
+        for task, why in chain:
+            via = {"prefix": "waited for its shared prefix",
+                   "slot": "waited for a job slot",
+                   "start": "started with the run"}[why]
+            print("  {:<44} {:>8} +{:<8} {} ({})".format(
+                task["task"], fmt_s(task["end"] - task["start"]), fmt_s(task["start"] - run.t0),
+                task.get("status", ""), via))
+        print()
+
+    print("Longest make targets")
+    print("  {:<44} {:<16} {:>8} {:>8} {:>6} {:>8}".format(
+        "Task", "Target", "Wall", "CPU", "Cores", "RSS GB"))
+    for t in sorted(run.targets, key=lambda t: t["end"] - t["start"], reverse=True)[:args.top]:
+        wall = t["end"] - t["start"]
+        print("  {:<44} {:<16} {:>8} {:>8} {:>6.1f} {:>8.2f}".format(
+            t["task"], t["target"], fmt_s(wall), fmt_s(t.get("cpu_s") or 0),
+            (t.get("cpu_s") or 0) / wall if wall > 0 else 0.0,
+            (t.get("peak_rss_kb") or 0) / 1048576.0))
+
+
+def write_svg(run, path, width=1200, row_h=18):
+    label_w = 160
+    scale = (width - label_w - 10) / run.makespan
+    height = row_h * (len(run.lanes) + 2)
+    out = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" '
+           'font-family="monospace" font-size="11">'.format(width, height)]
+    for i, (name, lane) in enumerate(run.lanes):
+        y = row_h * (i + 1)
+        out.append('<text x="4" y="{}">{}</text>'.format(y + row_h - 6, name))
+        for st in lane:
+            x = label_w + (st["start"] - run.t0) * scale
+            w = max(1.0, (st["end"] - st["start"]) * scale)
+            color = FAILED_COLOR if st.get("rc") else STAGE_COLORS.get(st["stage"], "#999")
+            out.append('<rect x="{:.1f}" y="{}" width="{:.1f}" height="{}" fill="{}">'
+                       '<title>{} {} {} rc={}</title></rect>'.format(
+                           x, y + 2, w, row_h - 4, color, st["task"], st["stage"],
+                           fmt_s(st["end"] - st["start"]), st.get("rc")))
+    out.append('<text x="{}" y="{}">0</text>'.format(label_w, height - 4))
+    out.append('<text x="{}" y="{}" text-anchor="end">{}</text>'.format(
+        width - 10, height - 4, fmt_s(run.makespan)))
+    out.append("</svg>")
+    with open(path, "w") as f:
+        f.write("\n".join(out) + "\n")
+
+
+def main():
+    args = parse_args()
+    runs = load_events(args.input)
+    if not runs:
+        print("[ERROR] no telemetry events in {}".format(" ".join(args.input)))
+        sys.exit(1)
+    run_id = args.run or max(runs, key=lambda r: runs[r][-1].get("ts", 0))
+    if run_id not in runs:
+        print("[ERROR] run {} not found; runs: {}".format(run_id, ", ".join(sorted(runs))))
+        sys.exit(1)
+    run = Run(runs[run_id])
+    run.info.setdefault("run", run_id)
+    print_report(run, args)
+    if args.svg:
+        write_svg(run, args.svg)
+        print()
+        print("[INFO] timeline written to {}".format(args.svg))
+
+
+if __name__ == "__main__":
+    main()
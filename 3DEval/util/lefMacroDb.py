@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+# This script indexes the MACROs of the tier LEFs of a 3D platform (SIZE,
+# CLASS and PINs with direction and use) and derives from them the cell map
+# generate_3d_views.py reads (--cell-map): for every base master present on
+# both tiers, its <base>_bottom / <base>_upper macros, sizes, pin lists and a
+# pin_map over the pins the two views share. Pins only the upper view has are
+# listed in its 'pins' and not mapped, so generate_3d_views.py ties them off.
+#
+# A platform map.json, when there is one, is overlaid: its entries (e.g. the
+# NanGate45 -> ASAP7 cell and pin correspondences of asap7_nangate45_3D, which
+# LEFs cannot tell) are kept, with macro sizes and pin lists refreshed from
+# the LEFs. Cover views (*cover*.lef) repeat the macros and are skipped.
+#
+# Parsed LEFs are cached per file (size + mtime) in a compact JSON, so a
+# platform is parsed once and every later map is derived without reading LEF.
+#
+#   map  : lefMacroDb.py map --platform-dir platforms/asap7_3D -o map.json
+#          lefMacroDb.py map --lef-bottom B.lef --lef-upper U.lef --overlay m.json -o map.json
+#   show : lefMacroDb.py show LEF... [--macro NAME]
+# -----------------------------------------------------------------------------
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+CACHE_VERSION = 1
+TIERS = ("bottom", "upper")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="LEF macro database and cell map derivation for the 3D platforms"
+    )
+    parser.add_argument("--cache", default=None,
+                        help="Per-file cache of parsed LEFs (default: none)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("map", help="Derive a generate_3d_views.py cell map")
+    p.add_argument("--platform-dir", default=None,
+                   help="3D platform: LEFs from lef_bottom/ and lef_upper/, overlay map.json")
+    p.add_argument("--lef-bottom", nargs="*", default=[], help="Bottom tier LEFs")
+    p.add_argument("--lef-upper", nargs="*", default=[], help="Upper tier LEFs")
+    p.add_argument("--overlay", default=None,
+                   help="Hand-written map.json whose entries take precedence")
+    p.add_argument("--output", "-o", required=True)
+    p = sub.add_parser("show", help="Print the indexed macros of LEF files")
+    p.add_argument("lefs", nargs="+")
+    p.add_argument("--macro", default=None)
+    return parser.parse_args()
+
+
+# ==============================================================================
+# LEF parsing
+# ==============================================================================
+
+
+def parse_lef_macros(path):
+    """{macro: [width, height, class, [[pin, direction, use], ...]]} of one LEF."""
+    macros = {}
+    macro = pin = None
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            toks = line.split()
+            if not toks:
+                continue
+            key = toks[0]
+            if macro is None:
+                if key == "MACRO" and len(toks) > 1:
+                    macro = [0.0, 0.0, "", []]
+                    macros.setdefault(toks[1], macro)
+                    name = toks[1]
+                continue
+            if key == "END" and len(toks) > 1:
+                if pin is not None and toks[1] == pin[0]:
+                    pin = None
+                elif toks[1] == name:
+                    macro = pin = None
+                continue
+            if key == "PIN" and len(toks) > 1 and pin is None:
+                pin = [toks[1], "", ""]
+                macro[3].append(pin)
+            elif pin is not None:
+                if key == "DIRECTION" and len(toks) > 1:
+                    pin[1] = toks[1]
+                elif key == "USE" and len(toks) > 1:
+                    pin[2] = toks[1]
+            elif key == "SIZE" and len(toks) > 3:
+                macro[0], macro[1] = float(toks[1]), float(toks[3])
+            elif key == "CLASS" and len(toks) > 1:
+                macro[2] = toks[1]
+    return macros
+
+
+class MacroDb:
+    """Macros of a set of LEF files, parsed through the per-file cache."""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.cache = self._load_cache()
+        self.dirty = False
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def save(self):
+        if not self.cache_path or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp = "{}.{}.tmp".format(self.cache_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "files": self.cache}, f, separators=(",", ":"))
+        os.replace(tmp, self.cache_path)
+        self.dirty = False
+
+    def macros(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = self.cache.get(path)
+        if entry is None or entry[0] != stamp:
+            entry = [stamp, parse_lef_macros(path)]
+            self.cache[path] = entry
+            self.dirty = True
+        return entry[1]
+
+    def index(self, paths):
+        """{macro: (record, file)} over paths; the first definition wins."""
+        found = {}
+        for path in paths:
+            for name, rec in self.macros(path).items():
+                if name not in found:
+                    found[name] = (rec, path)
+        return found
+
+
+# ==============================================================================
+# Cell map
+# ==============================================================================
+
+
+def tier_lefs(platform_dir, tier):
+    paths = sorted(glob.glob(os.path.join(platform_dir, "lef_" + tier, "*.lef")))
+    return [p for p in paths if "cover" not in os.path.basename(p)]
+
+
+def _view(macro, rec):
+    return {"macro": macro, "width": rec[0], "height": rec[1], "pins": [p[0] for p in rec[3]]}
+
+
+def _main_file(index):
+    """The LEF contributing most macros (the standard-cell library)."""
+    counts = {}
+    for _, path in index.values():
+        counts[path] = counts.get(path, 0) + 1
+    return os.path.basename(max(counts, key=counts.get)) if counts else ""
+
+
+def derive_cell_map(bottom, upper, overlay=None):
+    """
+    Cell map in the map.json schema from bottom/upper {macro: (record, file)}
+    indexes; overlay entries replace derived ones, with their views refreshed.
+    """
+    suffix = {"bottom": "_bottom", "upper": "_upper"}
+    by_base = {t: {} for t in TIERS}
+    for tier, index in (("bottom", bottom), ("upper", upper)):
+        for macro, (rec, _) in index.items():
+            if macro.endswith(suffix[tier]):
+                by_base[tier][macro[:-len(suffix[tier])]] = (macro, rec)
+
+    cells = {}
+    for base in sorted(set(by_base["bottom"]) & set(by_base["upper"])):
+        (bmacro, brec), (umacro, urec) = by_base["bottom"][base], by_base["upper"][base]
+        bottom_view, upper_view = _view(bmacro, brec), _view(umacro, urec)
+        shared = [p for p in bottom_view["pins"] if p in set(upper_view["pins"])]
+        cells[base] = {"base": base, "bottom": bottom_view, "upper": upper_view,
+                       "pin_map": {p: p for p in shared}}
+
+    doc = {"bottom_file": _main_file(bottom), "upper_file": _main_file(upper), "cells": cells}
+    if not overlay:
+        return doc
+    for key in ("bottom_file", "upper_file"):
+        if overlay.get(key):
+            doc[key] = overlay[key]
+    for key, cell in overlay.get("cells", {}).items():
+        if not isinstance(cell, dict):
+            continue
+        cell = json.loads(json.dumps(cell))
+        for tier, index in (("bottom", bottom), ("upper", upper)):
+            view = cell.get(tier)
+            if isinstance(view, dict) and view.get("macro") in index:
+                fresh = _view(view["macro"], index[view["macro"]][0])
+                if view.get("pins") and set(view["pins"]) != set(fresh["pins"]):
+                    print("[WARN] {}: {} pins differ from the LEF, using the LEF".format(
+                        key, view["macro"]))
+                view.update(fresh)
+            elif isinstance(view, dict) and view.get("macro"):
+                print("[WARN] {}: {} macro {} not in the {} LEFs".format(
+                    key, tier, view["macro"], tier))
+        pins = cell.get("upper", {}).get("pins", [])
+        unknown = [v for v in cell.get("pin_map", {}).values() if pins and v not in pins]
+        if unknown:
+            print("[WARN] {}: pin_map targets {} are not pins of {}".format(
+                key, ", ".join(unknown), cell["upper"].get("macro")))
+        cells[cell.get("base", key)] = cell
+    doc["cells"] = dict(sorted(cells.items()))
+    return doc
+
+
+def write_map(args, db):
+    bottom_lefs, upper_lefs, overlay_path = args.lef_bottom, args.lef_upper, args.overlay
+    if args.platform_dir:
+        bottom_lefs = bottom_lefs or tier_lefs(args.platform_dir, "bottom")
+        upper_lefs = upper_lefs or tier_lefs(args.platform_dir, "upper")
+        candidate = os.path.join(args.platform_dir, "map.json")
+        if overlay_path is None and os.path.isfile(candidate):
+            overlay_path = candidate
+    if not bottom_lefs or not upper_lefs:
+        print("[ERROR] no bottom/upper tier LEFs given or found")
+        return 1
+    overlay = None
+    if overlay_path:
+        with open(overlay_path) as f:
+            overlay = json.load(f)
+    bottom, upper = db.index(bottom_lefs), db.index(upper_lefs)
+    db.save()
+    doc = derive_cell_map(bottom, upper, overlay)
+    extra = sum(1 for c in doc["cells"].values()
+                if set(c["upper"].get("pins", [])) - set(c.get("pin_map", {}).values()))
+    out_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = "{}.{}.tmp".format(args.output, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(doc, f, indent=2)
+    os.replace(tmp, args.output)
+    overlay_note = ""
+    if overlay is not None:
+        overlay_note = "{} from {}, ".format(len(overlay.get("cells", {})),
+                                             os.path.basename(overlay_path))
+    print("[INFO] {} cells mapped ({}{} with upper-only pins) -> {}".format(
+        len(doc["cells"]), overlay_note, extra, args.output))
+    return 0
+
+
+def main():
+    args = parse_args()
+    db = MacroDb(args.cache)
+    if args.cmd == "map":
+        return write_map(args, db)
+    for name, (rec, path) in sorted(db.index(args.lefs).items()):
+        if args.macro and name != args.macro:
+            continue
+        print("{} {} {}x{} {} ({})".format(
+            name, rec[2] or "-", rec[0], rec[1],
+            " ".join("{}:{}{}".format(p[0], p[1] or "?", "/" + p[2] if p[2] else "")
+                     for p in rec[3]),
+            os.path.basename(path)))
+    db.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+
+# This script reads Liberty libraries (the same .lib/.lib.gz inputs as
+# preprocessLib.py) into compact NumPy arrays and caches them, so consumers
+# (partition pre-checks, power binning, what-if analyses) can look up cell
+# area, leakage, pin capacitance and NLDM tables without re-parsing Liberty.
+#
+# Per library: one row per cell (area, leakage), per pin/bus (direction,
+# capacitance, max_capacitance) and per NLDM table of the timing and
+# internal_power groups (kind, pin, related pin, index_1/index_2/values,
+# zero-padded to the largest table). Values are converted to common units
+# so libraries of a heterogeneous stack mix: time ps, capacitance fF,
+# leakage nW, area um^2. Internal power tables keep their library units.
+#
+# The cache is one .npz per library under --cache-dir, named after the
+# BLAKE2 hash of the library text and CACHE_VERSION, plus an index of
+# (path, size, mtime) -> hash so unchanged libraries are not even re-hashed.
+#
+#   build : libertyCache.py build --platform-dir platforms/asap7_3D [-j 8]
+#   show  : libertyCache.py show LIB... --cell INVx1_ASAP7_75t_R_upper --slew 20 --load 2
+#
+#   from libertyCache import load_libs
+#   libs = load_libs(platform_libs("platforms/asap7_3D"))
+#   ids = libs.cell_ids(masters)          # KeyError on unknown masters
+#   area, leak = libs.area[ids], libs.leakage[ids]
+#   ids = libs.cell_ids(masters, strict=False)   # -1 for unknown masters
+#   area = libs.take(libs.area, ids)             # NaN for them
+# -----------------------------------------------------------------------------
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "3deval", "liberty")
+
+TABLE_KINDS = ("cell_rise", "cell_fall", "rise_transition", "fall_transition",
+               "rise_constraint", "fall_constraint", "rise_power", "fall_power")
+POWER_KINDS = ("rise_power", "fall_power")
+DIRECTIONS = {"input": 0, "output": 1, "inout": 2, "internal": 3}
+PIN_GROUPS = ("pin", "bus", "bundle")
+AXIS_NONE, AXIS_TIME, AXIS_CAP = 0, 1, 2
+
+# 1<prefix><unit> strings, to ps / fF / nW
+_PREFIX = {"": 1.0, "m": 1e-3, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15}
+_UNIT_RE = re.compile(r"^\s*([0-9.eE+-]*)\s*([munpf]?)(s|w|f)\s*$", re.I)
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_TOKEN_RE = re.compile(r"""
+      (?P<open>[A-Za-z_][\w.]*)\s*\((?P<gargs>[^)]*)\)\s*\{
+    | (?P<close>\})
+    | (?P<cattr>[A-Za-z_][\w.]*)\s*\((?P<cargs>[^)]*)\)
+    | (?P<sattr>[A-Za-z_][\w.]*)\s*:\s*(?P<sval>"[^"]*"|[^;\n{}]*)
+""", re.X)
+_NUM_SPLIT_RE = re.compile(r"[\s,\"\\]+")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Cached NumPy tables of Liberty cell area, leakage, pin caps and NLDM"
+    )
+    parser.add_argument("--cache-dir", default=os.environ.get("LIBERTY_CACHE_DIR", DEFAULT_CACHE_DIR),
+                        help="Cache directory (default: $LIBERTY_CACHE_DIR or ~/.cache/3deval/liberty)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("build", "show"):
+        p = sub.add_parser(name)
+        p.add_argument("libs", nargs="*", help="Liberty files (.lib or .lib.gz)")
+        p.add_argument("--platform-dir", default=None,
+                       help="Use every library of a platform (lib*/ directories)")
+    sub.choices["build"].add_argument("--jobs", "-j", type=int, default=1)
+    p = sub.choices["show"]
+    p.add_argument("--cell", action="append", default=[], help="Cell(s) to print")
+    p.add_argument("--slew", type=float, default=None, help="Input transition (ps) for NLDM lookup")
+    p.add_argument("--load", type=float, default=None, help="Output load (fF) for NLDM lookup")
+    return parser.parse_args()
+
+
+# ==============================================================================
+# Parsing
+# ==============================================================================
+
+
+def _unit_scale(text, unit, default):
+    """Factor from a Liberty unit string ('1ps', '1nW') to unit ('s' or 'w' based)."""
+    m = _UNIT_RE.match(text.strip('"'))
+    if not m or m.group(3).lower() != unit:
+        return default
+    return float(m.group(1) or 1.0) * _PREFIX[m.group(2).lower()]
+
+
+def _numbers(text):
+    return [float(x) for x in _NUM_SPLIT_RE.split(text) if x]
+
+
+def _axis(variable):
+    if "transition" in variable or "time" in variable:
+        return AXIS_TIME
+    if "capacitance" in variable:
+        return AXIS_CAP
+    return AXIS_NONE
+
+
+def parse_liberty(text):
+    """Liberty text -> dict of the arrays stored in the cache."""
+    text = _COMMENT_RE.sub(" ", text)
+    time_s, cap_f, leak_w = 1e-9, 1e-12, 1e-9  # Liberty defaults: ns, pF, nW
+    templates = {}
+    cells, pins, tables = [], [], []
+    stack = []
+    cell = pin = arc = table = template = None
+    leak_default, leak_states = [], []
+    lp = None  # current leakage_power group
+
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "open" or m.group("open"):
+            group, args = m.group("open"), m.group("gargs").strip().strip('"')
+            stack.append(group)
+            depth = len(stack)
+            if group in ("lu_table_template", "power_lut_template") and depth == 2:
+                template = templates.setdefault(args, {"v1": "", "v2": "", "i1": [], "i2": []})
+            elif group == "cell" and depth == 2:
+                cell = {"name": args, "area": 0.0, "leak": None}
+                cells.append(cell)
+                leak_default, leak_states = [], []
+            elif cell is not None and group in PIN_GROUPS and pin is None:
+                pin = {"cell": len(cells) - 1, "name": args, "dir": -1,
+                       "cap": np.nan, "max_cap": np.nan, "depth": depth}
+                pins.append(pin)
+            elif cell is not None and group == "leakage_power" and pin is None:
+                lp = {"value": None, "when": False}
+            elif pin is not None and group in ("timing", "internal_power"):
+                arc = {"related": ""}
+            elif arc is not None and group in TABLE_KINDS:
+                tpl = templates.get(args, {})
+                table = {"pin": len(pins) - 1, "related": arc, "kind": group,
+                         "v1": tpl.get("v1", ""), "v2": tpl.get("v2", ""),
+                         "i1": tpl.get("i1", []), "i2": tpl.get("i2", []), "values": []}
+            continue
+        if kind == "close" or m.group("close"):
+            if not stack:
+                continue
+            group = stack.pop()
+            depth = len(stack) + 1
+            if group == "cell" and cell is not None and depth == 2:
+                if cell["leak"] is None:
+                    # no cell_leakage_power: state-independent groups, else mean over states
+                    if leak_default:
+                        cell["leak"] = sum(leak_default)
+                    elif leak_states:
+                        cell["leak"] = sum(leak_states) / max(1, len(leak_states))
+                cell = None
+            elif pin is not None and group in PIN_GROUPS and depth == pin["depth"]:
+                pin = None
+            elif group == "leakage_power" and lp is not None:
+                if lp["value"] is not None:
+                    (leak_states if lp["when"] else leak_default).append(lp["value"])
+                lp = None
+            elif group in ("timing", "internal_power"):
+                arc = None
+            elif group in TABLE_KINDS and table is not None:
+                if table["values"]:
+                    tables.append(table)
+                table = None
+            elif group in ("lu_table_template", "power_lut_template"):
+                template = None
+            continue
+
+        if m.group("cattr"):
+            name, args = m.group("cattr"), m.group("cargs")
+            if table is not None:
+                if name in ("index_1", "index_2"):
+                    table["i" + name[-1]] = _numbers(args)
+                elif name == "values":
+                    table["values"] = _numbers(args)
+            elif template is not None and name in ("index_1", "index_2"):
+                template["i" + name[-1]] = _numbers(args)
+            elif name == "capacitive_load_unit" and len(stack) == 1:
+                parts = [p.strip() for p in args.split(",")]
+                if len(parts) == 2:
+                    cap_f = float(parts[0]) * _PREFIX.get(parts[1].lower()[:-1], 1.0)
+            continue
+
+        name = m.group("sattr")
+        value = m.group("sval").strip().rstrip(";").strip().strip('"')
+        if table is not None:
+            continue
+        if template is not None:
+            if name in ("variable_1", "variable_2"):
+                template["v" + name[-1]] = value
+        elif arc is not None:
+            if name == "related_pin":
+                arc["related"] = value
+        elif lp is not None:
+            if name == "value":
+                lp["value"] = float(value)
+            elif name == "when":
+                lp["when"] = True
+        elif pin is not None:
+            if name == "direction":
+                pin["dir"] = DIRECTIONS.get(value, -1)
+            elif name == "capacitance":
+                pin["cap"] = float(value)
+            elif name == "max_capacitance":
+                pin["max_cap"] = float(value)
+        elif cell is not None:
+            if name == "area":
+                cell["area"] = float(value)
+            elif name == "cell_leakage_power":
+                cell["leak"] = float(value)
+        elif len(stack) == 1:
+            if name == "time_unit":
+                time_s = _unit_scale(value, "s", time_s)
+            elif name == "leakage_power_unit":
+                leak_w = _unit_scale(value, "w", leak_w)
+
+    t_ps, c_ff, l_nw = time_s / 1e-12, cap_f / 1e-15, leak_w / 1e-9
+    axis_scale = {AXIS_NONE: 1.0, AXIS_TIME: t_ps, AXIS_CAP: c_ff}
+    m1 = max([len(t["i1"]) or 1 for t in tables] or [1])
+    m2 = max([len(t["i2"]) or 1 for t in tables] or [1])
+    n = len(tables)
+    i1 = np.full((n, m1), np.inf)
+    i2 = np.full((n, m2), np.inf)
+    vals = np.zeros((n, m1, m2))
+    dims = np.zeros((n, 2), dtype=np.int32)
+    axes = np.zeros((n, 2), dtype=np.int8)
+    for k, t in enumerate(tables):
+        a1, a2 = _axis(t["v1"]), _axis(t["v2"])
+        n1, n2 = max(1, len(t["i1"])), max(1, len(t["i2"]))
+        v = np.asarray(t["values"], dtype=float)
+        if v.size != n1 * n2:
+            # scalar or malformed table: keep the first value as a constant
+            n1 = n2 = 1
+            v = v[:1]
+        dims[k] = (n1, n2)
+        axes[k] = (a1, a2)
+        if t["i1"] and n1 > 1:
+            i1[k, :n1] = np.asarray(t["i1"][:n1]) * axis_scale[a1]
+        else:
+            i1[k, 0] = 0.0
+        if t["i2"] and n2 > 1:
+            i2[k, :n2] = np.asarray(t["i2"][:n2]) * axis_scale[a2]
+        else:
+            i2[k, 0] = 0.0
+        scale = 1.0 if t["kind"] in POWER_KINDS else t_ps
+        vals[k, :n1, :n2] = v.reshape(n1, n2) * scale
+
+    return {
+        "cell_name": np.array([c["name"] for c in cells], dtype=str),
+        "cell_area": np.array([c["area"] for c in cells], dtype=float),
+        "cell_leakage": np.array([np.nan if c["leak"] is None else c["leak"] * l_nw
+                                  for c in cells], dtype=float),
+        "pin_cell": np.array([p["cell"] for p in pins], dtype=np.int32),
+        "pin_name": np.array([p["name"] for p in pins], dtype=str),
+        "pin_dir": np.array([p["dir"] for p in pins], dtype=np.int8),
+        "pin_cap": np.array([p["cap"] for p in pins], dtype=float) * c_ff,
+        "pin_max_cap": np.array([p["max_cap"] for p in pins], dtype=float) * c_ff,
+        "tbl_pin": np.array([t["pin"] for t in tables], dtype=np.int32),
+        "tbl_related": np.array([t["related"]["related"] for t in tables], dtype=str),
+        "tbl_kind": np.array([TABLE_KINDS.index(t["kind"]) for t in tables], dtype=np.int8),
+        "tbl_dims": dims,
+        "tbl_axes": axes,
+        "tbl_i1": i1,
+        "tbl_i2": i2,
+        "tbl_values": vals,
+    }
+
+
+def _read(path):
+    if path.endswith(".gz") or path.endswith(".GZ"):
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# ==============================================================================
+# Cache
+# ==============================================================================
+
+
+class _Index:
+    """(path, size, mtime) -> content hash, so unchanged libraries skip hashing."""
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, "index.json")
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        self.dirty = False
+
+    def digest(self, path, data=None):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = self.entries.get(key)
+        if entry and entry[:2] == stamp:
+            return entry[2]
+        if data is None:
+            data = _read(path)
+        digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+        self.entries[key] = stamp + [digest]
+        self.dirty = True
+        return digest
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def _cache_file(cache_dir, path, digest):
+    stem = os.path.basename(path)
+    for ext in (".gz", ".GZ", ".lib"):
+        if stem.endswith(ext):
+            stem = stem[:-len(ext)]
+    return os.path.join(cache_dir, "{}.{}.v{}.npz".format(stem, digest, CACHE_VERSION))
+
+
+def _build(path, cache_file):
+    arrays = parse_liberty(_read(path).decode("ascii", "ignore"))
+    tmp = "{}.{}.tmp.npz".format(cache_file[:-4], os.getpid())
+    np.savez(tmp, **arrays)
+    os.replace(tmp, cache_file)
+    return cache_file
+
+
+def cached(paths, cache_dir=DEFAULT_CACHE_DIR, jobs=1):
+    """Cache files of paths, building the missing ones (in parallel with jobs > 1)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _Index(cache_dir)
+    files, missing = [], []
+    for path in paths:
+        cache_file = _cache_file(cache_dir, path, index.digest(path))
+        files.append(cache_file)
+        if not os.path.exists(cache_file):
+            missing.append((path, cache_file))
+    index.save()
+    if jobs > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(_build, *zip(*missing)))
+    else:
+        for path, cache_file in missing:
+            _build(path, cache_file)
+    return files
+
+
+# ==============================================================================
+# Lookup
+# ==============================================================================
+
+
+class Libs:
+    """
+    The cells of one or more libraries as flat arrays indexed by cell id,
+    pin row and table id; earlier libraries win for duplicate cell names.
+    """
+
+    def __init__(self, parts, sources):
+        self.sources = sources
+        cat = {}
+        cell_off = pin_off = 0
+        m1 = max(p["tbl_i1"].shape[1] for p in parts) if parts else 1
+        m2 = max(p["tbl_i2"].shape[1] for p in parts) if parts else 1
+        self.cell_lib = []
+        for li, p in enumerate(parts):
+            for key in p:
+                a = p[key]
+                if key == "pin_cell":
+                    a = a + cell_off
+                elif key == "tbl_pin":
+                    a = a + pin_off
+                elif key in ("tbl_i1", "tbl_i2"):
+                    pad = (m1 if key == "tbl_i1" else m2) - a.shape[1]
+                    a = np.pad(a, ((0, 0), (0, pad)), constant_values=np.inf)
+                elif key == "tbl_values":
+                    a = np.pad(a, ((0, 0), (0, m1 - a.shape[1]), (0, m2 - a.shape[2])))
+                cat.setdefault(key, []).append(a)
+            self.cell_lib.append(np.full(len(p["cell_name"]), li, dtype=np.int32))
+            cell_off += len(p["cell_name"])
+            pin_off += len(p["pin_name"])
+        for key, arrays in cat.items():
+            setattr(self, key, np.concatenate(arrays))
+        self.cell_lib = np.concatenate(self.cell_lib) if self.cell_lib else np.zeros(0, np.int32)
+        self.area = self.cell_area
+        self.leakage = self.cell_leakage
+        self._ids = {}
+        for i, name in enumerate(self.cell_name.tolist()):
+            self._ids.setdefault(name, i)
+        self._pin_rows = None
+
+    def __len__(self):
+        return len(self.cell_name)
+
+    def cell_ids(self, names, strict=True):
+        """
+        Cell id of every name. Unknown names raise KeyError, or get -1 when not
+        strict (index with take() then: a plain array[-1] reads the last cell).
+        """
+        get = self._ids.get
+        ids = np.fromiter((get(n, -1) for n in names), dtype=np.int64, count=len(names))
+        if strict and (ids < 0).any():
+            unknown = [n for n, i in zip(names, ids.tolist()) if i < 0]
+            raise KeyError("{} unknown cell(s): {}{}".format(
+                len(unknown), ", ".join(unknown[:5]), " ..." if len(unknown) > 5 else ""))
+        return ids
+
+    @staticmethod
+    def take(values, ids):
+        """values[ids] as float64, NaN where an id is -1 (unknown cell or pin)."""
+        ids = np.asarray(ids)
+        out = np.full(ids.shape, np.nan)
+        known = ids >= 0
+        out[known] = np.asarray(values)[ids[known]]
+        return out
+
+    def pin_rows(self, cell_ids, pins):
+        """Pin row of (cell id, pin name) pairs (-1 when unknown)."""
+        if self._pin_rows is None:
+            self._pin_rows = {(c, n): r for r, (c, n) in
+                              enumerate(zip(self.pin_cell.tolist(), self.pin_name.tolist()))}
+        get = self._pin_rows.get
+        return np.fromiter((get((int(c), p), -1) for c, p in zip(cell_ids, pins)),
+                           dtype=np.int64, count=len(pins))
+
+    def input_cap(self, cell_ids):
+        """Total input pin capacitance (fF) of each cell id."""
+        inputs = self.pin_dir == DIRECTIONS["input"]
+        total = np.bincount(self.pin_cell[inputs], weights=np.nan_to_num(self.pin_cap[inputs]),
+                            minlength=len(self))
+        return self.take(total, cell_ids)
+
+    def tables(self, cell_id, kind=None, pin=None, related=None):
+        """Table ids of a cell, optionally of one kind / output pin / related pin."""
+        mask = self.pin_cell[self.tbl_pin] == cell_id
+        if kind is not None:
+            mask &= self.tbl_kind == TABLE_KINDS.index(kind)
+        if pin is not None:
+            mask &= self.pin_name[self.tbl_pin] == pin
+        if related is not None:
+            mask &= self.tbl_related == related
+        return np.flatnonzero(mask)
+
+    def lookup(self, table_ids, slew, load):
+        """
+        NLDM value of every table at (input slew ps, output load fF):
+        bilinear inside the table, linear extrapolation outside, like STA.
+        """
+        t = np.asarray(table_ids)
+        slew = np.broadcast_to(np.asarray(slew, dtype=float), t.shape)
+        load = np.broadcast_to(np.asarray(load, dtype=float), t.shape)
+        axes = self.tbl_axes[t]
+        x = np.where(axes[:, 0] == AXIS_CAP, load, slew)
+        y = np.where(axes[:, 1] == AXIS_CAP, load, slew)
+        dims = self.tbl_dims[t]
+        rows = np.arange(len(t))
+
+        def bracket(index, n, v):
+            j = np.clip((v[:, None] >= index).sum(axis=1) - 1, 0, np.maximum(n - 2, 0))
+            j1 = np.minimum(j + 1, n - 1)
+            lo, hi = index[rows, j], index[rows, j1]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                w = np.where(hi > lo, (v - lo) / (hi - lo), 0.0)
+            return j, j1, w
+
+        i1, i1b, wx = bracket(self.tbl_i1[t], dims[:, 0], x)
+        i2, i2b, wy = bracket(self.tbl_i2[t], dims[:, 1], y)
+        v = self.tbl_values[t]
+        top = v[rows, i1, i2] * (1 - wy) + v[rows, i1, i2b] * wy
+        bottom = v[rows, i1b, i2] * (1 - wy) + v[rows, i1b, i2b] * wy
+        return top * (1 - wx) + bottom * wx
+
+
+def load_libs(paths, cache_dir=DEFAULT_CACHE_DIR, jobs=1):
+    """Libs of the given Liberty files, through the cache."""
+    parts = []
+    for cache_file in cached(paths, cache_dir, jobs):
+        with np.load(cache_file, allow_pickle=False) as data:
+            parts.append({k: data[k] for k in data.files})
+    return Libs(parts, list(paths))
+
+
+def platform_libs(platform_dir):
+    """Every .lib/.lib.gz under the lib*/ directories of a platform."""
+    paths = []
+    for pattern in ("lib*/**/*.lib", "lib*/**/*.lib.gz"):
+        paths += glob.glob(os.path.join(platform_dir, pattern), recursive=True)
+    return sorted(set(paths))
+
+
+# ==============================================================================
+# Main
+# ==============================================================================
+
+
+def _fmt(v):
+    return "-" if v != v else "{:.4g}".format(v)
+
+
+def main():
+    args = parse_args()
+    paths = list(args.libs) + (platform_libs(args.platform_dir) if args.platform_dir else [])
+    if not paths:
+        print("[ERROR] no Liberty files given")
+        return 1
+    t0 = time.perf_counter()
+    if args.cmd == "build":
+        cached(paths, args.cache_dir, args.jobs)
+        libs = load_libs(paths, args.cache_dir)
+        print("[INFO] {} libraries, {} cells, {} pins, {} tables loaded in {:.1f} ms".format(
+            len(paths), len(libs), len(libs.pin_name), len(libs.tbl_kind),
+            (time.perf_counter() - t0) * 1e3))
+        return 0
+    libs = load_libs(paths, args.cache_dir)
+    names = args.cell or libs.cell_name.tolist()
+    ids = libs.cell_ids(names, strict=False)
+    caps = libs.input_cap(ids)
+    for name, cid, cap in zip(names, ids, caps):
+        if cid < 0:
+            print("{}: not found".format(name))
+            continue
+        print("{} area {} um^2, leakage {} nW, input cap {} fF ({})".format(
+            name, _fmt(libs.area[cid]), _fmt(libs.leakage[cid]), _fmt(cap),
+            os.path.basename(libs.sources[libs.cell_lib[cid]])))
+        if args.slew is None or args.load is None or not args.cell:
+            continue
+        tids = libs.tables(cid)
+        values = libs.lookup(tids, args.slew, args.load)
+        for tid, value in zip(tids, values):
+            print("  {} -> {} {}: {}".format(
+                libs.tbl_related[tid] or "-", libs.pin_name[libs.tbl_pin[tid]],
+                TABLE_KINDS[libs.tbl_kind[tid]], _fmt(value)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+
+# This script is a log sink for the flow's tool output: like 'tee -a', it
+# copies stdin to stdout, but stores the log as a sequence of independent
+# gzip members (blocks of --block-size bytes or --flush seconds of output)
+# plus a sidecar JSON index (<log>.gz.idx) of the compressed offset and first
+# line of every block and of the lines matching the known tags (TAGS below:
+# the TIME_CMD 'Elapsed' line, '[INFO FLW-' messages, slack lines).
+#
+# While the writer runs, every block appends one line (its offset and tagged
+# lines) to <log>.gz.idx.jsonl instead of rewriting the index, so storing a
+# log costs O(size); the index is rewritten and the journal dropped on close.
+# Readers replay the journal over the index. A block is also closed after
+# --flush seconds without input, and SIGTERM/SIGHUP/SIGINT (a stage timeout
+# kills the whole process group) store what is buffered or still in the pipe
+# before exiting with 128 + the signal number.
+#
+# The .gz stays a plain gzip file (zcat, gzip.open), while readers that know
+# the index read tagged lines without decompressing anything and tail or
+# jump to a line by inflating only the blocks involved. genMetrics.py and
+# genElapsedTime.py fall back to <log>.gz when <log> does not exist.
+#
+#   write : tool 2>&1 | logStore.py write $(LOG_DIR)/5_3_route.log   (-> .log.gz + .log.gz.idx)
+#   tail  : logStore.py tail 5_3_route.log.gz -n 50
+#   grep  : logStore.py grep 5_3_route.log.gz 'Elapsed time' [--tag elapsed]
+#   index : logStore.py index old.log.gz    (index a gzip written by other tools)
+# -----------------------------------------------------------------------------
+
+import argparse
+import bisect
+import gzip
+import json
+import os
+import re
+import select
+import signal
+import sys
+import time
+import zlib
+
+INDEX_VERSION = 1
+TAGS = {
+    "elapsed": "Elapsed",  # "Elapsed time:" (ORFS) and TIME_CMD "Elapsed:"
+    "flw": "[INFO FLW-",
+    "slack": "slack",
+}
+MAX_TAG_TEXT = 1024
+# The Makefile's TIME_CMD line: wall clock, user/sys CPU s, peak RSS KB
+TIME_CMD_RE = re.compile(
+    r"Elapsed: (\S+)\s+CPU: user ([\d.]+) sys ([\d.]+) \(\S+\)\s+Peak: (\d+) KB")
+JOURNAL_SUFFIX = ".idx.jsonl"
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGHUP, signal.SIGINT)
+READ_SIZE = 1 << 16
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Block-compressed, indexed log storage with fast tail and grep"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("write", help="Store stdin (and copy it to stdout)")
+    p.add_argument("log", help="Log path; '.gz' is appended when missing")
+    p.add_argument("--truncate", action="store_true", help="Start a new log instead of appending")
+    p.add_argument("--quiet", "-q", action="store_true", help="Do not copy stdin to stdout")
+    p.add_argument("--block-size", type=int, default=1 << 18,
+                   help="Uncompressed bytes per gzip member (default: 256 KiB)")
+    p.add_argument("--flush", type=float, default=5.0,
+                   help="Also close a block after this many seconds (default: 5)")
+    p = sub.add_parser("tail", help="Last lines of a stored log")
+    p.add_argument("log")
+    p.add_argument("-n", type=int, default=20)
+    p = sub.add_parser("grep", help="Lines of a stored log matching a regex")
+    p.add_argument("log")
+    p.add_argument("pattern")
+    p.add_argument("--tag", choices=sorted(TAGS), default=None,
+                   help="Only search the indexed lines of this tag (no decompression)")
+    p.add_argument("--line-numbers", "-n", action="store_true")
+    p = sub.add_parser("index", help="(Re)build the index of a gzip log")
+    p.add_argument("log")
+    return parser.parse_args()
+
+
+def store_path(path):
+    return path if path.endswith(".gz") else path + ".gz"
+
+
+def _line_tags(line):
+    return [tag for tag, needle in TAGS.items() if needle in line]
+
+
+# ==============================================================================
+# Index
+# ==============================================================================
+
+
+def _empty_index():
+    return {"version": INDEX_VERSION, "lines": 0, "size": 0, "blocks": [],
+            "tags": {tag: [] for tag in TAGS}}
+
+
+def _replay_journal(gz_path, index):
+    """Apply the block records of <gz>.idx.jsonl not yet in index; False if they do not fit."""
+    try:
+        with open(gz_path + JOURNAL_SUFFIX) as f:
+            records = f.readlines()
+    except OSError:
+        return True
+    for line in records:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            break  # torn last record of a running or killed writer
+        block = rec["block"]
+        if block[0] < index["size"]:
+            continue  # already in the index
+        if block[0] > index["size"] or block[2] != index["lines"]:
+            return False
+        index["blocks"].append(block)
+        for tag, hits in rec["tags"].items():
+            index["tags"][tag].extend(hits)
+        index["lines"] += block[3]
+        index["size"] = block[0] + block[1]
+    return True
+
+
+def load_index(gz_path):
+    """The index of gz_path, or None when missing, stale or of another version."""
+    try:
+        with open(gz_path + ".idx") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != INDEX_VERSION or set(index.get("tags", {})) != set(TAGS):
+        return None
+    if not _replay_journal(gz_path, index):
+        return None
+    try:
+        if os.path.getsize(gz_path) != index["size"]:
+            return None
+    except OSError:
+        return None
+    return index
+
+
+def save_index(gz_path, index):
+    """Write the full index and drop the journal it supersedes."""
+    tmp = "{}.idx.{}.tmp".format(gz_path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, gz_path + ".idx")
+    try:
+        os.unlink(gz_path + JOURNAL_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def _add_lines(index, lines):
+    """Record the tags of lines (str, no newline) numbered from index['lines']; returns them."""
+    tags = index["tags"]
+    n = index["lines"]
+    added = {}
+    for k, line in enumerate(lines):
+        for tag in _line_tags(line):
+            hit = [n + k, line[:MAX_TAG_TEXT]]
+            tags[tag].append(hit)
+            added.setdefault(tag, []).append(hit)
+    index["lines"] = n + len(lines)
+    return added
+
+
+def build_index(gz_path):
+    """Index an existing gzip file member by member (any gzip writer)."""
+    index = _empty_index()
+    with open(gz_path, "rb") as f:
+        data = f.read()
+    pos = 0
+    tail = b""
+    while pos < len(data):
+        d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        raw = d.decompress(data[pos:])
+        used = len(data) - pos - len(d.unused_data)
+        if not d.eof:
+            break  # truncated member (writer still running or killed)
+        text = tail + raw
+        lines = text.split(b"\n")
+        tail = lines.pop()
+        index["blocks"].append([pos, used, index["lines"], len(lines)])
+        _add_lines(index, [x.decode("utf-8", "replace") for x in lines])
+        pos += used
+    if tail:
+        # a member ending without a newline: count the partial line in its block
+        index["blocks"][-1][3] += 1
+        _add_lines(index, [tail.decode("utf-8", "replace")])
+    index["size"] = pos
+    return index
+
+
+# ==============================================================================
+# Writer
+# ==============================================================================
+
+
+class LogWriter:
+    """Appends lines to a block-compressed log and keeps its index current."""
+
+    def __init__(self, path, truncate=False, block_size=1 << 18, flush_after=5.0):
+        self.path = store_path(path)
+        self.block_size = block_size
+        self.flush_after = flush_after
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if truncate or not os.path.exists(self.path):
+            self.index = _empty_index()
+            open(self.path, "wb").close()
+        else:
+            self.index = load_index(self.path) or build_index(self.path)
+            with open(self.path, "r+b") as f:
+                f.truncate(self.index["size"])  # drop a torn last member
+        self.f = open(self.path, "ab")
+        self.buf = []
+        self.buf_bytes = 0
+        self.last_flush = time.monotonic()
+        save_index(self.path, self.index)
+        self.journal = open(self.path + JOURNAL_SUFFIX, "a")
+
+    def write_line(self, line):
+        """line: one str including its trailing newline (if any)."""
+        self.buf.append(line)
+        self.buf_bytes += len(line)
+        if (self.buf_bytes >= self.block_size
+                or time.monotonic() - self.last_flush >= self.flush_after):
+            self.flush()
+
+    def flush_due(self):
+        """Seconds until the buffered lines must be flushed, None if there are none."""
+        if not self.buf:
+            return None
+        return max(0.0, self.last_flush + self.flush_after - time.monotonic())
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buf:
+            return
+        text = "".join(self.buf)
+        if not text.endswith("\n"):
+            text += "\n"  # blocks always end on a line boundary
+        member = gzip.compress(text.encode("utf-8", "replace"), compresslevel=6, mtime=0)
+        offset = self.index["size"]
+        self.f.write(member)
+        self.f.flush()
+        block = [offset, len(member), self.index["lines"], len(self.buf)]
+        self.index["blocks"].append(block)
+        added = _add_lines(self.index, [x.rstrip("\n") for x in self.buf])
+        self.index["size"] = offset + len(member)
+        self.journal.write(json.dumps({"block": block, "tags": added},
+                                      separators=(",", ":")) + "\n")
+        self.journal.flush()
+        self.buf = []
+        self.buf_bytes = 0
+
+    def close(self):
+        self.flush()
+        self.f.close()
+        self.journal.close()
+        save_index(self.path, self.index)
+
+
+class _Stopped(Exception):
+    def __init__(self, signum):
+        super().__init__(signum)
+        self.signum = signum
+
+
+def _raise_stopped(signum, frame):
+    raise _Stopped(signum)
+
+
+def _store_chunk(writer, out, pending, chunk):
+    """Copy chunk to out and store its complete lines; returns the partial rest."""
+    if out is not None:
+        out.write(chunk)
+        out.flush()
+    lines = (pending + chunk).split(b"\n")
+    for raw in lines[:-1]:
+        writer.write_line(raw.decode("utf-8", "replace") + "\n")
+    return lines[-1]
+
+
+def pump(fd, writer, out=None):
+    """
+    Store everything read from fd until EOF. STOP_SIGNALS are only delivered
+    while waiting for input, so a block is never torn; on one, the input still
+    readable without blocking is stored too and _Stopped is raised after.
+    """
+    pending = b""
+    signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+    try:
+        while True:
+            timeout = writer.flush_due()
+            try:
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+                ready = select.select([fd], [], [], timeout)[0]
+            finally:
+                signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+            if not ready:
+                writer.flush()
+                continue
+            chunk = os.read(fd, READ_SIZE)
+            if not chunk:
+                break
+            pending = _store_chunk(writer, out, pending, chunk)
+    except _Stopped:
+        signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+        os.set_blocking(fd, False)
+        while True:
+            try:
+                chunk = os.read(fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            pending = _store_chunk(writer, out, pending, chunk)
+        raise
+    finally:
+        if pending:
+            writer.write_line(pending.decode("utf-8", "replace"))
+
+
+# ==============================================================================
+# Reader
+# ==============================================================================
+
+
+class LogStore:
+    """Random access to a log written by LogWriter (or indexed by build_index)."""
+
+    def __init__(self, path):
+        self.path = store_path(path)
+        self.index = load_index(self.path)
+        if self.index is None:
+            self.index = build_index(self.path)
+
+    def __len__(self):
+        return self.index["lines"]
+
+    def tagged(self, tag):
+        """[(line number, text)] of the lines carrying tag, from the index only."""
+        return [tuple(x) for x in self.index["tags"][tag]]
+
+    def _block_lines(self, f, block):
+        f.seek(block[0])
+        text = gzip.decompress(f.read(block[1])).decode("utf-8", "replace")
+        return text.split("\n")[:block[3]]
+
+    def lines(self, start=0, stop=None):
+        """Yield (line number, text) for lines start <= n < stop."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        blocks = self.index["blocks"]
+        k = max(0, bisect.bisect_right([b[2] for b in blocks], start) - 1)
+        with open(self.path, "rb") as f:
+            for block in blocks[k:]:
+                if block[2] >= stop:
+                    break
+                for n, line in enumerate(self._block_lines(f, block), block[2]):
+                    if start <= n < stop:
+                        yield n, line
+
+    def tail(self, n):
+        return [line for _, line in self.lines(max(0, len(self) - n))]
+
+    def grep(self, pattern, tag=None):
+        """Yield (line number, text) matching the regex; tag restricts to indexed lines."""
+        regex = re.compile(pattern)
+        source = self.tagged(tag) if tag else self.lines()
+        for n, line in source:
+            if regex.search(line):
+                yield n, line
+
+    def text(self, tag=None):
+        """Whole log (or only its tag lines) as one string."""
+        source = self.tagged(tag) if tag else self.lines()
+        return "".join(line + "\n" for _, line in source)
+
+
+def read_log(path, tag=None):
+    """
+    Text of a log: the plain file when it exists, else the indexed <path>.gz,
+    reduced to the lines of tag when given. Raises IOError when neither exists.
+    """
+    if os.path.exists(path) and not path.endswith(".gz"):
+        with open(path) as f:
+            return f.read()
+    gz = store_path(path)
+    if not os.path.exists(gz):
+        raise IOError("no log {}".format(path))
+    return LogStore(gz).text(tag)
+
+
+def log_exists(path):
+    return os.path.isfile(path) or os.path.isfile(store_path(path))
+
+
+def main():
+    args = parse_args()
+    if args.cmd == "write":
+        writer = LogWriter(args.log, args.truncate, args.block_size, args.flush)
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, _raise_stopped)
+        rc = 0
+        try:
+            pump(sys.stdin.fileno(), writer, None if args.quiet else sys.stdout.buffer)
+        except _Stopped as e:
+            rc = 128 + e.signum
+        finally:
+            signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+            writer.close()
+        return rc
+    if args.cmd == "index":
+        path = store_path(args.log)
+        index = build_index(path)
+        save_index(path, index)
+        print("[INFO] {}: {} lines in {} blocks, {}".format(
+            path, index["lines"], len(index["blocks"]),
+            ", ".join("{} {}".format(len(v), k) for k, v in index["tags"].items())))
+        return 0
+    store = LogStore(args.log)
+    if args.cmd == "tail":
+        for line in store.tail(args.n):
+            print(line)
+        return 0
+    found = False
+    for n, line in store.grep(args.pattern, args.tag):
+        found = True
+        print("{}:{}".format(n + 1, line) if args.line_numbers else line)
+    return 0 if found else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+# This script merges several timing libraries into one (the successor of the
+# Brown mergeLib.pl): the header of the first library, renamed, followed by
+# the cell groups of every library. A cell defined by more than one library
+# is kept from the first one only.
+#
+# With --preprocess the libraries are also rewritten for Yosys/ABC as by
+# preprocessLib.py, and with --preprocessed-dir each rewritten library is
+# written there as well (<name>.lib, .gz stripped), so the per-design library
+# preparation is a single pass over LIB_FILES. Libraries are streamed line by
+# line, in parallel (-j), into part files whose cell offsets are then copied
+# into the merged library; memory use does not grow with the library sizes.
+#
+#   mergeLib.py asap7_merged a.lib b.lib.gz > merged.lib
+#   mergeLib.py asap7_merged $(LIB_FILES) --preprocess --preprocessed-dir objects/lib \
+#               -j 8 -o objects/lib/merged.lib
+# -----------------------------------------------------------------------------
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from preprocessLib import open_lib, preprocess_lines
+
+CELL_RE = re.compile(r'^\s*cell\s*\(\s*"?([^")]*?)"?\s*\)')
+LIBRARY_RE = re.compile(r"library\s*\(")
+COPY_CHUNK = 1 << 20
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Merge Liberty libraries (optionally preprocessed for Yosys/ABC) into one"
+    )
+    parser.add_argument("name", help="Name of the merged library")
+    parser.add_argument("libs", nargs="+", help="Liberty files (.lib or .lib.gz)")
+    parser.add_argument("--output", "-o", default=None, help="Merged library (default: stdout)")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="Apply the preprocessLib.py rewrites")
+    parser.add_argument("--preprocessed-dir", default=None,
+                        help="Also write every (preprocessed) library to this directory")
+    parser.add_argument("--jobs", "-j", type=int, default=1)
+    return parser.parse_args()
+
+
+def log(msg):
+    print(msg, file=sys.stderr)
+
+
+def lib_basename(path):
+    name = os.path.basename(path)
+    if name.endswith(".gz") or name.endswith(".GZ"):
+        name = name[:-3]
+    return name
+
+
+# ==============================================================================
+# Per-library pass
+# ==============================================================================
+
+
+def split_lib(path, part, preprocess=False, copy_to=None):
+    """
+    Stream one library into the part file: its header (everything before the
+    first cell) then its cell groups. Returns (header_end, [(cell, start, end)],
+    counts) with byte offsets into the part file.
+    """
+    counts = {}
+    cells = []
+    depth = 0
+    start = name = None
+    header_end = None
+    tmp_copy = "{}.{}.tmp".format(copy_to, os.getpid()) if copy_to else None
+    with open_lib(path) as src, open(part, "wb") as out:
+        copy = open(tmp_copy, "w") if tmp_copy else None
+        try:
+            lines = preprocess_lines(src, counts) if preprocess else src
+            for lineno, line in enumerate(lines, 1):
+                if copy is not None:
+                    copy.write(line)
+                m = CELL_RE.match(line)
+                if m:
+                    if depth > 0:
+                        raise ValueError("{}:{}: new cell before finishing the previous one".format(
+                            path, lineno))
+                    if header_end is None:
+                        header_end = out.tell()
+                    name, start = m.group(1), out.tell()
+                elif header_end is not None and name is None:
+                    continue  # between or after cells
+                out.write(line.encode("utf-8"))
+                if name is not None:
+                    depth += line.count("{") - line.count("}")
+                    if depth <= 0:
+                        cells.append((name, start, out.tell()))
+                        name, depth = None, 0
+        finally:
+            if copy is not None:
+                copy.close()
+    if name is not None:
+        raise ValueError("{}: cell {} is not closed".format(path, name))
+    if tmp_copy:
+        os.replace(tmp_copy, copy_to)
+    if header_end is None:
+        header_end = os.path.getsize(part)
+    return header_end, cells, counts
+
+
+def _split_job(job):
+    return split_lib(*job)
+
+
+# ==============================================================================
+# Merge
+# ==============================================================================
+
+
+def _copy_range(src, dst, start, end):
+    src.seek(start)
+    left = end - start
+    while left > 0:
+        chunk = src.read(min(COPY_CHUNK, left))
+        if not chunk:
+            break
+        dst.write(chunk)
+        left -= len(chunk)
+
+
+def write_merged(name, parts, results, out):
+    """Renamed header of the first part, then the first definition of every cell."""
+    seen = set()
+    dups = 0
+    header_end = results[0][0]
+    with open(parts[0], "rb") as f:
+        header = f.read(header_end).decode("utf-8").splitlines(True)
+    for line in header:
+        if LIBRARY_RE.search(line):
+            out.write("library ({}) {{\n".format(name).encode("utf-8"))
+        else:
+            out.write(line.encode("utf-8"))
+    for part, (_, cells, _) in zip(parts, results):
+        with open(part, "rb") as src:
+            for cell, start, end in cells:
+                if cell in seen:
+                    dups += 1
+                    continue
+                seen.add(cell)
+                out.write(b"\n")
+                _copy_range(src, out, start, end)
+    out.write(b"\n}\n")
+    return len(seen), dups
+
+
+def main():
+    args = parse_args()
+    if args.preprocessed_dir:
+        os.makedirs(args.preprocessed_dir, exist_ok=True)
+    work_dir = os.path.dirname(os.path.abspath(args.output)) if args.output else None
+    tmp_dir = tempfile.mkdtemp(prefix="mergeLib.", dir=work_dir)
+    try:
+        parts, jobs = [], []
+        for k, path in enumerate(args.libs):
+            part = os.path.join(tmp_dir, "{}.part".format(k))
+            copy_to = (os.path.join(args.preprocessed_dir, lib_basename(path))
+                       if args.preprocessed_dir else None)
+            parts.append(part)
+            jobs.append((path, part, args.preprocess, copy_to))
+        try:
+            if args.jobs > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+                    results = list(pool.map(_split_job, jobs))
+            else:
+                results = [_split_job(job) for job in jobs]
+        except (OSError, ValueError) as e:
+            log("[ERROR] {}".format(e))
+            return 1
+        for path, (_, cells, counts) in zip(args.libs, results):
+            extra = ""
+            if args.preprocess:
+                extra = ", {} original_pin commented, {} functions quoted".format(
+                    counts["original_pin"], counts["functions"])
+            log("[INFO] {}: {} cells{}".format(path, len(cells), extra))
+
+        if args.output:
+            tmp = "{}.{}.tmp".format(args.output, os.getpid())
+            with open(tmp, "wb") as out:
+                kept, dups = write_merged(args.name, parts, results, out)
+            os.replace(tmp, args.output)
+        else:
+            kept, dups = write_merged(args.name, parts, results, sys.stdout.buffer)
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if dups:
+        log("[WARN] {} duplicate cell(s) skipped, first definition kept".format(dups))
+    log("[INFO] {} cells from {} libraries merged into {}".format(
+        kept, len(args.libs), args.output or "stdout"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,41 +4,65 @@ import sys
 import gzip
 import argparse  # argument parsing
 
-# Parse and validate arguments
-# ==============================================================================
-parser = argparse.ArgumentParser(
-    description='Preprocesses Liberty files for compatibility with yosys/abc')
-parser.add_argument('--inputFile', '-i', required=True,
-                    help='Input File')
-parser.add_argument('--outputFile', '-o', required=True,
-                    help='Output File')
-args = parser.parse_args()
-
-
-# Read input file
-print("Opening file for replace:",args.inputFile)
-if args.inputFile.endswith(".gz") or args.inputFile.endswith(".GZ"):
-    f = gzip.open(args.inputFile, 'rt', encoding="utf-8")
-else:
-    f = open(args.inputFile, encoding="utf-8")
-content = f.read().encode("ascii", "ignore").decode("ascii")
-f.close()
-
 # Yosys-abc throws an error if original_pin is found within the liberty file.
 # removing
-pattern = r"(.*original_pin.*)"
-replace = r"/* \1 */;"
-content, count = re.subn(pattern, replace, content)
-print("Commented", count, "lines containing \"original_pin\"")
+ORIGINAL_PIN_RE = re.compile(r"(.*original_pin.*)")
+ORIGINAL_PIN_SUB = r"/* \1 */;"
 
 # Yosys, does not like properties that start with : !, without quotes
-pattern = r":\s+(!.*)\s+;"
-replace = r': "\1" ;'
-content, count = re.subn(pattern, replace, content)
-print("Replaced malformed functions", count)
-
-# Write output file
-print("Writing replaced file:",args.outputFile)
-f = open(args.outputFile, "w")
-f.write(content)
-f.close()
+UNQUOTED_FUNC_RE = re.compile(r":\s+(!.*)\s+;")
+UNQUOTED_FUNC_SUB = r': "\1" ;'
+
+
+def parse_args():
+    # Parse and validate arguments
+    # ==============================================================================
+    parser = argparse.ArgumentParser(
+        description='Preprocesses Liberty files for compatibility with yosys/abc')
+    parser.add_argument('--inputFile', '-i', required=True,
+                        help='Input File')
+    parser.add_argument('--outputFile', '-o', required=True,
+                        help='Output File')
+    return parser.parse_args()
+
+
+def open_lib(path):
+    """Text handle of a .lib or .lib.gz file."""
+    if path.endswith(".gz") or path.endswith(".GZ"):
+        return gzip.open(path, 'rt', encoding="utf-8", errors="ignore")
+    return open(path, encoding="utf-8", errors="ignore")
+
+
+def preprocess_lines(lines, counts):
+    """
+    Yield the lines of a Liberty file rewritten for Yosys/ABC (ASCII only,
+    original_pin commented out, '!' functions quoted). counts collects the
+    number of rewrites under 'original_pin' and 'functions'.
+    """
+    counts.setdefault("original_pin", 0)
+    counts.setdefault("functions", 0)
+    for line in lines:
+        line = line.encode("ascii", "ignore").decode("ascii")
+        if "original_pin" in line:
+            line, n = ORIGINAL_PIN_RE.subn(ORIGINAL_PIN_SUB, line)
+            counts["original_pin"] += n
+        if "!" in line:
+            line, n = UNQUOTED_FUNC_RE.subn(UNQUOTED_FUNC_SUB, line)
+            counts["functions"] += n
+        yield line
+
+
+def main():
+    args = parse_args()
+    print("Opening file for replace:", args.inputFile)
+    counts = {}
+    print("Writing replaced file:", args.outputFile)
+    with open_lib(args.inputFile) as src, open(args.outputFile, "w") as dst:
+        dst.writelines(preprocess_lines(src, counts))
+    print("Commented", counts["original_pin"], "lines containing \"original_pin\"")
+    print("Replaced malformed functions", counts["functions"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
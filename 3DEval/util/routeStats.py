@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+# This script streams a routed DEF (e.g. 6_final.def) once and reports
+# per-layer wirelength, per-via-type counts (hb_layer vias in particular) and
+# cross-tier net statistics. The result is written as flat metrics JSON using
+# the same '<stage>__<category>__...' keys as genMetrics.py; naming it
+# $(LOG_DIR)/6_route_stats.json lets genMetrics merge it with the other 6_*.json.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+from defStream import iter_def_statements, open_def, parse_units, tier_of_master
+
+ROUTE_KEYWORDS = ("ROUTED", "FIXED", "COVER", "NOSHIELD")
+IN_ROUTE_OPTIONS = ("SHAPE", "STYLE", "MASK")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Streams a routed DEF and reports wirelength and via statistics"
+    )
+    parser.add_argument("--def", "-i", dest="def_file", required=True, help="Routed DEF")
+    parser.add_argument(
+        "--output", "-o", default=None, help="Metrics JSON (default: stdout)"
+    )
+    parser.add_argument(
+        "--prefix", default="finish", help="Metric stage prefix (default: finish)"
+    )
+    parser.add_argument(
+        "--hb-prefix",
+        default="hb_layer",
+        help="Via name prefix of hybrid-bonding vias (default: hb_layer)",
+    )
+    parser.add_argument(
+        "--upper-suffix",
+        nargs="+",
+        default=["_m", "_add"],
+        help="Metal layer suffixes of the upper tier stack (default: _m _add)",
+    )
+    parser.add_argument("--per-net", default=None, help="Optional per-net CSV output")
+    return parser.parse_args()
+
+
+class RouteStats:
+    """Accumulates routing statistics statement by statement."""
+
+    def __init__(self, hb_prefix="hb_layer", upper_suffix=("_m", "_add")):
+        self.hb_prefix = hb_prefix
+        self.upper_suffix = tuple(upper_suffix)
+        self.dbu = 1000
+        self.inst_tier = {}
+        self.wire = {"NETS": defaultdict(int), "SPECIALNETS": defaultdict(int)}
+        self.vias = {"NETS": defaultdict(int), "SPECIALNETS": defaultdict(int)}
+        self.nets = 0
+        self.routed_nets = 0
+        self.hb_nets = 0
+        self.hb_vias_max = 0
+        self.hb_via_hist = defaultdict(int)
+        self.span_nets = 0
+        self.span_without_hb = 0
+        self.hb_single_tier = 0
+
+    # ---- statement handlers ----
+    def add_component(self, lines):
+        toks = lines[0].split()
+        if len(toks) >= 3:
+            tier = tier_of_master(toks[2])
+            if tier is not None:
+                self.inst_tier[toks[1]] = tier
+
+    def add_net(self, section, lines):
+        """Parse one '- net ... ;' statement; returns the per-net record."""
+        toks = " ".join(lines).split()
+        n = len(toks)
+        name = toks[1] if n > 1 else ""
+        wire = self.wire[section]
+        vias = self.vias[section]
+        special = section == "SPECIALNETS"
+        tiers = set()
+        net_wire = 0
+        net_vias = 0
+        net_hb = 0
+
+        i = 2
+        # connections: ( inst pin [+ SYNTHESIZED] )
+        while i < n and toks[i] == "(":
+            j = i + 1
+            while j < n and toks[j] != ")":
+                j += 1
+            if j - i >= 3:
+                tier = self.inst_tier.get(toks[i + 1])
+                if tier is not None:
+                    tiers.add(tier)
+            i = j + 1
+
+        routed = False
+        while i < n:
+            if toks[i] != "+" or i + 1 >= n:
+                i += 1
+                continue
+            if toks[i + 1] not in ROUTE_KEYWORDS:
+                i += 2
+                continue
+            # routing statement: layer [width] [options] points/vias, NEW ...
+            routed = True
+            i += 2
+            layer = None
+            prev = None
+            new_layer = True
+            while i < n:
+                tok = toks[i]
+                if new_layer:
+                    layer = tok
+                    i += 1
+                    if special and i < n and toks[i] not in ("(", "+"):
+                        i += 1  # special wire width
+                    new_layer = False
+                    prev = None
+                    continue
+                if tok == "NEW":
+                    new_layer = True
+                    i += 1
+                    continue
+                if tok == "+":
+                    if i + 1 < n and toks[i + 1] in IN_ROUTE_OPTIONS:
+                        i += 3
+                        continue
+                    break
+                if tok == ";":
+                    i += 1
+                    break
+                if tok in ("STYLE", "MASK", "TAPERRULE"):
+                    i += 2
+                    continue
+                if tok == "TAPER":
+                    i += 1
+                    continue
+                if tok == "RECT":
+                    i += 7  # RECT ( dx1 dy1 dx2 dy2 )
+                    continue
+                if tok == "VIRTUAL":
+                    # VIRTUAL ( x y ): moves the start of the next segment, no wire
+                    j = i + 2
+                    while j < n and toks[j] != ")":
+                        j += 1
+                    prev = self._point(toks, i + 1, prev)
+                    i = j + 1
+                    continue
+                if tok == "(":
+                    j = i + 1
+                    while j < n and toks[j] != ")":
+                        j += 1
+                    pt = self._point(toks, i, prev)
+                    if prev is not None and pt is not None:
+                        seg = abs(pt[0] - prev[0]) + abs(pt[1] - prev[1])
+                        wire[layer] += seg
+                        net_wire += seg
+                    prev = pt
+                    i = j + 1
+                    continue
+                # anything else at this position is a via name
+                vias[tok] += 1
+                net_vias += 1
+                if tok.startswith(self.hb_prefix):
+                    net_hb += 1
+                i += 1
+                if i + 1 < n and toks[i] == "DO":
+                    # via array: DO n BY m STEP dx dy
+                    try:
+                        count = int(toks[i + 1]) * int(toks[i + 3])
+                    except (ValueError, IndexError):
+                        count = 1
+                    vias[tok] += count - 1
+                    net_vias += count - 1
+                    if tok.startswith(self.hb_prefix):
+                        net_hb += count - 1
+                    i += 7
+
+        if not special:
+            self.nets += 1
+            self.routed_nets += routed
+            spans = len(tiers) > 1
+            self.span_nets += spans
+            if net_hb:
+                self.hb_nets += 1
+                self.hb_vias_max = max(self.hb_vias_max, net_hb)
+                self.hb_via_hist[min(net_hb, 4)] += 1
+                if tiers and not spans:
+                    self.hb_single_tier += 1
+            elif spans:
+                self.span_without_hb += 1
+        return name, net_wire, net_vias, net_hb, len(tiers) > 1
+
+    @staticmethod
+    def _point(toks, i, prev):
+        """Parse '( x y [ext] )' at toks[i]; '*' repeats the previous coordinate."""
+        try:
+            xs, ys = toks[i + 1], toks[i + 2]
+        except IndexError:
+            return prev
+        try:
+            x = prev[0] if xs == "*" else int(float(xs))
+            y = prev[1] if ys == "*" else int(float(ys))
+        except (TypeError, ValueError):
+            return prev
+        return x, y
+
+    # ---- results ----
+    def is_upper_layer(self, layer):
+        return layer.endswith(self.upper_suffix)
+
+    def metrics(self, prefix="finish"):
+        um = float(self.dbu)
+        p = prefix + "__route"
+        out = {}
+        total = 0
+        tier_wire = [0, 0]
+        for layer, length in sorted(self.wire["NETS"].items()):
+            out["{}__wirelength__layer:{}".format(p, layer)] = round(length / um, 4)
+            total += length
+            tier_wire[0 if self.is_upper_layer(layer) else 1] += length
+        out[p + "__wirelength"] = round(total / um, 4)
+        out[p + "__wirelength__upper"] = round(tier_wire[0] / um, 4)
+        out[p + "__wirelength__bottom"] = round(tier_wire[1] / um, 4)
+
+        via_total = 0
+        hb_total = 0
+        for via, count in sorted(self.vias["NETS"].items()):
+            out["{}__via__count__type:{}".format(p, via)] = count
+            via_total += count
+            if via.startswith(self.hb_prefix):
+                hb_total += count
+        out[p + "__via__count"] = via_total
+        out[p + "__via__count__hb"] = hb_total
+
+        for layer, length in sorted(self.wire["SPECIALNETS"].items()):
+            out["{}__special__wirelength__layer:{}".format(p, layer)] = round(
+                length / um, 4
+            )
+        for via, count in sorted(self.vias["SPECIALNETS"].items()):
+            out["{}__special__via__count__type:{}".format(p, via)] = count
+
+        out[p + "__net__count"] = self.nets
+        out[p + "__net__routed__count"] = self.routed_nets
+        out[p + "__net__cross_tier__count"] = self.hb_nets
+        out[p + "__net__cross_tier__hb_vias_max"] = self.hb_vias_max
+        out[p + "__net__cross_tier__hb_vias_mean"] = (
+            round(hb_total / self.hb_nets, 4) if self.hb_nets else 0
+        )
+        for k in range(1, 5):
+            label = str(k) if k < 4 else "4plus"
+            out["{}__net__cross_tier__hb_vias:{}".format(p, label)] = self.hb_via_hist[k]
+        out[p + "__net__tier_spanning__count"] = self.span_nets
+        out[p + "__net__tier_spanning__without_hb"] = self.span_without_hb
+        out[p + "__net__single_tier__with_hb"] = self.hb_single_tier
+        return out
+
+
+def collect_route_stats(def_path, hb_prefix="hb_layer", upper_suffix=("_m", "_add"),
+                        per_net=None):
+    """Stream def_path once; optionally write one CSV row per regular net."""
+    stats = RouteStats(hb_prefix, upper_suffix)
+    csv = None
+    if per_net:
+        csv = open(per_net, "w")
+        csv.write("net,wirelength_um,vias,hb_vias,tier_spanning\n")
+    try:
+        with open_def(def_path) as f:
+            for section, lines in iter_def_statements(f):
+                if section is None:
+                    dbu = parse_units(lines[0])
+                    if dbu:
+                        stats.dbu = dbu
+                elif section == "COMPONENTS":
+                    stats.add_component(lines)
+                elif section in ("NETS", "SPECIALNETS"):
+                    rec = stats.add_net(section, lines)
+                    if csv and section == "NETS":
+                        name, wl, nv, nhb, spans = rec
+                        csv.write("{},{:.4f},{},{},{}\n".format(
+                            name, wl / float(stats.dbu), nv, nhb, int(spans)))
+    finally:
+        if csv:
+            csv.close()
+    return stats
+
+
+def main():
+    args = parse_args()
+    stats = collect_route_stats(
+        args.def_file, args.hb_prefix, args.upper_suffix, args.per_net
+    )
+    metrics = stats.metrics(args.prefix)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+    else:
+        json.dump(metrics, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
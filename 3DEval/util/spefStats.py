@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+# This script streams a SPEF (e.g. 6_final.spef) line by line and summarises
+# per-net parasitics: total cap (*D_NET), grounded and coupling cap (*CAP) and
+# total resistance (*RES). The *NAME_MAP is resolved into an integer-indexed
+# table and per-net values are accumulated into NumPy arrays, so memory scales
+# with the number of nets, not with the number of RC nodes in the file. Nets are
+# tagged intra-upper / intra-bottom / cross-tier from the partition file (or
+# from the *D master suffix when no partition is given). The summary uses the
+# genMetrics.py key style; naming it $(LOG_DIR)/6_spef_stats.json lets
+# genMetrics merge it with the other 6_*.json.
+# -----------------------------------------------------------------------------
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from array import array
+
+import numpy as np
+
+from defStream import normalize_name, tier_of_master
+
+CLASS_NAMES = ("intra_upper", "intra_bottom", "cross_tier", "unknown")
+CAP_SCALE_FF = {"FF": 1.0, "PF": 1e3, "NF": 1e6, "UF": 1e9, "F": 1e15}
+RES_SCALE_OHM = {"OHM": 1.0, "KOHM": 1e3, "MOHM": 1e6}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Streams a SPEF and reports per-net parasitic summaries"
+    )
+    parser.add_argument("--spef", "-i", required=True, help="SPEF file (.spef or .spef.gz)")
+    parser.add_argument("--partition", default=None, help="partition.txt (<inst> <die>)")
+    parser.add_argument(
+        "--output", "-o", default=None, help="Metrics JSON (default: stdout)"
+    )
+    parser.add_argument(
+        "--prefix", default="finish", help="Metric stage prefix (default: finish)"
+    )
+    parser.add_argument("--per-net", default=None, help="Optional per-net CSV output")
+    return parser.parse_args()
+
+
+def read_partition(path):
+    part = {}
+    if not path:
+        return part
+    if not os.path.exists(path):
+        print("[WARN] partition file '{}' not found, ignored.".format(path))
+        return part
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            toks = raw.split()
+            if len(toks) < 2 or toks[0].startswith(("#", "//")):
+                continue
+            if toks[-1] in ("0", "1"):
+                part[normalize_name(toks[0])] = int(toks[-1])
+    return part
+
+
+def open_spef(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+    return open(path, encoding="utf-8", errors="ignore")
+
+
+class SpefStats:
+    """Per-net parasitic accumulator fed one SPEF line at a time."""
+
+    def __init__(self, partition=None):
+        self.partition = partition or {}
+        self.names = {}
+        self.delimiter = ":"
+        self.cap_scale = 1.0
+        self.res_scale = 1.0
+        self.net_ids = array("q")
+        self.total_cap = array("d")
+        self.ground_cap = array("d")
+        self.coupling_cap = array("d")
+        self.total_res = array("d")
+        self.net_class = array("b")
+        # current *D_NET
+        self._section = None
+        self._tiers = set()
+        self._gc = self._cc = self._r = 0.0
+
+    def resolve(self, tok):
+        if tok.startswith("*"):
+            try:
+                return self.names[int(tok[1:])]
+            except (ValueError, KeyError):
+                return tok
+        return tok
+
+    def _inst_tier(self, inst, master):
+        tier = self.partition.get(normalize_name(inst))
+        if tier is None and master:
+            tier = tier_of_master(master)
+        return tier
+
+    def feed(self, line):
+        toks = line.split()
+        if not toks:
+            return
+        key = toks[0]
+        if key.startswith("*") and not key[1:].isdigit():
+            self._keyword(key, toks)
+            return
+        section = self._section
+        if section == "NAME_MAP":
+            try:
+                self.names[int(key[1:])] = toks[1]
+            except (ValueError, IndexError):
+                pass
+        elif section == "CAP":
+            try:
+                value = float(toks[-1])
+            except ValueError:
+                return
+            if len(toks) >= 4:
+                self._cc += value
+            else:
+                self._gc += value
+        elif section == "RES":
+            try:
+                self._r += float(toks[-1])
+            except ValueError:
+                pass
+
+    def _keyword(self, key, toks):
+        if key == "*NAME_MAP":
+            self._section = "NAME_MAP"
+        elif key == "*DELIMITER" and len(toks) > 1:
+            self.delimiter = toks[1]
+        elif key == "*C_UNIT" and len(toks) > 2:
+            self.cap_scale = float(toks[1]) * CAP_SCALE_FF.get(toks[2].upper(), 1.0)
+        elif key == "*R_UNIT" and len(toks) > 2:
+            self.res_scale = float(toks[1]) * RES_SCALE_OHM.get(toks[2].upper(), 1.0)
+        elif key == "*D_NET" and len(toks) > 2:
+            self._section = "D_NET"
+            self.net_ids.append(self._net_id(toks[1]))
+            try:
+                self.total_cap.append(float(toks[2]))
+            except ValueError:
+                self.total_cap.append(0.0)
+            self._tiers = set()
+            self._gc = self._cc = self._r = 0.0
+        elif key in ("*CONN", "*CAP", "*RES"):
+            self._section = key[1:]
+        elif key == "*I" and self._section == "CONN" and len(toks) > 1:
+            pin = self.resolve_pin_owner(toks[1])
+            master = toks[toks.index("*D") + 1] if "*D" in toks[:-1] else None
+            tier = self._inst_tier(pin, master)
+            if tier is not None:
+                self._tiers.add(tier)
+        elif key == "*END" and self._section in ("D_NET", "CONN", "CAP", "RES"):
+            self._end_net()
+        elif key in ("*PORTS", "*POWER_NETS", "*GROUND_NETS", "*R_NET"):
+            self._section = key[1:]
+
+    def _net_id(self, tok):
+        """Name-map index of a *D_NET; unmapped names get negative ids."""
+        if tok.startswith("*") and tok[1:].isdigit():
+            return int(tok[1:])
+        nid = -(len(self.names) + 1)
+        self.names[nid] = tok
+        return nid
+
+    def resolve_pin_owner(self, tok):
+        inst = tok.rsplit(self.delimiter, 1)[0]
+        return self.resolve(inst)
+
+    def _end_net(self):
+        self.ground_cap.append(self._gc)
+        self.coupling_cap.append(self._cc)
+        self.total_res.append(self._r)
+        if len(self._tiers) > 1:
+            cls = 2
+        elif self._tiers:
+            cls = next(iter(self._tiers))
+        else:
+            cls = 3
+        self.net_class.append(cls)
+        self._section = None
+
+    # ---- results ----
+    def arrays(self):
+        n = len(self.net_class)
+        return {
+            "net_id": np.frombuffer(self.net_ids, dtype=np.int64)[:n],
+            "total_cap": np.frombuffer(self.total_cap, dtype=np.float64)[:n] * self.cap_scale,
+            "ground_cap": np.frombuffer(self.ground_cap, dtype=np.float64) * self.cap_scale,
+            "coupling_cap": np.frombuffer(self.coupling_cap, dtype=np.float64) * self.cap_scale,
+            "total_res": np.frombuffer(self.total_res, dtype=np.float64) * self.res_scale,
+            "net_class": np.frombuffer(self.net_class, dtype=np.int8),
+        }
+
+    def metrics(self, prefix="finish"):
+        a = self.arrays()
+        p = prefix + "__parasitics"
+        out = {p + "__net__count": int(a["net_class"].size)}
+
+        def summarize(tag, mask):
+            cap = a["total_cap"][mask]
+            res = a["total_res"][mask]
+            cc = a["coupling_cap"][mask]
+            out["{}__net__count{}".format(p, tag)] = int(cap.size)
+            out["{}__cap__total{}".format(p, tag)] = round(float(cap.sum()), 4)
+            out["{}__cap__coupling{}".format(p, tag)] = round(float(cc.sum()), 4)
+            out["{}__res__total{}".format(p, tag)] = round(float(res.sum()), 4)
+            if cap.size:
+                out["{}__cap__mean{}".format(p, tag)] = round(float(cap.mean()), 6)
+                out["{}__cap__p95{}".format(p, tag)] = round(float(np.percentile(cap, 95)), 6)
+                out["{}__res__mean{}".format(p, tag)] = round(float(res.mean()), 6)
+                out["{}__res__p95{}".format(p, tag)] = round(float(np.percentile(res, 95)), 6)
+
+        summarize("", np.ones(a["net_class"].size, dtype=bool))
+        for code, name in enumerate(CLASS_NAMES):
+            summarize("__class:" + name, a["net_class"] == code)
+        return out
+
+    def write_per_net(self, path):
+        a = self.arrays()
+        with open(path, "w") as f:
+            f.write("net,class,total_cap_ff,coupling_cap_ff,total_res_ohm\n")
+            for nid, cls, cap, cc, res in zip(a["net_id"].tolist(), a["net_class"].tolist(),
+                                              a["total_cap"].tolist(),
+                                              a["coupling_cap"].tolist(),
+                                              a["total_res"].tolist()):
+                name = self.names.get(nid, str(nid))
+                f.write("{},{},{:.6f},{:.6f},{:.6f}\n".format(
+                    name, CLASS_NAMES[cls], cap, cc, res))
+
+
+def collect_spef_stats(spef_path, partition=None):
+    stats = SpefStats(partition)
+    with open_spef(spef_path) as f:
+        for line in f:
+            stats.feed(line)
+    return stats
+
+
+def main():
+    args = parse_args()
+    stats = collect_spef_stats(args.spef, read_partition(args.partition))
+    metrics = stats.metrics(args.prefix)
+    if args.per_net:
+        stats.write_per_net(args.per_net)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+    else:
+        json.dump(metrics, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+# This script stages flow artifacts (DEF, Verilog, ODB, SDC, whole results
+# directories) from one name to another without copying their bytes where the
+# filesystem allows it. The Makefile calls it instead of 'cp -f'/'cp -rf'.
+#
+# Staged files are independent of their source: a reflink (FICLONE,
+# copy-on-write on btrfs/XFS) where the filesystem supports it, else a plain
+# copy. Synthesis and CTS rewrite their outputs in place (cp/write_sdc onto
+# 1_synth.sdc, yosys onto 1_1_yosys.v, 4_cts.sdc), so a shared inode would
+# leak a later run into every artifact staged from it. Hardlinks are only
+# made with ARTIFACT_MODE=link (or --mode link), for scratch runs where
+# nothing is rerun, and never for destinations matching --mutable. Every
+# destination is written as a temp file renamed over the old one, so
+# restaging never writes through an existing link ('cp -f' truncates it).
+#
+# Provenance goes to <dst dir>/.artifacts.json: source, method, the stat of
+# the staged file and the origin (the first non-staged file of a chain). Two
+# artifacts with the same origin and unchanged stats are identical without
+# rehashing; 'stage' uses that to skip up-to-date destinations.
+#
+#   stage : stageArtifact.py stage [--mutable GLOB] SRC DST [SRC DST ...]
+#           stageArtifact.py stage --tree [--mutable GLOB] SRC_DIR DST_DIR
+#   same  : stageArtifact.py same A B   (exit 0 if provably identical)
+#   show  : stageArtifact.py show FILE...
+#
+# ARTIFACT_MODE=auto|reflink|copy|link selects the methods (default auto:
+# reflink, else copy; link: hardlink, else copy).
+# -----------------------------------------------------------------------------
+
+import argparse
+import errno
+import fnmatch
+import json
+import os
+import shutil
+import sys
+
+MANIFEST = ".artifacts.json"
+METHODS = ("reflink", "copy", "link")
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), linux/fs.h
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Stage flow artifacts by reflink or copy (hardlink on request), with provenance"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("stage", help="Stage SRC as DST (pairs), or a whole tree")
+    p.add_argument("paths", nargs="+", help="SRC DST [SRC DST ...]")
+    p.add_argument("--tree", action="store_true",
+                   help="Stage the contents of SRC_DIR into DST_DIR (like cp -rf SRC/* DST/)")
+    p.add_argument("--mutable", action="append", default=[], metavar="GLOB",
+                   help="Destination basenames rewritten in place later: never hardlinked, even in link mode")
+    p.add_argument("--optional", action="store_true",
+                   help="Skip missing sources instead of failing")
+    p.add_argument("--mode", default=os.environ.get("ARTIFACT_MODE", "auto"),
+                   choices=("auto",) + METHODS,
+                   help="auto: reflink, else copy; link: hardlink, else copy (default: $ARTIFACT_MODE or auto)")
+    p.add_argument("--quiet", "-q", action="store_true")
+    p = sub.add_parser("same", help="Exit 0 if A and B are provably identical")
+    p.add_argument("a")
+    p.add_argument("b")
+    p = sub.add_parser("show", help="Print the provenance of staged files")
+    p.add_argument("files", nargs="+")
+    return parser.parse_args()
+
+
+# ==============================================================================
+# Provenance
+# ==============================================================================
+
+
+def _stat_key(st):
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "dev": st.st_dev, "ino": st.st_ino}
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def provenance(path, manifests=None):
+    """Manifest record of path if it still describes the file, else None."""
+    directory, name = os.path.split(os.path.abspath(path))
+    if manifests is not None and directory in manifests:
+        manifest = manifests[directory]
+    else:
+        manifest = _load_manifest(directory)
+        if manifests is not None:
+            manifests[directory] = manifest
+    rec = manifest.get(name)
+    if not rec:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return rec if rec.get("stat") == _stat_key(st) else None
+
+
+def origin_of(path, manifests=None):
+    """The non-staged file path descends from, with its stat at staging time."""
+    rec = provenance(path, manifests)
+    if rec is not None:
+        return rec["origin"]
+    st = os.stat(path)
+    origin = {"path": os.path.abspath(path)}
+    origin.update(_stat_key(st))
+    return origin
+
+
+def same(a, b, manifests=None):
+    try:
+        sa, sb = os.stat(a), os.stat(b)
+    except OSError:
+        return False
+    if (sa.st_dev, sa.st_ino) == (sb.st_dev, sb.st_ino):
+        return True
+    if sa.st_size != sb.st_size:
+        return False
+    return origin_of(a, manifests) == origin_of(b, manifests)
+
+
+# ==============================================================================
+# Staging
+# ==============================================================================
+
+
+def _reflink(src, tmp):
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, tmp)
+
+
+def _place(src, dst, methods):
+    """Create dst from src with the first method that works; returns it."""
+    tmp = "{}.{}.stage".format(dst, os.getpid())
+    for method in methods:
+        try:
+            if method == "reflink":
+                _reflink(src, tmp)
+            elif method == "link":
+                os.link(src, tmp)
+            else:
+                shutil.copy2(src, tmp)
+        except (OSError, ImportError) as e:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            if method == "copy" or getattr(e, "errno", None) in (errno.ENOSPC, errno.EDQUOT):
+                raise
+            continue
+        os.replace(tmp, dst)
+        return method
+    raise OSError("no staging method left for {}".format(dst))
+
+
+def _methods(mode, mutable):
+    """Methods to try in order; hardlinks only in link mode and never for mutable names."""
+    if mode == "link":
+        return ["copy"] if mutable else ["link", "copy"]
+    if mode == "auto":
+        return ["reflink", "copy"]
+    return [mode] if mode == "copy" else [mode, "copy"]
+
+
+def stage_file(src, dst, mode="auto", mutable=False, manifests=None):
+    """Stage one file; returns the method used or 'up-to-date'."""
+    if manifests is None:
+        manifests = {}
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    dst_dir = os.path.dirname(os.path.abspath(dst))
+    methods = _methods(mode, mutable)
+    if os.path.exists(dst) and os.path.exists(src) and same(src, dst, manifests):
+        # A destination hardlinked by an earlier link-mode run is restaged unless
+        # hardlinks are still allowed for it
+        st_src, st_dst = os.stat(src), os.stat(dst)
+        if "link" in methods or (st_src.st_dev, st_src.st_ino) != (st_dst.st_dev, st_dst.st_ino):
+            return "up-to-date"
+    if os.path.islink(src):
+        tmp = "{}.{}.stage".format(dst, os.getpid())
+        os.symlink(os.readlink(src), tmp)
+        os.replace(tmp, dst)
+        return "symlink"
+    origin = origin_of(src, manifests)
+    method = _place(src, dst, methods)
+    manifest = manifests.setdefault(dst_dir, _load_manifest(dst_dir))
+    manifest[os.path.basename(dst)] = {
+        "src": os.path.abspath(src),
+        "method": method,
+        "origin": origin,
+        "stat": _stat_key(os.stat(dst)),
+    }
+    return method
+
+
+def _is_mutable(name, patterns):
+    return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def stage(args):
+    manifests = {}
+    counts = {}
+    pairs = []
+    if args.tree:
+        if len(args.paths) != 2:
+            print("[ERROR] --tree takes SRC_DIR DST_DIR")
+            return 2
+        src_root, dst_root = args.paths
+        if not os.path.isdir(src_root):
+            if args.optional:
+                return 0
+            print("[ERROR] not a directory: {}".format(src_root))
+            return 1
+        for root, dirs, files in os.walk(src_root):
+            rel = os.path.relpath(root, src_root)
+            out = os.path.normpath(os.path.join(dst_root, rel))
+            os.makedirs(out, exist_ok=True)
+            for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+                if name != MANIFEST:
+                    pairs.append((os.path.join(root, name), os.path.join(out, name)))
+            dirs[:] = [d for d in dirs if not os.path.islink(os.path.join(root, d))]
+    else:
+        if len(args.paths) % 2:
+            print("[ERROR] expected SRC DST pairs, got {} paths".format(len(args.paths)))
+            return 2
+        pairs = list(zip(args.paths[0::2], args.paths[1::2]))
+    rc = 0
+    for src, dst in pairs:
+        if not os.path.lexists(src):
+            if not args.optional:
+                print("[ERROR] missing artifact: {}".format(src))
+                rc = 1
+            continue
+        try:
+            method = stage_file(src, dst, args.mode,
+                                _is_mutable(os.path.basename(dst), args.mutable), manifests)
+        except OSError as e:
+            print("[ERROR] staging {} -> {}: {}".format(src, dst, e))
+            rc = 1
+            continue
+        counts[method] = counts.get(method, 0) + 1
+    for directory, manifest in manifests.items():
+        if os.path.isdir(directory):
+            _save_manifest(directory, manifest)
+    if not args.quiet and counts:
+        print("[STAGE] {}".format(" ".join(
+            "{}={}".format(k, v) for k, v in sorted(counts.items()))))
+    return rc
+
+
+def main():
+    args = parse_args()
+    if args.cmd == "stage":
+        return stage(args)
+    if args.cmd == "same":
+        return 0 if same(args.a, args.b) else 1
+    for path in args.files:
+        rec = provenance(path)
+        print(json.dumps({"file": path, "provenance": rec}, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
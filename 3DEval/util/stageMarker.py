@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+# This script records and checks per-stage completion markers so interrupted
+# experiments can resume at their first unfinished stage.
+#
+#   mark  : called by $(call _stage_done) at the end of every ord-*/cds-* stage;
+#           appends {stage, config, fingerprint, elapsed} to
+#           $(STAGE_MARKER_DIR)/journal.jsonl and rewrites <stage>.json
+#   check : exit 0 if the n-th run of a stage completed with the current
+#           fingerprint (used by 'make stage-check')
+#   shim  : the logic behind util/shim/make, which run_experiments.py --resume
+#           puts first on PATH for run.sh
+#
+# The fingerprint hashes the design/platform config, SDC and tech LEF contents,
+# the results the stage reads (STAGE_INPUTS_<stage> in the Makefile) and the
+# flow knobs passed with --vars, so a changed input or a rerun upstream stage
+# invalidates the marker and the stage is rerun.
+# -----------------------------------------------------------------------------
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+JOURNAL = "journal.jsonl"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Stage completion markers for resumable flow runs"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("mark", "check"):
+        p = sub.add_parser(name)
+        p.add_argument("--dir", required=True, help="Marker directory")
+        p.add_argument("--stage", required=True, help="Make target")
+        p.add_argument("--config", default="", help="DESIGN_CONFIG of the stage")
+        p.add_argument("--files", nargs="*", default=[], help="Input files to fingerprint")
+        p.add_argument("--vars", nargs="*", default=[], help="NAME=value knobs to fingerprint")
+        if name == "mark":
+            p.add_argument("--started", type=float, default=None, help="Stage start (epoch s)")
+        else:
+            p.add_argument("--occurrence", type=int, default=1,
+                           help="Require the n-th completion of this stage")
+    sub.add_parser("shim", add_help=False)
+    if argv and argv[0] == "shim":
+        return argparse.Namespace(cmd="shim", make_args=argv[1:])
+    return parser.parse_args(argv)
+
+
+def fingerprint(files, knobs):
+    h = hashlib.sha256()
+    for path in files:
+        h.update(b"\0file:" + path.encode())
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        except OSError:
+            h.update(b"<missing>")
+    for knob in sorted(knobs):
+        h.update(b"\0var:" + knob.encode())
+    return h.hexdigest()
+
+
+def config_key(config):
+    return os.path.normpath(config) if config else ""
+
+
+def read_journal(marker_dir):
+    records = []
+    path = os.path.join(marker_dir, JOURNAL)
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def mark(args):
+    os.makedirs(args.dir, exist_ok=True)
+    now = time.time()
+    record = {
+        "stage": args.stage,
+        "config": config_key(args.config),
+        "fingerprint": fingerprint(args.files, args.vars),
+        "finished": round(now, 3),
+    }
+    if args.started:
+        record["started"] = args.started
+        record["elapsed_s"] = round(now - args.started, 3)
+    with open(os.path.join(args.dir, JOURNAL), "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+    with open(os.path.join(args.dir, args.stage + ".json"), "w") as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+    return 0
+
+
+def check(args):
+    fp = fingerprint(args.files, args.vars)
+    cfg = config_key(args.config)
+    done = sum(
+        1
+        for r in read_journal(args.dir)
+        if r.get("stage") == args.stage and r.get("config") == cfg and r.get("fingerprint") == fp
+    )
+    return 0 if done >= args.occurrence else 1
+
+
+# ==============================================================================
+# make shim (util/shim/make)
+# ==============================================================================
+#
+# Environment:
+#   FLOW_REAL_MAKE    : the real make binary
+#   FLOW_RESUME=1     : skip clean_all and completed stages until the first
+#                       unfinished one, then run everything after it
+#   FLOW_START_AT     : skip every stage before the first run of this target
+#   FLOW_STOP_AT      : skip every stage after the first run of this target
+#   FLOW_STOP_BEFORE  : skip the first run of this target and everything after
+#                       it (the shared prefix of a sweep, see run_experiments.py)
+#   FLOW_FAIL_FAST=1  : once a stage fails, skip the rest of run.sh and exit
+#                       with its status (run.sh itself has no 'set -e')
+#   FLOW_TELEMETRY=1  : print '[FLOW] Begin <target> pid= t=' and
+#                       '[FLOW] End <target> rc= t=' around every stage that
+#                       runs (read back by run_experiments.py --telemetry)
+#   FLOW_RESUME_STATE : per-task JSON state (invocation counts, resume point,
+#                       the stage running now and since when, failed stage)
+
+
+def _load_state(path):
+    if path and os.path.exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"seen": {}, "resumed": False, "started": False, "stopped": False,
+            "current": None, "current_started": None, "failed": None, "failed_rc": 0}
+
+
+def _save_state(path, state):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def shim(make_args):
+    real_make = os.environ.get("FLOW_REAL_MAKE", "/usr/bin/make")
+    cmd = [real_make] + make_args
+    resume = os.environ.get("FLOW_RESUME") == "1"
+    start_at = os.environ.get("FLOW_START_AT", "")
+    stop_at = os.environ.get("FLOW_STOP_AT", "")
+    stop_before = os.environ.get("FLOW_STOP_BEFORE", "")
+    fail_fast = os.environ.get("FLOW_FAIL_FAST") == "1"
+    telemetry = os.environ.get("FLOW_TELEMETRY") == "1"
+    nested = os.environ.get("MAKELEVEL", "0") not in ("", "0")
+    targets = [a for a in make_args if not a.startswith("-") and "=" not in a]
+    if nested or len(targets) != 1 or not (resume or start_at or stop_at or stop_before
+                                           or fail_fast or telemetry):
+        return subprocess.call(cmd)
+
+    target = targets[0]
+    config = next((a.split("=", 1)[1] for a in make_args if a.startswith("DESIGN_CONFIG=")), "")
+    state_path = os.environ.get("FLOW_RESUME_STATE", "")
+    state = _load_state(state_path)
+    key = "{}|{}".format(target, config_key(config))
+    state["seen"][key] = state["seen"].get(key, 0) + 1
+    occurrence = state["seen"][key]
+
+    skip = None
+    if stop_before and target == stop_before:
+        state["stopped"] = True
+    if state["stopped"]:
+        skip = ("after FLOW_STOP_AT={}".format(stop_at) if stop_at
+                else "from FLOW_STOP_BEFORE={}".format(stop_before))
+    elif start_at and not state["started"]:
+        if target == start_at:
+            state["started"] = True
+        else:
+            skip = "before FLOW_START_AT={}".format(start_at)
+    if skip is None and resume and not state["resumed"]:
+        if target == "clean_all":
+            skip = "resume"
+        else:
+            check_cmd = [real_make, "--no-print-directory", "-s"]
+            check_cmd += [a for a in make_args if a != target]
+            check_cmd += ["stage-check", "STAGE=" + target, "STAGE_OCCURRENCE=" + str(occurrence)]
+            if subprocess.call(check_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0:
+                skip = "completed"
+            else:
+                state["resumed"] = True
+                print("[RESUME] Restarting at {} ({})".format(target, config or "default config"))
+    if stop_at and target == stop_at:
+        state["stopped"] = True
+    _save_state(state_path, state)
+
+    if skip:
+        print("[RESUME] Skip {} ({}): {}".format(target, config or "default config", skip))
+        return 0
+    if fail_fast and state.get("failed"):
+        print("[FLOW] Skip {} ({}): {} failed".format(target, config or "default config",
+                                                     state["failed"]))
+        return state.get("failed_rc") or 1
+
+    state["current"] = target
+    state["current_started"] = round(time.time(), 3)
+    _save_state(state_path, state)
+    proc = subprocess.Popen(cmd)
+    if telemetry:
+        print("[FLOW] Begin {} pid={} t={:.3f}".format(target, proc.pid, time.time()),
+              flush=True)
+    try:
+        rc = proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    if telemetry:
+        print("[FLOW] End {} rc={} t={:.3f}".format(target, rc, time.time()), flush=True)
+    state["current"] = state["current_started"] = None
+    if rc != 0 and fail_fast:
+        state["failed"] = target
+        state["failed_rc"] = rc
+    _save_state(state_path, state)
+    return rc
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.cmd == "mark":
+        return mark(args)
+    if args.cmd == "check":
+        return check(args)
+    return shim(args.make_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
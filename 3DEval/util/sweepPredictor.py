@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+# This script predicts the final (post-route) metrics of a flow run from its
+# early-stage metrics, so run_experiments.py --prune can stop sweep points that
+# are bound to end up dominated.
+#
+# Rows are flat genMetrics.py-style dicts ('<stage>__<category>__...'), either
+# historical metadata.json files or collected from a run's LOG_DIR: the
+# OpenROAD placement and global route logs and reports (design area, legalized
+# HPWL, WNS/TNS after legalization, GRT wirelength and overflow), any stage
+# JSONs, and the final_metrics.csv the eval stage (cds-final) writes, whose
+# columns become 'final__<column>'. Features at a stage boundary are the
+# numeric keys of the stages finished by then, plus the sweep knobs
+# ('knob__<NAME>'); targets are 'final__*' (or 'finish__*') keys. One ridge
+# regression is fitted per objective, on standardised features with mean
+# imputation.
+#
+#   train : sweepPredictor.py train -i runs/*/metadata.json -b grt -o model.json
+#   score : sweepPredictor.py score -m model.json -l logs/<platform>/<design>/<variant>
+# -----------------------------------------------------------------------------
+
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import sys
+
+import numpy as np
+
+from logStore import log_exists, read_log
+
+# Stage prefixes whose metrics exist at each boundary
+BOUNDARY_STAGES = {
+    "place": ("floorplan", "globalplace", "placeopt", "detailedplace"),
+    "grt": ("floorplan", "globalplace", "placeopt", "detailedplace", "cts", "globalroute"),
+}
+DEFAULT_OBJECTIVES = (
+    ("final__wns", "max"),
+    ("final__wire_length", "min"),
+)
+# Fewest rows with a target that RidgeModel.fit trains on
+MIN_ROWS = 4
+
+# Legalization logs/reports of the two tiers (opt_lg_<tier>.tcl)
+PLACE_TIERS = (
+    ("upper", "3_5_lg_upper.log", "3_detailed_place_upper.rpt"),
+    ("bottom", "3_4_lg_bottom.log", "3_detailed_place_bottom.rpt"),
+)
+DESIGN_AREA_RE = re.compile(
+    r"^Design area (\S+) u\^2 (\S+)% utilization", re.MULTILINE)
+DPL_HPWL_RE = re.compile(r"^legalized HPWL\s+(\S+) u", re.MULTILINE)
+# report_wns / report_tns, with or without the 'max' of newer OpenSTA
+RPT_WNS_RE = re.compile(r"^wns(?: max)? (\S+)", re.MULTILINE)
+RPT_TNS_RE = re.compile(r"^tns(?: max)? (\S+)", re.MULTILINE)
+GRT_WIRELENGTH_RE = re.compile(r"^\[INFO GRT-0018\] Total wirelength: (\S+) um", re.MULTILINE)
+# "Total  <resource> <demand> <usage>%  <max H> / <max V> / <total overflow>"
+GRT_OVERFLOW_RE = re.compile(
+    r"^Total\s+\S+\s+\S+\s+\S+%\s+(\d+)\s*/\s*(\d+)\s*/\s*(\d+)", re.MULTILINE)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Predicts final flow metrics from early-stage metrics"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("train", help="Fit a model on historical metadata.json rows")
+    p.add_argument("--input", "-i", nargs="+", required=True,
+                   help="metadata.json files or LOG_DIRs (globs allowed)")
+    p.add_argument("--boundary", "-b", choices=sorted(BOUNDARY_STAGES), default="grt")
+    p.add_argument("--objective", nargs="*", default=None,
+                   help="KEY:min|max (default: final WNS and wirelength)")
+    p.add_argument("--alpha", type=float, default=1.0, help="Ridge penalty")
+    p.add_argument("--output", "-o", required=True, help="Model JSON")
+    p = sub.add_parser("score", help="Predict the final metrics of a run")
+    p.add_argument("--model", "-m", required=True, help="Model JSON from 'train'")
+    p.add_argument("--logs", "-l", required=True, help="LOG_DIR of the run")
+    return parser.parse_args()
+
+
+def parse_objectives(specs):
+    if not specs:
+        return list(DEFAULT_OBJECTIVES)
+    out = []
+    for spec in specs:
+        key, _, sense = spec.rpartition(":")
+        if not key or sense not in ("min", "max"):
+            raise ValueError("bad objective '{}', expected KEY:min|max".format(spec))
+        out.append((key, sense))
+    return out
+
+
+def _as_float(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def knob_value(value):
+    """'hbPitch_0p4' -> 0.4, '380' -> 380.0; None if not numeric."""
+    v = _as_float(value)
+    if v is not None:
+        return v
+    m = re.search(r"(\d+(?:p\d+)?)$", str(value))
+    return _as_float(m.group(1).replace("p", ".")) if m else None
+
+
+# ==============================================================================
+# Rows
+# ==============================================================================
+
+
+def read_stage_log(path):
+    """Text of a stage log (plain or logStore.py .gz), '' when missing."""
+    return read_log(path) if log_exists(path) else ""
+
+
+def _last_float(regex, text, group=1):
+    matches = regex.findall(text)
+    if not matches:
+        return None
+    last = matches[-1]
+    return _as_float(last[group - 1] if isinstance(last, tuple) else last)
+
+
+def reports_dir_of(log_dir):
+    """REPORTS_DIR matching a LOG_DIR (logs/<p>/<d>/<v> -> reports/<p>/<d>/<v>)."""
+    head, variant = os.path.split(os.path.normpath(log_dir))
+    head, design = os.path.split(head)
+    head, platform = os.path.split(head)
+    return os.path.join(os.path.dirname(head), "reports", platform, design, variant)
+
+
+def read_final_metrics(log_dir):
+    """Numeric columns of the eval stage's final_metrics.csv as final__<column>."""
+    path = os.path.join(log_dir, "final_metrics.csv")
+    if not os.path.exists(path):
+        return {}
+    with open(path, errors="ignore") as f:
+        rows = [line.strip() for line in f if line.strip()]
+    if len(rows) < 2:
+        return {}
+    out = {}
+    for key, value in zip(rows[0].split(","), rows[-1].split(",")):
+        v = _as_float(value)
+        if v is not None:
+            out["final__" + key.strip()] = v
+    return out
+
+
+def collect_run_metrics(log_dir, reports_dir=None):
+    """
+    Flat metrics of one run from its LOG_DIR (and the matching REPORTS_DIR):
+    stage JSONs, the placement and GRT stage logs/reports and final_metrics.csv.
+    """
+    row = {}
+    paths = sorted(glob.glob(os.path.join(log_dir, "[2-6]_*.json")))
+    paths += sorted(glob.glob(os.path.join(log_dir, "metadata*.json")))
+    for path in paths:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict):
+            row.update(data)
+    if reports_dir is None:
+        reports_dir = reports_dir_of(log_dir)
+    for tier, log_name, rpt_name in PLACE_TIERS:
+        text = read_stage_log(os.path.join(log_dir, log_name))
+        area = DESIGN_AREA_RE.findall(text)
+        if area:
+            row.setdefault("detailedplace__design__area__" + tier, _as_float(area[-1][0]))
+            row.setdefault("detailedplace__design__util__" + tier, _as_float(area[-1][1]))
+        hpwl = _last_float(DPL_HPWL_RE, text)
+        if hpwl is not None:
+            row.setdefault("detailedplace__route__hpwl__" + tier, hpwl)
+        rpt = read_stage_log(os.path.join(reports_dir, rpt_name))
+        for name, regex in (("wns", RPT_WNS_RE), ("tns", RPT_TNS_RE)):
+            v = _last_float(regex, rpt)
+            if v is not None:
+                row.setdefault("detailedplace__timing__setup__{}__{}".format(name, tier), v)
+    text = read_stage_log(os.path.join(log_dir, "5_1_grt.log"))
+    wirelength = _last_float(GRT_WIRELENGTH_RE, text)
+    if wirelength is not None:
+        row.setdefault("globalroute__route__wirelength", wirelength)
+    overflows = GRT_OVERFLOW_RE.findall(text)
+    if overflows:
+        h, v, total = overflows[-1]
+        row.setdefault("globalroute__route__overflow__H", int(h))
+        row.setdefault("globalroute__route__overflow__V", int(v))
+        row.setdefault("globalroute__route__overflow", int(total))
+    for key, value in read_final_metrics(log_dir).items():
+        row.setdefault(key, value)
+    return row
+
+
+def features_at(row, boundary):
+    """Numeric features of row available at the given stage boundary."""
+    stages = BOUNDARY_STAGES[boundary]
+    out = {}
+    for key, value in row.items():
+        stage = key.split("__", 1)[0]
+        if stage in stages or stage == "knob":
+            v = _as_float(value)
+            if v is not None:
+                out[key] = v
+    return out
+
+
+def load_rows(inputs):
+    rows = []
+    for spec in inputs:
+        for path in sorted(glob.glob(spec)) or [spec]:
+            if os.path.isdir(path):
+                rows.append(collect_run_metrics(path))
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print("[WARN] skipping {}: {}".format(path, e))
+                continue
+            if isinstance(data, dict):
+                rows.append(data)
+    return rows
+
+
+# ==============================================================================
+# Model
+# ==============================================================================
+
+
+class RidgeModel:
+    """Ridge regression of one target on standardised, mean-imputed features."""
+
+    def __init__(self, features, mean, scale, coef, intercept, rmse, n):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.rmse = float(rmse)
+        self.n = int(n)
+
+    @classmethod
+    def fit(cls, rows, boundary, target, alpha=1.0, min_rows=MIN_ROWS):
+        """Fit on rows having target; None if there are too few of them."""
+        pairs = []
+        for row in rows:
+            y = _as_float(row.get(target))
+            if y is not None:
+                pairs.append((features_at(row, boundary), y))
+        if len(pairs) < min_rows:
+            return None
+        features = sorted({k for feats, _ in pairs for k in feats})
+        X = np.full((len(pairs), len(features)), np.nan)
+        col = {k: j for j, k in enumerate(features)}
+        for i, (feats, _) in enumerate(pairs):
+            for k, v in feats.items():
+                X[i, col[k]] = v
+        y = np.array([v for _, v in pairs])
+        with np.errstate(all="ignore"):
+            mean = np.nanmean(X, axis=0) if features else np.zeros(0)
+        mean = np.where(np.isnan(mean), 0.0, mean)
+        X = np.where(np.isnan(X), mean, X)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+        y0 = y.mean()
+        A = Z.T @ Z + alpha * np.eye(Z.shape[1])
+        coef = np.linalg.solve(A, Z.T @ (y - y0)) if features else np.zeros(0)
+        resid = y - (Z @ coef + y0)
+        # Leave-one-out residuals of the ridge fit: honest error bars for small n
+        if features:
+            hat = np.einsum("ij,ji->i", Z, np.linalg.solve(A, Z.T)) + 1.0 / len(y)
+            resid = resid / np.clip(1.0 - hat, 1e-3, None)
+        rmse = float(np.sqrt(np.mean(resid ** 2)))
+        return cls(features, mean, scale, coef, y0, rmse, len(y))
+
+    def predict(self, feats):
+        x = np.array([feats.get(k, m) for k, m in zip(self.features, self.mean)])
+        return float(((x - self.mean) / self.scale) @ self.coef + self.intercept)
+
+    def to_dict(self):
+        return {
+            "features": self.features,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+            "rmse": self.rmse,
+            "n": self.n,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["features"], d["mean"], d["scale"], d["coef"], d["intercept"],
+                   d["rmse"], d["n"])
+
+
+def train_models(rows, boundary, objectives, alpha=1.0):
+    """{objective key: RidgeModel}; objectives with too little data are left out."""
+    models = {}
+    for key, _ in objectives:
+        model = RidgeModel.fit(rows, boundary, key, alpha)
+        if model is not None:
+            models[key] = model
+    return models
+
+
+def target_counts(rows, objectives):
+    """{objective key: rows having a numeric value for it}"""
+    return {key: sum(_as_float(r.get(key)) is not None for r in rows)
+            for key, _ in objectives}
+
+
+def predict(models, feats):
+    """{key: (prediction, rmse)}"""
+    return {key: (m.predict(feats), m.rmse) for key, m in models.items()}
+
+
+def dominated_by(pred, others, objectives, margin=1.0):
+    """
+    Index of the first row in others (actual final metrics) that beats the
+    prediction on every objective by more than margin * rmse, else None.
+    Objectives without a prediction are ignored; all must not be missing.
+    """
+    keys = [(k, s) for k, s in objectives if k in pred]
+    if not keys:
+        return None
+    for idx, other in enumerate(others):
+        better = True
+        for key, sense in keys:
+            value = _as_float(other.get(key))
+            if value is None:
+                better = False
+                break
+            mu, rmse = pred[key]
+            gap = (value - mu) if sense == "max" else (mu - value)
+            if gap <= margin * rmse:
+                better = False
+                break
+        if better:
+            return idx
+    return None
+
+
+def main():
+    args = parse_args()
+    if args.cmd == "train":
+        try:
+            objectives = parse_objectives(args.objective)
+        except ValueError as e:
+            print("[ERROR] {}".format(e))
+            sys.exit(2)
+        rows = load_rows(args.input)
+        models = train_models(rows, args.boundary, objectives, args.alpha)
+        for key, _ in objectives:
+            if key in models:
+                m = models[key]
+                print("[INFO] {}: n={} features={} rmse={:.4g}".format(
+                    key, m.n, len(m.features), m.rmse))
+            else:
+                print("[WARN] {}: {} of {} rows have this key, {} needed".format(
+                    key, target_counts(rows, [(key, None)])[key], len(rows), MIN_ROWS))
+        with open(args.output, "w") as f:
+            json.dump({
+                "boundary": args.boundary,
+                "objectives": objectives,
+                "models": {k: m.to_dict() for k, m in models.items()},
+            }, f, indent=2)
+        return
+    with open(args.model) as f:
+        spec = json.load(f)
+    models = {k: RidgeModel.from_dict(d) for k, d in spec["models"].items()}
+    feats = features_at(collect_run_metrics(args.logs), spec["boundary"])
+    out = {k: {"prediction": mu, "rmse": rmse} for k, (mu, rmse) in predict(models, feats).items()}
+    json.dump(out, sys.stdout, indent=2, sort_keys=True)
+    print()
+
+
+if __name__ == "__main__":
+    main()
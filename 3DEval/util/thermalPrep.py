@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+# This script prepares HotSpot inputs for a 3D design in a single pass over the
+# final DEF: instances are split by tier from their _upper/_bottom masters,
+# per-instance power (from report_instance_power.tcl, one report per tier) is
+# binned onto an N x N grid per tier with numpy.bincount, and the per-tier
+# floorplans plus the merged power trace are written directly.
+# -----------------------------------------------------------------------------
+
+import argparse
+import os
+import re
+
+import numpy as np
+
+from defStream import iter_def_statements, open_def, parse_diearea, parse_units, tier_of_master
+
+TIER_NAMES = ("upper", "bottom")  # index == partition.txt die id
+
+LEF_MACRO_RE = re.compile(r"^\s*MACRO\s+(\S+)")
+LEF_SIZE_RE = re.compile(r"^\s*SIZE\s+([0-9.eE+-]+)\s+BY\s+([0-9.eE+-]+)\s*;")
+COMP_PLACED_RE = re.compile(r"\+\s*(?:PLACED|FIXED|COVER)\s*\(\s*(-?\d+)\s+(-?\d+)\s*\)\s*(\S+)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Bins per-instance power of a 3D DEF into HotSpot flp/ptrace files"
+    )
+    parser.add_argument("--def", "-i", dest="def_file", required=True, help="Final DEF")
+    parser.add_argument("--upper-power", required=True, help="Power report of the upper tier")
+    parser.add_argument("--bottom-power", required=True, help="Power report of the bottom tier")
+    parser.add_argument("--outdir", "-o", required=True, help="Output directory")
+    parser.add_argument("--grid", "-g", type=int, default=10, help="Grid size N (N x N bins)")
+    parser.add_argument("--lef", nargs="*", default=[], help="LEFs for macro sizes (bins by cell center)")
+    parser.add_argument("--upper-flp", default="floorplan1.flp")
+    parser.add_argument("--bottom-flp", default="floorplan2.flp")
+    parser.add_argument("--ptrace", default="test.ptrace")
+    return parser.parse_args()
+
+
+def _norm(name):
+    return name.replace("\\", "")
+
+
+def read_lef_sizes(lef_paths):
+    """MACRO name -> (width, height) in microns."""
+    sizes = {}
+    for path in lef_paths:
+        if not os.path.isfile(path):
+            print("[WARN] LEF file not found:", path)
+            continue
+        macro = None
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                m = LEF_MACRO_RE.match(line)
+                if m:
+                    macro = m.group(1)
+                    continue
+                if macro is None:
+                    continue
+                m = LEF_SIZE_RE.match(line)
+                if m:
+                    sizes[macro] = (float(m.group(1)), float(m.group(2)))
+                    macro = None
+    return sizes
+
+
+def read_power_report(path):
+    """
+    Instance -> total power (W) from an OpenSTA 'report_power -instances'
+    table (Internal Switching Leakage Total Instance), or plain
+    '<instance> <power>' lines.
+    """
+    power = {}
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            toks = line.split()
+            try:
+                if len(toks) >= 5:
+                    [float(t) for t in toks[:4]]
+                    power[_norm(toks[4])] = float(toks[3])
+                elif len(toks) == 2:
+                    power[_norm(toks[0])] = float(toks[1])
+            except ValueError:
+                continue
+    return power
+
+
+def read_placement(def_path, sizes):
+    """
+    Stream the DEF once and return (diearea_um, per-tier dict of
+    instance -> (x_um, y_um) bin anchor). With LEF sizes the anchor is the
+    cell center, otherwise the placement origin.
+    """
+    dbu = 1000
+    die = None
+    tiers = ({}, {})
+    with open_def(def_path) as f:
+        for section, lines in iter_def_statements(f):
+            if section is None:
+                line = lines[0]
+                dbu = parse_units(line) or dbu
+                die = parse_diearea(line) or die
+                continue
+            if section != "COMPONENTS":
+                if section in ("NETS", "SPECIALNETS"):
+                    break
+                continue
+            text = " ".join(lines)
+            toks = text.split()
+            if len(toks) < 3:
+                continue
+            tier = tier_of_master(toks[2])
+            m = COMP_PLACED_RE.search(text)
+            if tier is None or not m:
+                continue
+            x = int(m.group(1)) / float(dbu)
+            y = int(m.group(2)) / float(dbu)
+            size = sizes.get(toks[2])
+            if size:
+                w, h = size
+                if m.group(3) in ("E", "W", "FE", "FW"):
+                    w, h = h, w
+                x += w / 2.0
+                y += h / 2.0
+            tiers[tier][_norm(toks[1])] = (x, y)
+    if die is None:
+        raise SystemExit("[ERROR] DIEAREA not found in {}".format(def_path))
+    die_um = tuple(v / float(dbu) for v in die)
+    return die_um, tiers
+
+
+def bin_power(placement, power, die, grid):
+    """Return an N x N array (row 0 = bottom) of summed instance power."""
+    names = [n for n in placement if n in power]
+    missing = len(placement) - len(names)
+    if missing:
+        print("[WARN] {} placed instances have no power entry".format(missing))
+    if not names:
+        return np.zeros((grid, grid))
+    xy = np.array([placement[n] for n in names], dtype=np.float64)
+    pw = np.array([power[n] for n in names], dtype=np.float64)
+    xmin, ymin, xmax, ymax = die
+    col = np.clip(((xy[:, 0] - xmin) / (xmax - xmin) * grid).astype(np.int64), 0, grid - 1)
+    row = np.clip(((xy[:, 1] - ymin) / (ymax - ymin) * grid).astype(np.int64), 0, grid - 1)
+    flat = np.bincount(row * grid + col, weights=pw, minlength=grid * grid)
+    return flat.reshape(grid, grid)
+
+
+def unit_names(prefix, grid):
+    return ["{}_{}_{}".format(prefix, r, c) for r in range(grid) for c in range(grid)]
+
+
+def write_flp(path, prefix, die, grid):
+    """HotSpot floorplan: <unit> <width> <height> <left-x> <bottom-y> in meters."""
+    xmin, ymin, xmax, ymax = die
+    w = (xmax - xmin) / grid * 1e-6
+    h = (ymax - ymin) / grid * 1e-6
+    with open(path, "w") as f:
+        for name, (r, c) in zip(unit_names(prefix, grid),
+                                ((r, c) for r in range(grid) for c in range(grid))):
+            f.write("{}\t{:.9e}\t{:.9e}\t{:.9e}\t{:.9e}\n".format(name, w, h, c * w, r * h))
+
+
+def write_ptrace(path, maps, grid):
+    """Merged power trace: header of unit names, then one line of powers."""
+    names = []
+    values = []
+    for prefix, pmap in maps:
+        names.extend(unit_names(prefix, grid))
+        values.extend(pmap.ravel().tolist())
+    with open(path, "w") as f:
+        f.write("\t".join(names) + "\n")
+        f.write("\t".join("{:.9e}".format(v) for v in values) + "\n")
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.outdir, exist_ok=True)
+
+    sizes = read_lef_sizes(args.lef)
+    die, tiers = read_placement(args.def_file, sizes)
+    reports = (args.upper_power, args.bottom_power)
+    flps = (args.upper_flp, args.bottom_flp)
+
+    maps = []
+    for tier, name in enumerate(TIER_NAMES):
+        power = read_power_report(reports[tier])
+        pmap = bin_power(tiers[tier], power, die, args.grid)
+        write_flp(os.path.join(args.outdir, flps[tier]), name, die, args.grid)
+        maps.append((name, pmap))
+        print("[INFO] {}: {} instances, {:.6e} W over {}x{} bins".format(
+            name, len(tiers[tier]), pmap.sum(), args.grid, args.grid))
+
+    write_ptrace(os.path.join(args.outdir, args.ptrace), maps, args.grid)
+    print("[INFO] HotSpot inputs written to", args.outdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+2D -> 3D view generation shared by the OpenROAD and Cadence flows.
+
+    from views3d import generate
+    generate(def_in, def_out, v_in, v_out, partition="partition.txt",
+             cell_map="map.json", profile="cadence")
+
+The CLI is `python3 -m views3d` or the generate_3d_views.py wrappers in
+scripts_openroad/ and scripts_cadence/.
+"""
+
+from views3d.core import generate, main
+from views3d.profiles import PROFILES, NamingProfile, get_profile
+
+__all__ = ["generate", "main", "PROFILES", "NamingProfile", "get_profile"]
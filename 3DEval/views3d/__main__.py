@@ -0,0 +1,5 @@
+import sys
+
+from views3d.core import main
+
+sys.exit(main())
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+Flow naming profiles of the 3D view generator.
+
+A profile holds the conventions the generated views must follow for one
+back-end flow: the master suffix of each tier (platform LIB/LEF naming, also
+matched by the Tcl tier policies) and the constant extra upper-tier pins are
+tied to. The OpenROAD and Cadence flows currently share the platform
+conventions; a flow or platform that differs gets its own profile here
+instead of a fork of the generator.
+"""
+
+from typing import Dict, NamedTuple
+
+# partition.txt die ids
+DIE_UPPER = 0
+DIE_BOTTOM = 1
+
+
+class NamingProfile(NamedTuple):
+    name: str
+    upper_suffix: str = "_upper"
+    bottom_suffix: str = "_bottom"
+    tie_value: str = "1'b0"
+
+    def strip(self, master: str) -> str:
+        """Base master of a (possibly already) tiered master."""
+        for suffix in (self.upper_suffix, self.bottom_suffix):
+            if suffix and master.endswith(suffix):
+                return master[:-len(suffix)]
+        return master
+
+    def tier_master(self, base: str, die: int) -> str:
+        """Default tier master of base when the cell map does not name one."""
+        return base + (self.upper_suffix if die == DIE_UPPER else self.bottom_suffix)
+
+
+PROFILES: Dict[str, NamingProfile] = {
+    "openroad": NamingProfile("openroad"),
+    "cadence": NamingProfile("cadence"),
+}
+
+
+def get_profile(profile) -> NamingProfile:
+    """Profile by name (or a NamingProfile, returned as is)."""
+    if isinstance(profile, NamingProfile):
+        return profile
+    try:
+        return PROFILES[profile or "openroad"]
+    except KeyError:
+        raise ValueError("unknown naming profile '{}' (known: {})".format(
+            profile, ", ".join(sorted(PROFILES))))